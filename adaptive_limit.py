@@ -0,0 +1,195 @@
+"""
+Adaptive per-host concurrency limits for WordPress clients.
+
+A fixed concurrency is too low for a fast site and too high for a small
+one. ``AdaptiveLimit`` caps the requests in flight to a host and moves the
+cap from what it observes, in the style of TCP congestion control:
+
+- additive increase: when a window of requests ran at the limit and its p95
+  latency stayed near the host's no-load latency, the limit grows by one
+  (doubling during the initial slow start)
+- latency gradient: when p95 rises past ``tolerance`` times the no-load
+  latency, the limit shrinks in proportion to the rise
+- multiplicative decrease: a 429/503 response or a timeout cuts the limit
+  at once, at most once per round of requests
+
+Limits are shared by every client talking to a host in this process; see
+``host_limits`` for their current values.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, FrozenSet, List, Optional
+
+
+@dataclass
+class ConcurrencyPolicy:
+    """How an adaptive limit starts and moves.
+
+    Args:
+        initial_limit: Requests in flight allowed before anything is measured
+        min_limit: Lowest limit backoff can reach
+        max_limit: Highest limit growth can reach
+        backoff: Factor applied to the limit on an overload response or timeout
+        tolerance: p95 latency above ``tolerance`` times the no-load latency counts as a spike
+        min_window: Fewest samples per evaluation window; windows are at least one limit's worth
+        baseline_drift: Fraction of a rise in p95 the no-load latency follows per
+            window, so a site that got slower for good is re-learned
+        overload_statuses: Responses that signal the site is saturated
+    """
+    initial_limit: int = 4
+    min_limit: int = 1
+    max_limit: int = 64
+    backoff: float = 0.7
+    tolerance: float = 2.0
+    min_window: int = 10
+    baseline_drift: float = 0.02
+    overload_statuses: FrozenSet[int] = frozenset({429, 503})
+
+
+class AdaptiveLimit:
+    """Concurrency limit for one host, adjusted from request latency and overload responses.
+
+    ``acquire`` waits for a slot and returns its start time, which must be
+    passed back to ``release`` together with the outcome.
+    """
+
+    def __init__(self, host: str, policy: Optional[ConcurrencyPolicy] = None):
+        self.host = host
+        self.policy = policy or ConcurrencyPolicy()
+        self.logger = logging.getLogger(__name__)
+        self.limit = float(min(max(self.policy.initial_limit, self.policy.min_limit), self.policy.max_limit))
+        self.in_flight = 0
+        self.baseline: Optional[float] = None
+        self.last_p95: Optional[float] = None
+        self.increases = 0
+        self.decreases = 0
+        self.overloads = 0
+        self._slow_start = True
+        self._samples: List[float] = []
+        self._saturated = False
+        self._last_decrease = 0.0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def current(self) -> int:
+        """The limit as a whole number of requests."""
+        return max(self.policy.min_limit, int(self.limit))
+
+    async def acquire(self) -> float:
+        """Wait until fewer than ``current`` requests are in flight and take a slot."""
+        if self.in_flight >= self.current or self._waiters:
+            self._saturated = True
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except BaseException:
+                if not waiter.cancelled() and waiter.done():
+                    # Woken and cancelled at once: hand the slot on
+                    self.in_flight -= 1
+                    self._wake()
+                elif waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                raise
+        else:
+            self.in_flight += 1
+        if self.in_flight >= self.current:
+            self._saturated = True
+        return time.monotonic()
+
+    def release(self, started: float, status: Optional[int] = None, overloaded: bool = False):
+        """Free a slot and learn from the request.
+
+        Args:
+            started: Value returned by ``acquire``
+            status: Response status, or None if no response arrived
+            overloaded: The request failed in a way that signals overload (e.g. a timeout)
+        """
+        self.in_flight -= 1
+        now = time.monotonic()
+        if overloaded or status in self.policy.overload_statuses:
+            self.overloads += 1
+            # Requests sent before the last cut were part of the round that caused it
+            if started >= self._last_decrease:
+                self._decrease(self.limit * self.policy.backoff, "overload", now)
+        elif status is not None:
+            self._samples.append(now - started)
+            if len(self._samples) >= max(self.policy.min_window, self.current):
+                self._evaluate(now)
+        self._wake()
+
+    def _evaluate(self, now: float):
+        samples = sorted(self._samples)
+        p95 = samples[min(len(samples) - 1, int(0.95 * len(samples)))]
+        saturated = self._saturated
+        self._samples = []
+        self._saturated = False
+        self.last_p95 = p95
+        if self.baseline is None or p95 < self.baseline:
+            self.baseline = p95
+        else:
+            self.baseline += (p95 - self.baseline) * self.policy.baseline_drift
+
+        threshold = self.baseline * self.policy.tolerance
+        if p95 > threshold:
+            # Latency gradient: shrink in proportion to the rise, but never below half
+            self._decrease(self.limit * max(0.5, threshold / p95), "latency", now)
+        elif saturated and self.limit < self.policy.max_limit:
+            old = self.current
+            self.limit = min(self.policy.max_limit, self.limit * 2 if self._slow_start else self.limit + 1)
+            self.increases += 1
+            if self.current != old:
+                self.logger.debug(f"Concurrency limit for {self.host}: {old} -> {self.current}")
+
+    def _decrease(self, limit: float, reason: str, now: float):
+        old = self.current
+        self.limit = max(float(self.policy.min_limit), limit)
+        self._slow_start = False
+        self._last_decrease = now
+        self._samples = []
+        self._saturated = False
+        self.decreases += 1
+        if self.current != old:
+            self.logger.info(f"Concurrency limit for {self.host}: {old} -> {self.current} ({reason})")
+
+    def _wake(self):
+        while self._waiters and self.in_flight < self.current:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def as_dict(self) -> dict:
+        return {
+            "limit": self.current,
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "p95": round(self.last_p95, 6) if self.last_p95 is not None else None,
+            "baseline": round(self.baseline, 6) if self.baseline is not None else None,
+            "increases": self.increases,
+            "decreases": self.decreases,
+            "overloads": self.overloads,
+        }
+
+
+_host_limits: Dict[str, AdaptiveLimit] = {}
+
+
+def get_host_limit(host: str, policy: Optional[ConcurrencyPolicy] = None) -> AdaptiveLimit:
+    """Return the process-wide adaptive limit for ``host`` (``host[:port]``, lower-cased).
+
+    The first caller's policy wins; later callers share the existing limit.
+    """
+    limit = _host_limits.get(host)
+    if limit is None:
+        limit = AdaptiveLimit(host, policy)
+        _host_limits[host] = limit
+    return limit
+
+
+def host_limits() -> Dict[str, dict]:
+    """Current limit, in-flight count and latency estimates of every host."""
+    return {host: limit.as_dict() for host, limit in _host_limits.items()}
@@ -0,0 +1,105 @@
+"""
+Benchmark: fixed versus adaptive concurrency against a saturating backend.
+
+``MockWordPress`` is started with a small worker pool and backlog, like a
+PHP-FPM site: requests beyond the pool queue up (latency rises) and beyond
+the backlog get 503s. Each scenario publishes the same posts either at a
+fixed concurrency or through an adaptive limit capped at the largest fixed
+level, and reports posts/sec, p50/p99 publish latency, 503s served, failed
+posts and the limit the adaptive controller settled on.
+
+    python -m benchmarks.bench_adaptive_concurrency [--capacity 8 --backlog 8 --posts 400]
+"""
+import argparse
+import asyncio
+import logging
+import time
+from typing import List, Optional
+
+from adaptive_limit import ConcurrencyPolicy
+from benchmarks.bench_publish import percentile
+from benchmarks.mock_wordpress import MockWordPress
+from metrics import Metrics, Span
+from taxonomy_cache import TaxonomyCache
+from transport import RetryPolicy
+from wordpress_service import WordPressService
+
+
+async def run_scenario(args: argparse.Namespace, concurrency: int, adaptive: bool) -> dict:
+    # A fresh server per scenario gives each one its own host, so limits and breakers start clean
+    server = MockWordPress(latency=args.latency, capacity=args.capacity, backlog=args.backlog)
+    await server.start()
+    latencies: List[float] = []
+    metrics = Metrics()
+
+    def collect(span: Span):
+        if span.name == "publish_article" and span.error is None:
+            latencies.append(span.duration)
+
+    metrics.add_hook(collect)
+    service = WordPressService(
+        server.base_url, "bench", "password",
+        taxonomy_cache=TaxonomyCache(),
+        retry_policy=RetryPolicy(base_delay=args.retry_base_delay),
+        metrics=metrics,
+        concurrency_policy=ConcurrencyPolicy(max_limit=concurrency) if adaptive else None
+    )
+    specs = ({"title": f"Post {i}", "content": f"<p>Post {i}</p>"} for i in range(args.posts))
+    failures = 0
+    started = time.perf_counter()
+    try:
+        await service.ensure_session()
+        server.reset_stats()
+        started = time.perf_counter()
+        async for result in service.publish_many(specs, concurrency=concurrency):
+            if not result.ok:
+                failures += 1
+    finally:
+        elapsed = time.perf_counter() - started
+        limit = service.concurrency_limit
+        await service.close()
+        await server.stop()
+
+    p50, p99 = percentile(latencies, 0.5), percentile(latencies, 0.99)
+    return {
+        "mode": "adaptive" if adaptive else "fixed",
+        "concurrency": concurrency,
+        "posts_per_sec": round((args.posts - failures) / elapsed, 2),
+        "p50_ms": round(p50 * 1000, 2) if p50 is not None else None,
+        "p99_ms": round(p99 * 1000, 2) if p99 is not None else None,
+        "overloaded": server.overloaded,
+        "failures": failures,
+        "peak_active": server.peak_active,
+        "final_limit": limit.current if limit is not None else None,
+    }
+
+
+def print_result(result: dict):
+    limit: Optional[int] = result["final_limit"]
+    print(
+        f"{result['mode']:>8} c<={result['concurrency']:<3} {result['posts_per_sec']:8.1f} posts/s  "
+        f"p50 {result['p50_ms']} ms  p99 {result['p99_ms']} ms  "
+        f"{result['overloaded']:4} x 503  {result['failures']:3} failed  peak {result['peak_active']:3} at server"
+        + (f"  limit {limit}" if limit is not None else "")
+    )
+
+
+async def main(args: argparse.Namespace):
+    print(f"backend: {args.capacity} workers, backlog {args.backlog}, {args.latency * 1000:.0f} ms per request")
+    for concurrency in args.concurrency:
+        print_result(await run_scenario(args, concurrency, adaptive=False))
+    print_result(await run_scenario(args, max(args.concurrency), adaptive=True))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--posts", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[4, 16, 64],
+                        help="Fixed levels; the adaptive run is capped at the largest")
+    parser.add_argument("--capacity", type=int, default=8, help="Requests the stub serves at once")
+    parser.add_argument("--backlog", type=int, default=8, help="Requests the stub queues before returning 503")
+    parser.add_argument("--latency", type=float, default=0.02, help="Stub service time per request (s)")
+    parser.add_argument("--retry-base-delay", type=float, default=0.05)
+    # Failed posts are counted in the report; keep their error logs out of it
+    logging.basicConfig(level=logging.CRITICAL)
+    asyncio.run(main(parser.parse_args()))
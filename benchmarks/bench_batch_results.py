@@ -0,0 +1,78 @@
+"""
+Micro-benchmark: memory held by batch results.
+
+Builds N successful results carrying a realistic Elementor meta dict and
+compares the memory kept by a list of PublishedArticle objects with a
+BatchResults container (digest only, and with meta spilled to a MetaStore).
+
+    python -m benchmarks.bench_batch_results [--results 100000]
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from elementor_layout import ElementorLayout
+from models.content import ArticleSpec, PublishedArticle, PublishResult
+from result_store import BatchResults, MetaStore
+
+
+def make_result(i: int, layout: ElementorLayout) -> PublishResult:
+    content_html = f"<h2>Post {i}</h2><p>Body of post {i}.</p>" * 5
+    meta = {
+        "_elementor_data": layout.render(content_html, [{"question": "Q?", "answer": f"A {i}"}]),
+        "_elementor_edit_mode": "builder",
+        "_aioseo_description": f"Description {i}",
+    }
+    article = PublishedArticle(
+        post_id=i, url=f"https://example.com/?p={i}", title=f"Post {i}", status="publish",
+        published_at=datetime.now(), meta=meta
+    )
+    return PublishResult(index=i, spec=ArticleSpec(title=f"Post {i}", content=content_html), article=article)
+
+
+def measure(label: str, results: int, build):
+    layout = ElementorLayout()
+    tracemalloc.start()
+    started = time.perf_counter()
+    kept = build((make_result(i, layout) for i in range(results)))
+    elapsed = time.perf_counter() - started
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<32} {current / 1e6:9.1f} MB retained  {current / results:8.0f} B/result  {elapsed:6.2f}s")
+    return kept
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--results", type=int, default=100000)
+    args = parser.parse_args()
+
+    measure("list[PublishResult]", args.results, list)
+
+    def columnar(stream):
+        batch = BatchResults()
+        for result in stream:
+            batch.append(result)
+        return batch
+
+    measure("BatchResults (digest only)", args.results, columnar)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = MetaStore(os.path.join(tmp, "meta.sqlite"))
+
+        def spilled(stream):
+            batch = BatchResults(store)
+            for result in stream:
+                batch.append(result)
+            store.flush()
+            return batch
+
+        measure("BatchResults + MetaStore spill", args.results, spilled)
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
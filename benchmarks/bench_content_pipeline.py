@@ -0,0 +1,64 @@
+"""
+Micro-benchmark: HTML preprocessing throughput.
+
+Runs ``ContentPipeline`` over generated articles of growing size and reports
+MB/s for the first (parsed) and repeated (memoized) pass. Similar MB/s across
+sizes shows the pipeline is linear in article size.
+
+    python -m benchmarks.bench_content_pipeline [--repeat 3]
+"""
+import argparse
+import time
+
+from content_pipeline import ContentPipeline
+
+
+def sample_article(target_bytes: int) -> str:
+    block = (
+        "<h2>Section {i}: “Getting started”</h2>\n"
+        "<p>Paragraph {i} with   <strong>bold</strong>, <a href=\"https://example.com/{i}\">a link</a>\n"
+        "   and accents: café, naïve.</p>\n"
+        "<!-- editor note {i} -->\n"
+        "<h3>Details {i}</h3>\n"
+        "<ul>\n  <li>First</li>\n  <li>Second</li>\n</ul>\n"
+        "<pre>  code {i}\n    indented</pre>\n"
+    )
+    parts, size, i = [], 0, 0
+    while size < target_bytes:
+        chunk = block.format(i=i)
+        parts.append(chunk)
+        size += len(chunk.encode("utf-8"))
+        i += 1
+    return "".join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=3, help="Measurements per size (best is reported)")
+    args = parser.parse_args()
+
+    for size_kb in (64, 256, 1024, 4096):
+        html = sample_article(size_kb * 1024)
+        megabytes = len(html.encode("utf-8")) / 1e6
+
+        cold = float("inf")
+        for _ in range(args.repeat):
+            pipeline = ContentPipeline()
+            start = time.perf_counter()
+            result = pipeline.process(html)
+            cold = min(cold, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        assert pipeline.process(html) is result
+        warm = time.perf_counter() - start
+
+        print(
+            f"{megabytes:6.2f} MB, {len(result.toc):>6} headings: "
+            f"parse {megabytes / cold:6.2f} MB/s, "
+            f"memoized {megabytes / warm:8.0f} MB/s, "
+            f"{len(result.html) / len(html):.0%} of input size"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Micro-benchmark: per-post cost of producing ``_elementor_data``.
+
+Compares building the full element tree and running ``json.dumps`` over it
+with splicing the article fragments into the pre-serialized template.
+
+    python -m benchmarks.bench_elementor_layout [--posts 20000]
+"""
+import argparse
+import json
+import timeit
+
+from elementor_layout import ElementorLayout
+
+
+def sample_article(paragraphs: int):
+    content_html = "".join(
+        f"<h2>Section {i}</h2><p>Paragraph {i} with some text, “quotes” and accents: café.</p>"
+        for i in range(paragraphs)
+    )
+    faq_items = [{"question": f"Question {i}?", "answer": f"Answer {i}."} for i in range(5)]
+    return content_html, faq_items
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--posts", type=int, default=20000, help="Posts rendered per measurement")
+    args = parser.parse_args()
+
+    layout = ElementorLayout()
+    for paragraphs in (0, 10, 100):
+        content_html, faq_items = sample_article(paragraphs)
+
+        tree_json = json.dumps(layout.build(content_html, faq_items), ensure_ascii=False)
+        assert layout.render(content_html, faq_items) == tree_json, "template output differs from tree output"
+
+        tree = min(timeit.repeat(
+            lambda: json.dumps(layout.build(content_html, faq_items), ensure_ascii=False),
+            number=args.posts, repeat=3
+        ))
+        template = min(timeit.repeat(
+            lambda: layout.render(content_html, faq_items),
+            number=args.posts, repeat=3
+        ))
+        print(
+            f"{paragraphs:>4} paragraphs ({len(tree_json):>6} bytes): "
+            f"tree+dumps {tree / args.posts * 1e6:7.2f} us/post, "
+            f"template {template / args.posts * 1e6:7.2f} us/post, "
+            f"{tree / template:5.1f}x faster"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark: connection pool settings and client sharing.
+
+Several WordPressService instances publish to a local stub server at 1, 10
+and 100 concurrent publishes with three setups: one default-pooled client
+per service, one shared default-pooled client, and one shared client whose
+keep-alive pool is sized to the concurrency. Reports throughput and how many
+TCP connections the server accepted.
+
+    python -m benchmarks.bench_http_pool [--posts 500] [--latency 0.005]
+
+HTTP/2 is not measured: the stub server only speaks HTTP/1.1 in cleartext.
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.mock_wordpress import MockWordPress
+from http_pool import PoolConfig
+from wordpress_service import WordPressService
+
+SERVICES = 10
+
+
+async def run_scenario(server: MockWordPress, concurrency: int, posts: int, shared: bool,
+                       pool: PoolConfig = None) -> dict:
+    user = f"bench-{concurrency}-{shared}-{pool is not None}"
+    services = [
+        WordPressService(server.base_url, user, "password", pool=pool, share_client=shared)
+        for _ in range(SERVICES)
+    ]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def publish(i: int):
+        async with semaphore:
+            await services[i % SERVICES].publish_article(title=f"Post {i}", content="<p>Body</p>")
+
+    server.reset_stats()
+    started = time.perf_counter()
+    await asyncio.gather(*(publish(i) for i in range(posts)))
+    elapsed = time.perf_counter() - started
+    for service in services:
+        await service.close()
+    return {"posts_per_sec": posts / elapsed, "connections": server.connections}
+
+
+async def main(posts: int, latency: float):
+    server = MockWordPress(latency=latency)
+    await server.start()
+    try:
+        for concurrency in (1, 10, 100):
+            sized = PoolConfig(max_connections=concurrency, max_keepalive_connections=concurrency)
+            results = {
+                "own clients": await run_scenario(server, concurrency, posts, shared=False),
+                "shared client": await run_scenario(server, concurrency, posts, shared=True),
+                "shared, sized pool": await run_scenario(server, concurrency, posts, shared=True, pool=sized),
+            }
+            print(f"concurrency {concurrency:>3}: " + " | ".join(
+                f"{name} {r['posts_per_sec']:7.1f} posts/s {r['connections']:>4} conns"
+                for name, r in results.items()
+            ))
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--posts", type=int, default=500, help="Posts published per scenario")
+    parser.add_argument("--latency", type=float, default=0.005, help="Stub server latency per request (s)")
+    args = parser.parse_args()
+    asyncio.run(main(args.posts, args.latency))
@@ -0,0 +1,235 @@
+"""
+Benchmark harness: end-to-end publish throughput against a local stub server.
+
+Drives ``publish_article`` and ``publish_elementor_widgets_meta`` at several
+concurrency levels and article sizes against ``MockWordPress`` with
+configurable latency and error injection. For every scenario it reports
+posts/sec, p50/p99 publish latency, REST requests per post, request body
+bytes and JSON serialization time per post, failures and peak RSS, and
+writes everything to a JSON file that a later run can be compared against:
+
+    python -m benchmarks.bench_publish --output before.json
+    python -m benchmarks.bench_publish --output after.json --compare before.json
+
+Each scenario runs in its own subprocess with a fresh stub, so its peak RSS
+is its own rather than the high-water mark of every scenario before it. The
+stub runs in the same event loop as the client, so absolute numbers include
+its CPU time and memory; compare runs made on the same machine.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional
+
+from benchmarks.mock_wordpress import MockWordPress
+from metrics import Metrics
+from taxonomy_cache import TaxonomyCache
+from transport import RetryPolicy
+from wordpress_service import WordPressService
+
+METHODS = ("article", "elementor")
+# Directory ``python -m benchmarks.bench_publish`` is run from
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def sample_article(paragraphs: int) -> str:
+    return "".join(
+        f"<h2>Section {i}</h2><p>Paragraph {i} with some text, “quotes” and accents: café.</p>"
+        for i in range(paragraphs)
+    )
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far (a high-water mark, so one scenario per process)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+async def run_scenario(server: MockWordPress, method: str, concurrency: int, paragraphs: int,
+                       posts: int, retry_policy: RetryPolicy, gzip_requests: bool = False,
+                       batch_writes: bool = False) -> dict:
+    metrics = Metrics()
+    service = WordPressService(
+        server.base_url, f"bench-{method}-{concurrency}-{paragraphs}", "password",
+        taxonomy_cache=TaxonomyCache(), retry_policy=retry_policy, metrics=metrics, gzip_requests=gzip_requests,
+        batch_writes=batch_writes
+    )
+    content_html = sample_article(paragraphs)
+    faq_items = [{"question": f"Question {i}?", "answer": f"Answer {i}."} for i in range(5)]
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    failures = 0
+
+    async def publish(i: int):
+        nonlocal failures
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                if method == "article":
+                    await service.publish_article(
+                        title=f"Post {i}", content=content_html,
+                        categories=["News"], tags=["bench", f"tag-{i % 10}"], meta_description="Benchmark"
+                    )
+                else:
+                    await service.publish_elementor_widgets_meta(
+                        content_html, faq_items, title=f"Post {i}",
+                        categories=["News"], tags=["bench", f"tag-{i % 10}"], meta_description="Benchmark"
+                    )
+            except Exception:
+                failures += 1
+                return
+            latencies.append(time.perf_counter() - started)
+
+    server.reset_stats()
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(publish(i) for i in range(posts)))
+    finally:
+        elapsed = time.perf_counter() - started
+        await service.close()
+
+    p50, p99 = percentile(latencies, 0.5), percentile(latencies, 0.99)
+    sent = sum(metrics.counters.get("wpep_request_bytes_total", {}).values())
+    serialize = sum(h.sum for h in metrics.histograms.get("wpep_request_serialize_seconds", {}).values())
+    return {
+        "method": method,
+        "concurrency": concurrency,
+        "paragraphs": paragraphs,
+        "posts": posts,
+        "failures": failures,
+        "elapsed": round(elapsed, 4),
+        "posts_per_sec": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(p50 * 1000, 2) if p50 is not None else None,
+        "p99_ms": round(p99 * 1000, 2) if p99 is not None else None,
+        # HTTP round trips: a batch counts once, and injected errors never reach the
+        # route handlers, so add them back to count retries
+        "requests_per_post": round((server.round_trips + server.injected_errors) / posts, 2),
+        "injected_errors": server.injected_errors,
+        "bytes_sent_per_post": round(sent / posts),
+        "serialize_ms_per_post": round(serialize * 1000 / posts, 4),
+        "connections": server.connections,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def scenario_key(result: dict) -> tuple:
+    return result["method"], result["concurrency"], result["paragraphs"]
+
+
+def print_result(result: dict, baseline: Optional[dict] = None):
+    line = (
+        f"{result['method']:>9} c={result['concurrency']:<3} {result['paragraphs']:>4} paragraphs: "
+        f"{result['posts_per_sec']:8.1f} posts/s  p50 {result['p50_ms']} ms  p99 {result['p99_ms']} ms  "
+        f"{result['requests_per_post']:5.2f} req/post  {result['bytes_sent_per_post'] / 1024:7.1f} KB/post  "
+        f"ser {result['serialize_ms_per_post']} ms/post  {result['failures']} failed  "
+        f"rss {result['peak_rss_mb']} MB"
+    )
+    if baseline is not None and baseline["posts_per_sec"]:
+        change = result["posts_per_sec"] / baseline["posts_per_sec"] - 1
+        line += f"  ({change:+.1%} posts/s vs baseline)"
+    print(line)
+
+
+async def run_isolated(args: argparse.Namespace, method: str, concurrency: int, paragraphs: int) -> dict:
+    """Run one scenario against its own stub; meant to be the only scenario in its process."""
+    server = MockWordPress(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                           error_status=args.error_status, seed=args.seed)
+    await server.start()
+    try:
+        return await run_scenario(
+            server, method, concurrency, paragraphs, args.posts, RetryPolicy(base_delay=args.retry_base_delay),
+            args.gzip, args.batch_writes
+        )
+    finally:
+        await server.stop()
+
+
+def run_subprocess(method: str, concurrency: int, paragraphs: int) -> dict:
+    """Run one scenario in a fresh interpreter with this run's options and return its result."""
+    completed = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_publish", *sys.argv[1:],
+         "--scenario", method, str(concurrency), str(paragraphs)],
+        cwd=REPO_ROOT, stdout=subprocess.PIPE, check=True, text=True
+    )
+    return json.loads(completed.stdout.splitlines()[-1])
+
+
+def main(args: argparse.Namespace) -> dict:
+    baseline = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = {scenario_key(r): r for r in json.load(f)["results"]}
+
+    results = []
+    for method in args.methods:
+        for paragraphs in args.sizes:
+            for concurrency in args.concurrency:
+                result = run_subprocess(method, concurrency, paragraphs)
+                results.append(result)
+                print_result(result, baseline.get(scenario_key(result)))
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "latency": args.latency,
+            "jitter": args.jitter,
+            "error_rate": args.error_rate,
+            "error_status": args.error_status,
+            "seed": args.seed,
+            "gzip": args.gzip,
+            "batch_writes": args.batch_writes,
+        },
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--posts", type=int, default=200, help="Posts published per scenario")
+    parser.add_argument("--methods", nargs="+", choices=METHODS, default=list(METHODS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 200],
+                        help="Article sizes in <h2>+<p> paragraph pairs")
+    parser.add_argument("--latency", type=float, default=0.005, help="Stub server latency per request (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random latency per request, up to (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Fraction of REST requests failed with --error-status")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--retry-base-delay", type=float, default=0.01,
+                        help="Retry backoff base delay, lowered from the default so injected errors do not dominate")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--gzip", action="store_true", help="Send large JSON bodies gzip-compressed")
+    parser.add_argument("--batch-writes", action="store_true",
+                        help="Coalesce writes into /wp-json/batch/v1 requests")
+    parser.add_argument("--output", default="bench-results.json", help="JSON file results are written to")
+    parser.add_argument("--compare", default=None, help="Earlier results file to compare posts/s against")
+    parser.add_argument("--scenario", nargs=3, metavar=("METHOD", "CONCURRENCY", "PARAGRAPHS"),
+                        help="Run only this scenario in this process and print its result as JSON (used internally)")
+    args = parser.parse_args()
+
+    if args.scenario:
+        method, concurrency, paragraphs = args.scenario
+        print(json.dumps(asyncio.run(run_isolated(args, method, int(concurrency), int(paragraphs)))))
+        sys.exit(0)
+
+    report = main(args)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
@@ -0,0 +1,105 @@
+"""
+Benchmark: inline Elementor layout versus library template references.
+
+Publishes the same Elementor posts twice per article size against a fresh
+``MockWordPress``: once with every widget embedded in ``_elementor_data`` and
+once with the static widgets saved to the Elementor library and referenced
+as global widgets. Reports the stored ``_elementor_data`` bytes per post (what
+WordPress keeps and parses for every post), request bytes sent per post,
+p50/p99 publish latency and posts/sec. The one-off template sync and creation
+happen before timing starts and are reported separately.
+
+    python -m benchmarks.bench_templates [--posts 200 --sizes 0 10 200 --latency 0.005]
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+from benchmarks.bench_publish import percentile, sample_article
+from benchmarks.mock_wordpress import MockWordPress
+from metrics import Metrics
+from taxonomy_cache import TaxonomyCache
+from template_library import TemplateLibrary
+from wordpress_service import WordPressService
+
+
+async def run_scenario(args: argparse.Namespace, paragraphs: int, templates: bool, cache_dir: str) -> dict:
+    server = MockWordPress(latency=args.latency)
+    await server.start()
+    metrics = Metrics()
+    service = WordPressService(
+        server.base_url, "bench", "password",
+        taxonomy_cache=TaxonomyCache(),
+        metrics=metrics,
+        template_library=TemplateLibrary(str(Path(cache_dir) / f"templates-{paragraphs}.json")) if templates else None
+    )
+    content_html = sample_article(paragraphs)
+    faq_items = [{"question": f"Question {i}?", "answer": f"Answer {i}."} for i in range(5)]
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies: List[float] = []
+    setup_requests = 0
+
+    async def publish(i: int):
+        async with semaphore:
+            started = time.perf_counter()
+            await service.publish_elementor_widgets_meta(content_html, faq_items, title=f"Post {i}")
+            latencies.append(time.perf_counter() - started)
+
+    try:
+        await service.ensure_session()
+        if templates:
+            server.reset_stats()
+            await service.use_templates()
+            setup_requests = server.total_requests
+        metrics.reset()
+        started = time.perf_counter()
+        await asyncio.gather(*(publish(i) for i in range(args.posts)))
+        elapsed = time.perf_counter() - started
+    finally:
+        await service.close()
+        await server.stop()
+
+    stored = sum(len(post["meta"].get("_elementor_data", "").encode()) for post in server.posts.values())
+    sent = sum(metrics.counters.get("wpep_request_bytes_total", {}).values())
+    p50, p99 = percentile(latencies, 0.5), percentile(latencies, 0.99)
+    return {
+        "mode": "templates" if templates else "inline",
+        "paragraphs": paragraphs,
+        "elementor_data_bytes_per_post": round(stored / args.posts),
+        "bytes_sent_per_post": round(sent / args.posts),
+        "p50_ms": round(p50 * 1000, 2),
+        "p99_ms": round(p99 * 1000, 2),
+        "posts_per_sec": round(args.posts / elapsed, 2),
+        "setup_requests": setup_requests,
+    }
+
+
+def print_result(result: dict, inline: dict):
+    saved = 1 - result["elementor_data_bytes_per_post"] / inline["elementor_data_bytes_per_post"]
+    print(
+        f"{result['paragraphs']:4} paras {result['mode']:>9}  "
+        f"_elementor_data {result['elementor_data_bytes_per_post']:7} B ({saved:6.1%} smaller)  "
+        f"sent {result['bytes_sent_per_post']:7} B  p50 {result['p50_ms']:7.2f} ms  p99 {result['p99_ms']:7.2f} ms  "
+        f"{result['posts_per_sec']:8.1f} posts/s  setup {result['setup_requests']} req"
+    )
+
+
+async def main(args: argparse.Namespace):
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for paragraphs in args.sizes:
+            inline = await run_scenario(args, paragraphs, templates=False, cache_dir=cache_dir)
+            print_result(inline, inline)
+            print_result(await run_scenario(args, paragraphs, templates=True, cache_dir=cache_dir), inline)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--posts", type=int, default=200, help="Posts published per scenario")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[0, 10, 200],
+                        help="Article sizes in <h2>+<p> paragraph pairs")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.005, help="Stub server latency per request (s)")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,447 @@
+"""
+In-process stub of the WordPress endpoints used by WordPressService.
+
+A small asyncio HTTP/1.1 server (keep-alive, Content-Length and chunked
+bodies) implementing ``/wp-login.php`` and the ``/wp-json/wp/v2`` posts, users/me,
+categories, tags and media upload routes well enough to drive the service.
+It counts connections and requests per route so benchmarks can report
+connection churn and requests per post. With ``capacity`` it behaves like a
+saturating PHP-FPM pool: requests beyond the worker count queue up, and
+beyond the backlog they are rejected. Published posts are also served at
+their ``/?p=<id>`` links, with a page cache and Elementor CSS generated on
+the first views, and ``elementor_library`` templates can be listed (with an
+ETag), created and deleted.
+
+    server = MockWordPress(latency=0.02, error_rate=0.05)
+    base_url = await server.start()
+    ...
+    await server.stop()
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import random
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+
+_REASONS = {200: "OK", 201: "Created", 207: "Multi-Status", 304: "Not Modified", 400: "Bad Request", 404: "Not Found", 429: "Too Many Requests",
+            500: "Internal Server Error", 502: "Bad Gateway", 503: "Service Unavailable"}
+_ITEM = re.compile(r"^/wp-json/wp/v2/(posts|categories|tags)/(\d+)$")
+_COLLECTION = re.compile(r"^/wp-json/wp/v2/(posts|categories|tags)$")
+_POST_CSS = re.compile(r"^/wp-content/uploads/elementor/css/post-(\d+)\.css$")
+
+
+class MockWordPress:
+    """Stub WordPress server.
+
+    Args:
+        latency: Seconds each request waits before responding
+        host: Interface to bind
+        port: Port to bind, 0 for an ephemeral one
+        jitter: Extra random delay of up to this many seconds per request
+        error_rate: Fraction of REST requests answered with ``error_status``
+            instead of being handled (login is never failed)
+        error_status: Status code used for injected errors
+        seed: Seed for the latency and error randomness
+        capacity: Requests served at once (PHP workers); others wait their turn.
+            None serves every request immediately
+        backlog: Requests allowed to wait for a worker; more are answered
+            with ``overload_status`` at once
+        overload_status: Status returned when the backlog is full
+        accept_gzip: Decompress ``Content-Encoding: gzip`` bodies; otherwise
+            answer them like WordPress does without an input filter
+        batch: Serve ``/wp-json/batch/v1`` (WordPress 5.6+) with this many
+            sub-requests at most; 0 for a site without it
+        render_latency: Extra seconds a page view takes while the page is not
+            in the page cache (a post is cached by its first view and
+            evicted when it is updated)
+        css_after_views: Views of an Elementor post rendered with inline
+            styles before its CSS file exists
+        library_meta: Store the meta of created library templates; False acts
+            like a site where it is not registered for REST (e.g. no Elementor Pro)
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        seed: Optional[int] = None,
+        capacity: Optional[int] = None,
+        backlog: int = 0,
+        overload_status: int = 503,
+        accept_gzip: bool = True,
+        batch: int = 25,
+        render_latency: float = 0.0,
+        css_after_views: int = 1,
+        library_meta: bool = True
+    ):
+        self.latency = latency
+        self.host = host
+        self.port = port
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self._random = random.Random(seed)
+        self.capacity = capacity
+        self.backlog = backlog
+        self.overload_status = overload_status
+        self.accept_gzip = accept_gzip
+        self.body_bytes = 0
+        self.batch = batch
+        self.subrequests = 0
+        self.render_latency = render_latency
+        self.css_after_views = css_after_views
+        self.library_meta = library_meta
+        self.page_views: Counter = Counter()
+        self.page_cache: set = set()
+        self._workers = asyncio.Semaphore(capacity) if capacity else None
+        self._active = 0
+        self.peak_active = 0
+        self.connections = 0
+        self.injected_errors = 0
+        self.overloaded = 0
+        self.requests: Counter = Counter()
+        self.posts: Dict[int, dict] = {}
+        self.terms: Dict[str, List[dict]] = {"categories": [], "tags": []}
+        self.media: Dict[int, dict] = {}
+        self.templates: Dict[int, dict] = {}
+        self._next_id = 1
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: Dict[asyncio.Task, asyncio.StreamWriter] = {}
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self) -> str:
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.base_url
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            for writer in self._connections.values():
+                writer.close()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+
+    def reset_stats(self):
+        self.connections = 0
+        self.injected_errors = 0
+        self.overloaded = 0
+        self.peak_active = 0
+        self.body_bytes = 0
+        self.subrequests = 0
+        self.requests.clear()
+
+    @property
+    def total_requests(self) -> int:
+        """Requests handled, counting each batch sub-request separately."""
+        return sum(self.requests.values())
+
+    @property
+    def round_trips(self) -> int:
+        """HTTP requests handled, counting a batch once."""
+        return self.total_requests - self.subrequests
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        self._connections[asyncio.current_task()] = writer
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, target, headers, body = request
+                self.body_bytes += len(body)
+                delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+                delay += self._render_delay(target)
+                if self._workers is not None and self._active >= self.capacity + self.backlog:
+                    self.overloaded += 1
+                    status, extra_headers = self.overload_status, []
+                    payload = {"code": "overloaded", "message": "Server busy", "data": {"status": status}}
+                else:
+                    await self._serve(delay)
+                    if self.error_rate and target.startswith("/wp-json/") and self._random.random() < self.error_rate:
+                        self.injected_errors += 1
+                        status, extra_headers = self.error_status, []
+                        payload = {"code": "injected_error", "message": "Injected failure", "data": {"status": status}}
+                    else:
+                        status, payload, extra_headers = self.handle(method, target, headers, body)
+                data = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+                keep_alive = headers.get("connection", "").lower() != "close"
+                head = [f"HTTP/1.1 {status} {_REASONS.get(status, 'OK')}",
+                        "Content-Type: application/json; charset=UTF-8",
+                        f"Content-Length: {len(data)}",
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+                head.extend(f"{name}: {value}" for name, value in extra_headers)
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._connections.pop(asyncio.current_task(), None)
+            writer.close()
+
+    async def _serve(self, delay: float):
+        """Wait for a worker (with ``capacity``) and the request's latency."""
+        self._active += 1
+        self.peak_active = max(self.peak_active, self._active)
+        try:
+            if self._workers is None:
+                if delay:
+                    await asyncio.sleep(delay)
+            else:
+                async with self._workers:
+                    await asyncio.sleep(delay)
+        finally:
+            self._active -= 1
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Tuple[str, str, dict, bytes]]:
+        line = await reader.readline()
+        if not line:
+            return None
+        method, target, _ = line.decode("latin-1").split(" ", 2)
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+            body = b"".join(chunks)
+        else:
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+        return method, target, headers, body
+
+    def _page_id(self, target: str) -> Optional[int]:
+        url = urlsplit(target)
+        if url.path != "/":
+            return None
+        post_id = parse_qs(url.query).get("p", [""])[0]
+        return int(post_id) if post_id.isdigit() else None
+
+    def _render_delay(self, target: str) -> float:
+        """Extra latency of an uncached page view."""
+        post_id = self._page_id(target)
+        if post_id is None or post_id not in self.posts or post_id in self.page_cache:
+            return 0.0
+        return self.render_latency
+
+    def _render_page(self, post: dict) -> bytes:
+        post_id = post["id"]
+        self.page_views[post_id] += 1
+        head = ""
+        css_ready = self.page_views[post_id] > self.css_after_views
+        elementor = post["meta"].get("_elementor_edit_mode") == "builder"
+        if elementor:
+            if css_ready:
+                head = (f"<link rel='stylesheet' id='elementor-post-{post_id}-css' "
+                        f"href='{self.base_url}/wp-content/uploads/elementor/css/post-{post_id}.css?ver=1' media='all' />")
+            else:
+                head = f"<style id='elementor-post-{post_id}'>/* generated inline */</style>"
+        # A page rendered before its CSS exists is not cached
+        if css_ready or not elementor:
+            self.page_cache.add(post_id)
+        return f"<html><head>{head}</head><body>{post.get('content', '')}</body></html>".encode()
+
+    def _new_id(self) -> int:
+        self._next_id += 1
+        return self._next_id - 1
+
+    def handle(self, method: str, target: str, headers: dict, body: bytes) -> Tuple[int, object, List[Tuple[str, str]]]:
+        """Route one request; returns ``(status, payload, extra headers)``."""
+        url = urlsplit(target)
+        path = url.path
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if headers.get("content-encoding") == "gzip":
+            if not self.accept_gzip:
+                self.requests[(method, path)] += 1
+                return 400, {"code": "rest_invalid_json", "message": "Invalid JSON body passed.",
+                             "data": {"status": 400}}, []
+            body = gzip.decompress(body)
+
+        if path == "/wp-login.php":
+            self.requests[(method, "/wp-login.php")] += 1
+            if method == "POST":
+                return 200, b"", [("Set-Cookie", "wordpress_logged_in_mock=1; Path=/")]
+            return 200, b"", [("Set-Cookie", "wordpress_test_cookie=WP%20Cookie%20check; Path=/")]
+
+        if path == "/wp-json/batch/v1" and self.batch:
+            self.requests[(method, path)] += 1
+            if method == "OPTIONS":
+                return 200, {"namespace": "batch/v1", "methods": ["POST"], "endpoints": [
+                    {"methods": ["POST"], "args": {"requests": {"type": "array", "maxItems": self.batch}}}
+                ]}, []
+            requests = json.loads(body or b"{}").get("requests", [])
+            if len(requests) > self.batch:
+                return 400, {"code": "rest_invalid_param", "message": "Invalid parameter(s): requests",
+                             "data": {"status": 400}}, []
+            responses = []
+            for sub in requests:
+                self.subrequests += 1
+                status, payload, extra_headers = self.handle(
+                    sub.get("method", "POST"), "/wp-json" + sub["path"], {},
+                    json.dumps(sub.get("body", {})).encode()
+                )
+                responses.append({"body": payload, "status": status, "headers": dict(extra_headers)})
+            return 207, {"responses": responses}, []
+
+        post_id = self._page_id(target)
+        if post_id is not None:
+            self.requests[(method, "/?p=<id>")] += 1
+            post = self.posts.get(post_id)
+            if post is None or post.get("status") != "publish":
+                return 404, b"<html><body>Not found</body></html>", []
+            return 200, self._render_page(post), []
+
+        match = _POST_CSS.match(path)
+        if match:
+            self.requests[(method, "/wp-content/uploads/elementor/css/post-<id>.css")] += 1
+            post_id = int(match.group(1))
+            if post_id in self.posts and self.page_views[post_id] > self.css_after_views:
+                return 200, b".elementor{}", []
+            return 404, b"", []
+
+        if path == "/wp-json/wp/v2/elementor_library":
+            self.requests[(method, path)] += 1
+            return self._handle_library(method, query, headers, body)
+        if path.startswith("/wp-json/wp/v2/elementor_library/") and method == "DELETE":
+            self.requests[(method, "/wp-json/wp/v2/elementor_library/<id>")] += 1
+            template = self.templates.pop(int(path.rsplit("/", 1)[1]), None)
+            if template is None:
+                return 404, {"code": "rest_post_invalid_id", "data": {"status": 404}}, []
+            return 200, {"deleted": True, "previous": self._template_response(template)}, []
+
+        if path == "/wp-json/wp/v2/users/me":
+            self.requests[(method, path)] += 1
+            return 200, {"id": 1, "name": "mock"}, []
+
+        if path == "/wp-json/wp/v2/media" and method == "POST":
+            self.requests[(method, path)] += 1
+            filename = re.search(r'filename="?([^";]+)', headers.get("content-disposition", ""))
+            filename = filename.group(1) if filename else "upload"
+            item = {"id": self._new_id(), "source_url": f"{self.base_url}/wp-content/uploads/{filename}",
+                    "mime_type": headers.get("content-type", ""), "size": len(body)}
+            self.media[item["id"]] = item
+            return 201, item, []
+
+        match = _ITEM.match(path)
+        if match:
+            kind, item_id = match.group(1), int(match.group(2))
+            self.requests[(method, f"/wp-json/wp/v2/{kind}/<id>")] += 1
+            if kind == "posts" and item_id in self.posts:
+                post = self.posts[item_id]
+                if method == "POST":
+                    self._apply_post_fields(post, json.loads(body or b"{}"))
+                    self.page_cache.discard(item_id)
+                    self.page_views.pop(item_id, None)
+                return 200, self._post_response(post), []
+            return 404, {"code": "rest_post_invalid_id", "message": "Invalid post ID.", "data": {"status": 404}}, []
+
+        match = _COLLECTION.match(path)
+        if not match:
+            self.requests[(method, path)] += 1
+            return 404, {"code": "rest_no_route", "message": "No route was found.", "data": {"status": 404}}, []
+
+        kind = match.group(1)
+        self.requests[(method, f"/wp-json/wp/v2/{kind}")] += 1
+        if kind == "posts":
+            if method == "POST":
+                post = {"id": self._new_id(), "title": "", "content": "", "status": "draft", "meta": {}}
+                self._apply_post_fields(post, json.loads(body or b"{}"))
+                self.posts[post["id"]] = post
+                return 201, self._post_response(post), []
+            posts = list(self.posts.values())
+            if "slug" in query:
+                posts = [post for post in posts if post.get("slug") == query["slug"]]
+            if "status" in query:
+                statuses = query["status"].split(",")
+                posts = [post for post in posts if post.get("status") in statuses]
+            keep = {name.split(".")[0] for name in query["_fields"].split(",")} if "_fields" in query else None
+
+            def render(post: dict) -> dict:
+                response = self._post_response(post)
+                return response if keep is None else {k: v for k, v in response.items() if k in keep}
+
+            return self._page(posts, query, render)
+
+        terms = self.terms[kind]
+        if method == "POST":
+            name = json.loads(body or b"{}").get("name", "")
+            for term in terms:
+                if term["name"].lower() == name.lower():
+                    return 400, {"code": "term_exists", "message": "A term with the name provided already exists.",
+                                 "data": {"status": 400, "term_id": term["id"]}}, []
+            term = {"id": self._new_id(), "name": name}
+            terms.append(term)
+            return 201, term, []
+        if "search" in query:
+            terms = [term for term in terms if query["search"].lower() in term["name"].lower()]
+        return self._page(terms, query, dict)
+
+    def _handle_library(self, method: str, query: dict, headers: dict,
+                        body: bytes) -> Tuple[int, object, List[Tuple[str, str]]]:
+        if method == "POST":
+            fields = json.loads(body or b"{}")
+            template = {"id": self._new_id(), "title": fields.get("title", ""), "status": fields.get("status", "draft"),
+                        "meta": fields.get("meta", {}) if self.library_meta else {}, "modified_gmt": f"2025-01-01T00:00:{len(self.templates):02d}"}
+            self.templates[template["id"]] = template
+            return 201, self._template_response(template), []
+        search = query.get("search", "").lower()
+        templates = [t for t in self.templates.values() if search in t["title"].lower()]
+        state = json.dumps([(t["id"], t["title"], t["modified_gmt"]) for t in templates])
+        etag = f'"{hashlib.md5(state.encode()).hexdigest()}"'
+        if headers.get("if-none-match") == etag:
+            return 304, b"", [("ETag", etag)]
+        status, page, extra_headers = self._page(templates, query, self._template_response)
+        return status, page, extra_headers + [("ETag", etag)]
+
+    @staticmethod
+    def _template_response(template: dict) -> dict:
+        return {**template, "title": {"rendered": template["title"]}}
+
+    def _page(self, items: list, query: dict, render) -> Tuple[int, object, List[Tuple[str, str]]]:
+        per_page = int(query.get("per_page", 10))
+        page = int(query.get("page", 1))
+        total_pages = max(1, -(-len(items) // per_page))
+        if page > total_pages:
+            return 400, {"code": "rest_post_invalid_page_number", "data": {"status": 400}}, []
+        chunk = [render(item) for item in items[(page - 1) * per_page:page * per_page]]
+        return 200, chunk, [("X-WP-Total", str(len(items))), ("X-WP-TotalPages", str(total_pages))]
+
+    @staticmethod
+    def _apply_post_fields(post: dict, fields: dict):
+        meta = fields.pop("meta", None)
+        post.update(fields)
+        if meta:
+            post["meta"].update(meta)
+
+    def _post_response(self, post: dict) -> dict:
+        response = dict(post)
+        response["title"] = {"rendered": post.get("title", "")}
+        response["content"] = {"rendered": post.get("content", "")}
+        response["link"] = f"{self.base_url}/?p={post['id']}"
+        return response
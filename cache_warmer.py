@@ -0,0 +1,236 @@
+"""
+Post-publish cache warming.
+
+Publishing an Elementor post clears ``_elementor_css``, so the first view of
+the page renders it from scratch and regenerates the post's CSS file. Without
+warming, that first view is a real visitor's or a search crawler's.
+``CacheWarmer`` fetches each newly published page right after the publish
+returns, as an anonymous visitor (no session cookies, which page caches
+bypass), so the slow render happens here instead.
+
+For Elementor posts the page is re-fetched until it links the generated
+``/elementor/css/post-<id>.css`` file and that file loads; until then
+Elementor serves the styles inline or not at all. Each page's cold
+time-to-first-byte (the uncached render) and warm TTFB (what visitors get
+afterwards) are recorded in the results and as metrics.
+
+Fetches run in the background with bounded concurrency and a per-host rate
+limit of their own, so warming never uses the publish rate limit. A URL is
+not warmed again while it is among the last ``max_seen`` submitted. Only the
+last ``max_results`` results are kept, so a long-running daemon's warmer
+stays bounded; ``summary`` counts every page.
+"""
+import asyncio
+import logging
+import re
+import time
+from collections import OrderedDict, deque
+from dataclasses import asdict, dataclass
+from typing import Deque, Dict, List, Optional, Set, Tuple
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+import httpx
+
+from metrics import DEFAULT_METRICS, Metrics
+from rate_limit import RateLimiter, host_of
+
+# Stylesheet Elementor writes for a post once its CSS is generated
+_POST_CSS = re.compile(r"""href=["']([^"']*/elementor/css/post-\d+\.css[^"']*)["']""")
+
+
+@dataclass
+class WarmResult:
+    """Outcome of warming one page.
+
+    ``css_ready`` is None for pages that are not Elementor posts.
+    """
+    url: str
+    status: Optional[int] = None
+    cold_ttfb: Optional[float] = None
+    warm_ttfb: Optional[float] = None
+    css_ready: Optional[bool] = None
+    attempts: int = 0
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.status is not None and self.status < 400 and self.css_ready is not False
+
+    def as_dict(self) -> dict:
+        return {**asdict(self), "ok": self.ok}
+
+
+def _normalize(url: str) -> str:
+    parts = urlsplit(url)
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or "/", parts.query, ""))
+
+
+class CacheWarmer:
+    """Fetches published pages in the background to warm page caches and Elementor CSS.
+
+    Args:
+        concurrency: Page and CSS fetches in flight across all hosts
+        rate_limit: Fetches started per second per host (None for no limit)
+        warm_fetches: Fetches after the page is ready; the fastest is its warm TTFB
+        css_retries: Re-fetches of an Elementor page whose CSS is not generated yet
+        css_retry_delay: Seconds before the first re-fetch; doubled after each
+        timeout: Per-request timeout in seconds
+        metrics: Registry for the ``wpep_warm_*`` metrics (default: the process-wide one)
+        client: Client to fetch with (default: a cookie-less client owned by the warmer)
+        max_results: Most recent results kept in ``results`` (and for TTFB percentiles)
+        max_seen: Most recent URLs remembered to skip duplicate submissions
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 4,
+        rate_limit: Optional[float] = 2.0,
+        warm_fetches: int = 1,
+        css_retries: int = 3,
+        css_retry_delay: float = 2.0,
+        timeout: float = 30.0,
+        metrics: Optional[Metrics] = None,
+        client: Optional[httpx.AsyncClient] = None,
+        max_results: int = 10_000,
+        max_seen: int = 10_000
+    ):
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        self.concurrency = concurrency
+        self.rate_limit = rate_limit
+        self.warm_fetches = warm_fetches
+        self.css_retries = css_retries
+        self.css_retry_delay = css_retry_delay
+        self.metrics = metrics or DEFAULT_METRICS
+        self.logger = logging.getLogger(__name__)
+        self.owns_client = client is None
+        self.client = client or httpx.AsyncClient(
+            timeout=timeout,
+            follow_redirects=True,
+            headers={"User-Agent": "wp-elementor-post cache warmer"}
+        )
+        self.max_seen = max_seen
+        self.results: Deque[WarmResult] = deque(maxlen=max_results)
+        # Totals over every page warmed, including results no longer kept
+        self._totals = {"pages": 0, "warmed": 0, "failed": 0, "css_missing": 0, "css_retries": 0}
+        self._slots = asyncio.Semaphore(concurrency)
+        self._limiters: Dict[str, RateLimiter] = {}
+        # URL -> None, oldest first, trimmed to ``max_seen``
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def submit(self, url: str, expect_css: bool = False) -> bool:
+        """Warm ``url`` in the background unless it was already submitted.
+
+        Args:
+            url: Page URL, e.g. the ``link`` of a published post
+            expect_css: The page is an Elementor post; wait for its CSS file
+
+        Returns:
+            False if the URL was a duplicate
+        """
+        key = _normalize(url)
+        if key in self._seen:
+            self._seen.move_to_end(key)
+            return False
+        self._seen[key] = None
+        while len(self._seen) > self.max_seen:
+            self._seen.popitem(last=False)
+        task = asyncio.create_task(self.warm(url, expect_css))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def _fetch(self, url: str, read_body: bool = True) -> Tuple[int, float, str]:
+        """GET ``url`` within the concurrency and rate limits; returns (status, TTFB, body)."""
+        host = host_of(url)
+        limiter = self._limiters.get(host)
+        if limiter is None and self.rate_limit:
+            limiter = self._limiters[host] = RateLimiter(self.rate_limit)
+        async with self._slots:
+            if limiter is not None:
+                await limiter.acquire()
+            started = time.perf_counter()
+            async with self.client.stream("GET", url) as response:
+                ttfb = time.perf_counter() - started
+                body = (await response.aread()).decode(response.encoding or "utf-8", "replace") if read_body else ""
+        return response.status_code, ttfb, body
+
+    async def _css_ready(self, page_url: str, html: str) -> bool:
+        stylesheets = {urljoin(page_url, href) for href in _POST_CSS.findall(html)}
+        if not stylesheets:
+            return False
+        statuses = await asyncio.gather(*(self._fetch(href, read_body=False) for href in stylesheets))
+        return all(status == 200 for status, _, _ in statuses)
+
+    async def warm(self, url: str, expect_css: bool = False) -> WarmResult:
+        """Warm one page now and return its result (also kept in ``results``, up to ``max_results``)."""
+        result = WarmResult(url=url)
+        try:
+            delay = self.css_retry_delay
+            while True:
+                result.attempts += 1
+                status, ttfb, html = await self._fetch(url)
+                result.status = status
+                if result.cold_ttfb is None:
+                    result.cold_ttfb = ttfb
+                    self.metrics.observe("wpep_warm_ttfb_seconds", ttfb, phase="cold")
+                if status >= 400 or not expect_css:
+                    break
+                result.css_ready = await self._css_ready(url, html)
+                if result.css_ready or result.attempts > self.css_retries:
+                    break
+                self.logger.info(f"Elementor CSS for {url} not generated yet; retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                delay *= 2
+
+            if status < 400:
+                for _ in range(self.warm_fetches):
+                    _, ttfb, _ = await self._fetch(url, read_body=False)
+                    result.warm_ttfb = ttfb if result.warm_ttfb is None else min(result.warm_ttfb, ttfb)
+                if result.warm_ttfb is not None:
+                    self.metrics.observe("wpep_warm_ttfb_seconds", result.warm_ttfb, phase="warm")
+        except httpx.HTTPError as e:
+            result.error = f"{type(e).__name__}: {e}"
+        if not result.ok:
+            self.logger.warning(
+                f"Could not warm {url}: {result.error or f'HTTP {result.status}'}"
+                + (" (Elementor CSS missing)" if result.css_ready is False else "")
+            )
+        self.metrics.inc("wpep_warm_pages_total", outcome="ok" if result.ok else "error")
+        self.results.append(result)
+        self._totals["pages"] += 1
+        self._totals["warmed" if result.ok else "failed"] += 1
+        self._totals["css_missing"] += result.css_ready is False
+        self._totals["css_retries"] += max(0, result.attempts - 1)
+        return result
+
+    async def drain(self) -> List[WarmResult]:
+        """Wait for every submitted page; returns the kept results."""
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        return list(self.results)
+
+    def summary(self) -> dict:
+        """Page counts since the warmer started; p50/p95 cold and warm TTFB (ms) of the kept results."""
+        def ms(values: List[float], q: float) -> Optional[float]:
+            if not values:
+                return None
+            ordered = sorted(values)
+            return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 1)
+
+        cold = [r.cold_ttfb for r in self.results if r.cold_ttfb is not None]
+        warm = [r.warm_ttfb for r in self.results if r.warm_ttfb is not None]
+        return {
+            **self._totals,
+            "cold_ttfb_p50_ms": ms(cold, 0.5),
+            "cold_ttfb_p95_ms": ms(cold, 0.95),
+            "warm_ttfb_p50_ms": ms(warm, 0.5),
+            "warm_ttfb_p95_ms": ms(warm, 0.95),
+        }
+
+    async def close(self):
+        """Finish submitted pages and close the warmer's own client."""
+        await self.drain()
+        if self.owns_client:
+            await self.client.aclose()
@@ -0,0 +1,282 @@
+"""
+Offline render stage: article specs to spooled REST payloads.
+
+Rendering (HTML preprocessing, the Elementor tree, FAQ tabs and JSON
+encoding) is CPU work. ``compile_specs`` runs it on a process pool across
+all cores and spools the final payloads to a (gzip) JSONL file, one
+``CompiledPost`` per line. ``iter_compiled`` streams them back, and
+``WordPressService.publish_spec``/``publish_many`` publish them with no
+rendering at all, so the event loop only drives HTTP:
+
+    compile_specs(iter_jsonl(open("articles.jsonl")), "articles.compiled.jsonl.gz")
+    ...
+    async for result in service.publish_many(iter_compiled("articles.compiled.jsonl.gz")):
+        ...
+
+The payload builders are also used by the inline publish methods, so a
+compiled post is what those would send, with two exceptions: images are
+never uploaded, and the layout only references Elementor library templates
+if ``compile_specs`` is given such a layout (from
+``WordPressService.use_templates``). Specs with local images, or any images
+when compiling with ``upload_images``, are rejected instead of being
+published with broken sources.
+"""
+import gzip
+import json
+import logging
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+from content_pipeline import ContentPipeline
+from elementor_layout import DEFAULT_LAYOUT, ElementorLayout
+from media import scan_images
+from models.content import ArticleSpec, CompiledPost
+from publish_journal import spec_key
+from request_body import dumps_bytes
+
+logger = logging.getLogger(__name__)
+
+
+def article_payload(
+    title: str,
+    content: str,
+    status: str = "publish",
+    publish_date: Optional[str] = None,
+    meta_description: Optional[str] = None,
+    excerpt: Optional[str] = None,
+    slug: Optional[str] = None
+) -> dict:
+    """REST payload of a plain article, without taxonomy IDs."""
+    post_data = {
+        "title": title,
+        "content": content,
+        "status": status
+    }
+    # Add scheduled publish date if provided
+    if publish_date:
+        post_data["date"] = publish_date
+    # Add excerpt if provided
+    if excerpt:
+        post_data["excerpt"] = excerpt
+    # Send the AIOSEO description with the post instead of a separate update
+    if meta_description:
+        post_data["meta"] = {"_aioseo_description": meta_description}
+    if slug:
+        post_data["slug"] = slug
+    return post_data
+
+
+def elementor_payload(
+    content_html: str,
+    faq_items: List[dict],
+    title: str,
+    status: str = "publish",
+    publish_date: Optional[str] = None,
+    meta_description: Optional[str] = None,
+    excerpt: Optional[str] = None,
+    slug: Optional[str] = None,
+    layout: Optional[ElementorLayout] = None,
+    content_pipeline: Optional[ContentPipeline] = None
+) -> dict:
+    """REST payload of a TOC / content / FAQ Elementor post, without taxonomy IDs."""
+    layout = layout if layout is not None else DEFAULT_LAYOUT
+    toc_html = ""
+    if content_pipeline is not None:
+        processed = content_pipeline.process(content_html)
+        content_html, toc_html = processed.html, processed.toc_html()
+
+    # Prepare payload with FAQ Schema and publish status
+    payload = {
+        "title": title,
+        "status": status,
+        "content": "",
+        "meta": {
+            "_elementor_data": layout.render(content_html, faq_items, toc_html),
+            "_elementor_edit_mode": "builder",
+            "_elementor_version": "3.22.2",
+            "_elementor_css": "",  # Clear cached CSS
+        }
+    }
+    if meta_description:
+        payload["meta"]["_aioseo_description"] = meta_description
+    if publish_date:
+        payload["date"] = publish_date
+    if excerpt:
+        payload["excerpt"] = excerpt
+    if slug:
+        payload["slug"] = slug
+    return payload
+
+
+def check_images(content_html: str, upload_images: bool = False):
+    """Reject article HTML whose images a compiled post cannot carry.
+
+    Local paths only resolve on the machine publishing inline, and with
+    ``upload_images`` remote images would stay hotlinked instead of being
+    uploaded as ``publish_spec`` would. ``data:`` URIs are always fine.
+
+    Raises:
+        ValueError: Naming the first such image
+    """
+    for image in scan_images(content_html):
+        src = image.src
+        if src.startswith("data:"):
+            continue
+        if not src.startswith(("http://", "https://", "//")):
+            raise ValueError(f"Local image {src!r} cannot be compiled; publish this spec with batch --upload-images")
+        if upload_images:
+            raise ValueError(f"Image {src!r} would not be uploaded from a compiled post; publish this spec with batch")
+
+
+def compile_spec(
+    spec: ArticleSpec,
+    index: int = 0,
+    layout: Optional[ElementorLayout] = None,
+    content_pipeline: Optional[ContentPipeline] = None,
+    upload_images: bool = False
+) -> CompiledPost:
+    """Render one spec the way ``publish_spec`` would, without sending it.
+
+    As in ``publish_article``, only Elementor posts go through the content
+    pipeline. Specs ``check_images`` rejects raise ValueError.
+    """
+    check_images(spec.content, upload_images)
+    common = dict(
+        title=spec.title,
+        status=spec.status,
+        publish_date=spec.publish_date,
+        meta_description=spec.meta_description,
+        excerpt=spec.excerpt,
+        slug=spec.slug
+    )
+    if spec.faq_items is None:
+        kind, payload = "article", article_payload(content=spec.content, **common)
+    else:
+        kind = "elementor"
+        payload = elementor_payload(spec.content, spec.faq_items, layout=layout,
+                                    content_pipeline=content_pipeline, **common)
+    return CompiledPost(
+        index=index,
+        kind=kind,
+        payload=payload,
+        spec_digest=spec_key(spec),
+        categories=spec.categories,
+        tags=spec.tags,
+        slug=spec.slug,
+        external_id=spec.external_id
+    )
+
+
+# Per-process render state, set up once by the pool initializer
+_layout: Optional[ElementorLayout] = None
+_pipeline: Optional[ContentPipeline] = None
+_upload_images = False
+
+
+def _init_worker(layout: Optional[ElementorLayout], preprocess: bool, upload_images: bool):
+    global _layout, _pipeline, _upload_images
+    _layout = layout
+    _pipeline = ContentPipeline() if preprocess else None
+    _upload_images = upload_images
+
+
+def _compile_chunk(chunk: List[Tuple[int, Any]]) -> List[Tuple[int, Optional[bytes], Optional[str]]]:
+    """Compile a chunk of ``(index, spec or dict)`` into encoded lines or error messages."""
+    results = []
+    for index, raw in chunk:
+        try:
+            spec = raw if isinstance(raw, ArticleSpec) else ArticleSpec.from_dict(raw)
+            line = dumps_bytes(asdict(compile_spec(spec, index, _layout, _pipeline, _upload_images))) + b"\n"
+        except Exception as e:
+            results.append((index, None, f"{type(e).__name__}: {e}"))
+        else:
+            results.append((index, line, None))
+    return results
+
+
+def _chunks(specs: Iterable[Any], size: int) -> Iterator[List[Tuple[int, Any]]]:
+    chunk = []
+    for index, spec in enumerate(specs):
+        chunk.append((index, spec))
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def compile_specs(
+    specs: Iterable[Any],
+    path: str,
+    workers: Optional[int] = None,
+    chunk_size: int = 32,
+    layout: Optional[ElementorLayout] = None,
+    preprocess: bool = False,
+    upload_images: bool = False
+) -> Tuple[int, int]:
+    """
+    Render specs on a process pool and spool the payloads to a JSONL file.
+
+    Specs are read lazily and at most two chunks per worker are in flight,
+    so memory stays bounded for any input size. Lines are written in input
+    order. Paths ending in ``.gz`` are gzip-compressed. The file is written
+    under a temporary name and renamed when complete.
+
+    Args:
+        specs: ArticleSpec objects or dicts (e.g. parsed JSONL lines)
+        path: Output file
+        workers: Worker processes (default: one per CPU)
+        chunk_size: Specs sent to a worker at a time
+        layout: Elementor layout to render with (default: the standard one)
+        preprocess: Run article HTML through a ContentPipeline (pair it with
+            a ``static_toc`` layout, as the CLI's ``--preprocess-html`` does)
+        upload_images: The posts were meant to have their images uploaded;
+            specs with any image fail (see ``check_images``)
+
+    Returns:
+        ``(compiled, failed)`` counts; failed specs are logged and skipped
+    """
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    opener = gzip.open if path.suffix == ".gz" else open
+    workers = workers or os.cpu_count() or 1
+    compiled = failed = 0
+    try:
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(layout, preprocess, upload_images)) as pool, \
+                opener(tmp, "wb") as f:
+            pending = deque()
+            chunks = _chunks(specs, chunk_size)
+            while True:
+                while len(pending) < workers * 2:
+                    chunk = next(chunks, None)
+                    if chunk is None:
+                        break
+                    pending.append(pool.submit(_compile_chunk, chunk))
+                if not pending:
+                    break
+                for index, line, error in pending.popleft().result():
+                    if error is not None:
+                        logger.error(f"Spec {index} failed to compile: {error}")
+                        failed += 1
+                    else:
+                        f.write(line)
+                        compiled += 1
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    tmp.replace(path)
+    logger.info(f"Compiled {compiled} posts to {path} ({failed} failed)")
+    return compiled, failed
+
+
+def iter_compiled(path: str) -> Iterator[CompiledPost]:
+    """Stream the posts of a file written by ``compile_specs``."""
+    opener = gzip.open if Path(path).suffix == ".gz" else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield CompiledPost.from_dict(json.loads(line))
@@ -21,5 +21,15 @@ def get_config():
     return _config
 
 
+def get_site_configs():
+    """Return the list of site dicts to publish to.
 
-
+    Uses the ``sites`` list from the config file when present; otherwise the
+    flat ``base_url``/``username``/``password`` keys describe a single site.
+    """
+    config = get_config()
+    if config.get('sites'):
+        return list(config['sites'])
+    if config.get('base_url'):
+        return [config]
+    return []
@@ -0,0 +1,297 @@
+"""
+Single-pass HTML preprocessing for article content.
+
+``ContentPipeline`` streams the article through ``html.parser`` once,
+adding stable ids to headings, collecting the table of contents and
+optionally sanitizing and minifying the markup. Results are memoized by
+content hash, so republishing the same article costs a dictionary lookup.
+"""
+import hashlib
+import re
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from html import escape, unescape
+from html.parser import HTMLParser
+from typing import Iterable, List, Optional, Set, Tuple
+
+# Elements dropped with their content when sanitizing; SVG animations can set
+# an href to a script URL, which no attribute check would see
+_UNSAFE_ELEMENTS = {
+    "script", "style", "object", "embed", "applet", "base", "meta", "link",
+    "iframe", "frame", "frameset", "animate", "set", "animatemotion", "animatetransform"
+}
+# Attributes dropped whatever their value (srcdoc holds a whole HTML document)
+_UNSAFE_ATTRIBUTES = {"srcdoc"}
+# Attributes whose value is a URL and must not use a script scheme
+_URL_ATTRIBUTES = {"href", "src", "action", "formaction", "xlink:href", "poster"}
+_SCRIPT_SCHEME = re.compile(r"^(javascript|vbscript|data:text/html)", re.IGNORECASE)
+# Browsers ignore these anywhere in a URL scheme, so "java&#x09;script:" still runs
+_SCHEME_NOISE = re.compile(r"[\x00-\x20\x7f]+")
+# id attributes anywhere in the document, reserved before heading anchors are generated
+_ID_ATTRIBUTE = re.compile(r"""\sid\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))""", re.IGNORECASE)
+# Elements whose text must keep its whitespace
+_PREFORMATTED = {"pre", "textarea"}
+_RAW_TEXT = {"script", "style"}
+_VOID_ELEMENTS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "source", "track", "wbr"
+}
+# Whitespace between two of these is not rendered and can be dropped
+_BLOCK_ELEMENTS = {
+    "address", "article", "aside", "blockquote", "body", "dd", "details", "div", "dl", "dt",
+    "figcaption", "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "head",
+    "header", "hr", "html", "li", "main", "nav", "ol", "p", "pre", "section", "summary",
+    "table", "tbody", "td", "tfoot", "th", "thead", "tr", "ul"
+}
+_WHITESPACE = re.compile(r"[ \t\n\r\f]+")
+
+
+def slugify(text: str) -> str:
+    """ASCII anchor slug for a heading, e.g. ``"Qué es?"`` -> ``"que-es"``."""
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-") or "section"
+
+
+def _existing_ids(content_html: str) -> Set[str]:
+    """Every ``id`` attribute value in the markup."""
+    return {
+        unescape(next((value for value in match.groups() if value is not None), ""))
+        for match in _ID_ATTRIBUTE.finditer(content_html)
+    }
+
+
+@dataclass
+class TocEntry:
+    """One heading in the table of contents."""
+    level: int
+    text: str
+    anchor: str
+
+
+@dataclass
+class ProcessedContent:
+    """Output of ``ContentPipeline.process``."""
+    html: str
+    toc: List[TocEntry] = field(default_factory=list)
+    digest: str = ""
+
+    def toc_html(self) -> str:
+        """Nested ordered list linking to every heading."""
+        if not self.toc:
+            return ""
+        parts: List[str] = []
+        stack: List[int] = []
+        for entry in self.toc:
+            if not stack or entry.level > stack[-1]:
+                parts.append("<ol>")
+                stack.append(entry.level)
+            else:
+                while len(stack) > 1 and entry.level < stack[-1]:
+                    parts.append("</li></ol>")
+                    stack.pop()
+                parts.append("</li>")
+            parts.append(f'<li><a href="#{escape(entry.anchor)}">{escape(entry.text, quote=False)}</a>')
+        parts.append("</li></ol>" * len(stack))
+        return "".join(parts)
+
+
+class _Rewriter(HTMLParser):
+    """Streaming re-serializer; every token is handled once, so work is linear in input size."""
+
+    def __init__(self, heading_tags: Set[str], sanitize: bool, minify: bool, reserved_ids: Iterable[str] = ()):
+        super().__init__(convert_charrefs=True)
+        self.heading_tags = heading_tags
+        self.sanitize = sanitize
+        self.minify = minify
+        self.out: List[str] = []
+        self.toc: List[TocEntry] = []
+        # Ids already in the document; generated anchors never reuse them
+        self._anchors: Set[str] = set(reserved_ids)
+        self._drop_depth = 0
+        self._drop_tag: Optional[str] = None
+        self._raw_tag: Optional[str] = None
+        self._pre_depth = 0
+        # Open heading: (tag, attrs, index of its start tag in ``out``, text parts)
+        self._heading: Optional[Tuple[str, List[Tuple[str, Optional[str]]], int, List[str]]] = None
+        # Minify: whitespace waiting to see whether the next token is a block boundary
+        self._pending_space = False
+        self._after_block = True
+
+    def _emit(self, text: str, block: bool = False):
+        if self._pending_space:
+            if not (block or self._after_block):
+                self.out.append(" ")
+            self._pending_space = False
+        self.out.append(text)
+        self._after_block = block
+
+    def _clean_attrs(self, attrs: List[Tuple[str, Optional[str]]]) -> List[Tuple[str, Optional[str]]]:
+        if not self.sanitize:
+            return attrs
+        return [
+            (name, value) for name, value in attrs
+            if not name.startswith("on")
+            and name not in _UNSAFE_ATTRIBUTES
+            and not (name in _URL_ATTRIBUTES and value and _SCRIPT_SCHEME.match(_SCHEME_NOISE.sub("", value)))
+        ]
+
+    @staticmethod
+    def _start_tag(tag: str, attrs: Iterable[Tuple[str, Optional[str]]], close: bool = False) -> str:
+        rendered = "".join(
+            f" {name}" if value is None else f' {name}="{escape(value)}"' for name, value in attrs
+        )
+        return f"<{tag}{rendered}{' /' if close else ''}>"
+
+    def handle_starttag(self, tag, attrs):
+        if self._drop_depth:
+            if tag == self._drop_tag:
+                self._drop_depth += 1
+            return
+        if self.sanitize and tag in _UNSAFE_ELEMENTS:
+            if tag not in _VOID_ELEMENTS:
+                self._drop_tag, self._drop_depth = tag, 1
+            return
+        attrs = self._clean_attrs(attrs)
+        block = tag in _BLOCK_ELEMENTS
+        if tag in self.heading_tags and self._heading is None:
+            self._emit("", block)
+            self._heading = (tag, attrs, len(self.out) - 1, [])
+            return
+        if tag in _PREFORMATTED:
+            self._pre_depth += 1
+        if tag in _RAW_TEXT:
+            self._raw_tag = tag
+        self._emit(self._start_tag(tag, attrs), block)
+
+    def handle_startendtag(self, tag, attrs):
+        if self._drop_depth or (self.sanitize and tag in _UNSAFE_ELEMENTS):
+            return
+        self._emit(self._start_tag(tag, self._clean_attrs(attrs), close=True), tag in _BLOCK_ELEMENTS)
+
+    def handle_endtag(self, tag):
+        if self._drop_depth:
+            if tag == self._drop_tag:
+                self._drop_depth -= 1
+            return
+        if self.sanitize and tag in _UNSAFE_ELEMENTS:
+            return
+        if tag == self._raw_tag:
+            self._raw_tag = None
+        if tag in _PREFORMATTED and self._pre_depth:
+            self._pre_depth -= 1
+        if self._heading is not None and tag == self._heading[0]:
+            self._pending_space = False
+            self._close_heading()
+            self._emit(f"</{tag}>", True)
+            return
+        if tag not in _VOID_ELEMENTS:
+            self._emit(f"</{tag}>", tag in _BLOCK_ELEMENTS)
+
+    def _close_heading(self):
+        tag, attrs, index, text_parts = self._heading
+        self._heading = None
+        text = _WHITESPACE.sub(" ", "".join(text_parts)).strip()
+        anchor = next((value for name, value in attrs if name == "id" and value), None)
+        if anchor is None:
+            base = slugify(text)
+            anchor, n = base, 1
+            while anchor in self._anchors:
+                n += 1
+                anchor = f"{base}-{n}"
+            attrs = attrs + [("id", anchor)]
+        self._anchors.add(anchor)
+        self.toc.append(TocEntry(level=int(tag[1]), text=text, anchor=anchor))
+        self.out[index] = self._start_tag(tag, attrs)
+
+    def handle_data(self, data):
+        if self._drop_depth:
+            return
+        if self._raw_tag:
+            self._emit(data)
+            return
+        if self._heading is not None:
+            self._heading[3].append(data)
+        text = escape(data, quote=False)
+        if not self.minify or self._pre_depth:
+            self._emit(text)
+            return
+        text = _WHITESPACE.sub(" ", text)
+        if text == " ":
+            self._pending_space = True
+            return
+        if text.startswith(" "):
+            self._pending_space = True
+            text = text[1:]
+        trailing = text.endswith(" ")
+        self._emit(text.rstrip(" ") if trailing else text)
+        self._pending_space = trailing
+
+    def handle_comment(self, data):
+        if not (self.minify or self.sanitize or self._drop_depth):
+            self._emit(f"<!--{data}-->")
+
+    def handle_decl(self, decl):
+        if not self._drop_depth:
+            self._emit(f"<!{decl}>", True)
+
+    def close(self):
+        super().close()
+        if self._heading is not None:
+            self._close_heading()
+
+
+class ContentPipeline:
+    """Heading anchors, TOC extraction, sanitizing and minifying in one parse.
+
+    Headings matching ``heading_tags`` keep an existing ``id`` or get one
+    derived from their text (``-2``, ``-3`` ... on collisions with earlier
+    anchors or any ``id`` already in the document), so anchors stay the same
+    across republishes. Sanitizing drops script-like elements, frames, SVG
+    animations, ``on*`` handlers, ``srcdoc`` and ``javascript:`` URLs (also
+    when split by whitespace or control characters); minifying drops
+    comments and collapses whitespace outside ``<pre>`` and ``<textarea>``.
+
+    Args:
+        heading_tags: Headings included in the TOC
+        sanitize: Strip active content
+        minify: Collapse whitespace and drop comments
+        max_entries: Processed articles kept in the memo
+    """
+
+    def __init__(
+        self,
+        heading_tags: Iterable[str] = ("h2", "h3"),
+        sanitize: bool = True,
+        minify: bool = True,
+        max_entries: int = 256
+    ):
+        self.heading_tags = {tag.lower() for tag in heading_tags}
+        self.sanitize = sanitize
+        self.minify = minify
+        self.max_entries = max_entries
+        self._memo: "OrderedDict[str, ProcessedContent]" = OrderedDict()
+
+    def process(self, content_html: str) -> ProcessedContent:
+        """Return the processed article, reusing the memoized result for identical input."""
+        digest = hashlib.sha256(content_html.encode("utf-8")).hexdigest()
+        cached = self._memo.get(digest)
+        if cached is not None:
+            self._memo.move_to_end(digest)
+            return cached
+
+        rewriter = _Rewriter(self.heading_tags, self.sanitize, self.minify, _existing_ids(content_html))
+        rewriter.feed(content_html)
+        rewriter.close()
+        result = ProcessedContent(html="".join(rewriter.out), toc=rewriter.toc, digest=digest)
+
+        self._memo[digest] = result
+        while len(self._memo) > self.max_entries:
+            self._memo.popitem(last=False)
+        return result
+
+    def clear(self):
+        self._memo.clear()
+
+    def __len__(self) -> int:
+        return len(self._memo)
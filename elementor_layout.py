@@ -0,0 +1,284 @@
+"""
+Elementor layout builder for article posts.
+
+Widgets and sections are plain dict factories. ``ElementorLayout`` combines
+them into the TOC / content / FAQ page used by
+``WordPressService.publish_elementor_widgets_meta`` and serializes it through
+a cached JSON template, so per-post work is limited to encoding the article
+HTML and FAQ tabs.
+
+Widgets that are identical in every post (see ``ElementorLayout.static_widgets``)
+can be stored once in the site's Elementor library and referenced as global
+widgets (``ElementorLayout.with_templates``, set up by
+``WordPressService.use_templates``).
+"""
+import html
+import json
+from typing import Any, Dict, List, Optional
+
+from request_body import dumps_str
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False)  # Prevent ASCII encoding issues
+
+
+def section(section_id: str, elements: List[dict], **extra_settings) -> dict:
+    """Boxed full-width section with the standard 40px/20px padding."""
+    settings = {
+        "layout": "boxed",
+        "content_width": {"unit": "px", "size": 1140},
+        "gap": "default",
+        "padding": {
+            "unit": "px",
+            "top": "40",
+            "right": "20",
+            "bottom": "40",
+            "left": "20",
+            "isLinked": False
+        }
+    }
+    settings.update(extra_settings)
+    return {
+        "id": section_id,
+        "elType": "section",
+        "settings": settings,
+        "elements": elements
+    }
+
+
+def column(column_id: str, elements: List[dict]) -> dict:
+    """Single 100% wide column."""
+    return {
+        "id": column_id,
+        "elType": "column",
+        "settings": {
+            "_column_size": 100,
+            "_inline_size": None
+        },
+        "elements": elements
+    }
+
+
+def widget(widget_id: str, widget_type: str, settings: dict) -> dict:
+    return {
+        "id": widget_id,
+        "elType": "widget",
+        "widgetType": widget_type,
+        "settings": settings,
+        "elements": []
+    }
+
+
+def global_widget(template_id: int, widget_id: str) -> dict:
+    """Reference to a widget saved in the Elementor library (a global widget)."""
+    return {
+        "id": widget_id,
+        "elType": "widget",
+        "widgetType": "global",
+        "templateID": template_id,
+        "settings": {},
+        "elements": []
+    }
+
+
+def toc_widget(title: str = "Table of Contents", widget_id: str = "widget_toc") -> dict:
+    """Table of Contents built client-side from the page's h2/h3 headings."""
+    return widget(widget_id, "table-of-contents", {
+        "title": title,
+        "_css_classes": "custom-toc-black",
+        "custom_css": "selector .elementor-toc__header-title { color: #000000 !important; }",
+        "title_typography_typography": "custom",
+        "title_typography_color": "#000000",
+        "hierarchical_view": "yes",
+        "headings_by_tags": ["h2", "h3"],
+        "container": "",
+        "exclude_headings_by_selector": "",
+        "marker_view": "numbers",
+        "icon": {"value": "", "library": ""},
+        "collapse_subitems": "no",
+        "minimized_on": "mobile",
+    })
+
+
+def static_toc_editor(title: str, toc_html: str) -> str:
+    """Text-editor HTML for a TOC rendered ahead of time (see ``content_pipeline``)."""
+    return (
+        '<nav class="custom-toc-black elementor-toc--static">'
+        f'<h4 class="elementor-toc__header-title" style="color: #000000;">{html.escape(title, quote=False)}</h4>'
+        f"{toc_html}</nav>"
+    )
+
+
+def text_editor_widget(editor: Any, widget_id: str = "widget_text") -> dict:
+    return widget(widget_id, "text-editor", {"editor": editor})
+
+
+def heading_widget(title: str, widget_id: str = "widget_faq_heading", color: str = "#1D53DD") -> dict:
+    """Centered h2 heading."""
+    return widget(widget_id, "heading", {
+        "title": title,
+        "header_size": "h2",
+        "title_color": color,
+        "align": "center",
+        "align_tablet": "center",
+        "align_mobile": "center"
+    })
+
+
+def faq_tabs(faq_items: List[dict]) -> List[dict]:
+    """Convert {"question", "answer"} items into accordion tabs."""
+    return [
+        {
+            "_id": f"faq_{i+1}",
+            "tab_title": item["question"],
+            "tab_content": f"<p>{item['answer']}</p>"
+        }
+        for i, item in enumerate(faq_items)
+    ]
+
+
+def accordion_widget(tabs: Any, widget_id: str = "widget_faq", color: str = "#1D53DD") -> dict:
+    """FAQ accordion with schema output enabled."""
+    return widget(widget_id, "accordion", {
+        "faq_schema": "yes",
+        "tabs": tabs,
+        "icon": "fa fa-caret-right",
+        "icon_active": "fa fa-caret-down",
+        "icon_align": "right",
+        "title_color": color,
+        "title_hover_color": color,
+        "title_active_color": color,
+        "title_typography_typography": "custom",
+        "title_typography_font_weight": "bold",
+        "title_typography_font_weight_tablet": "bold",
+        "active_title_typography_font_weight": "bold",
+        "active_title_typography_font_weight_tablet": "bold",
+        "icon_color": color,
+        "icon_hover_color": color,
+        "icon_active_color": color,
+        "border_width": {
+            "unit": "px",
+            "top": "1",
+            "right": "0",
+            "bottom": "1",
+            "left": "0",
+            "isLinked": False
+        },
+        "border_color": "#E5E5E5"
+    })
+
+
+class _Slot:
+    """Placeholder for a per-post value in a compiled template."""
+
+    def __init__(self, name: str):
+        self.name = name
+        # Control characters are always escaped by json.dumps, so the
+        # encoded marker cannot collide with real layout content.
+        self.marker = f"\x00slot:{name}\x00"
+
+
+class ElementorLayout:
+    """TOC, content and FAQ sections as an Elementor page.
+
+    ``build`` returns the element tree; ``render`` returns the same tree as
+    the ``_elementor_data`` JSON string, byte-identical to
+    ``json.dumps(build(...), ensure_ascii=False)``.
+
+    Args:
+        toc_title: Title shown above the table of contents
+        faq_title: Heading shown above the FAQ accordion
+        static_toc: Render the TOC passed to ``build``/``render`` as HTML in a
+            text-editor widget instead of letting Elementor scan the page's
+            headings in the browser
+        templates: Library template IDs by ``static_widgets`` name; those
+            widgets are sent as global widget references
+    """
+
+    def __init__(self, toc_title: str = "Table of Contents", faq_title: str = "FAQ", static_toc: bool = False,
+                 templates: Optional[Dict[str, int]] = None):
+        self.toc_title = toc_title
+        self.faq_title = faq_title
+        self.static_toc = static_toc
+        self.templates = dict(templates or {})
+        self._template: Optional[List[Any]] = None
+
+    def static_widgets(self) -> Dict[str, dict]:
+        """Widgets that do not change between posts, by template name."""
+        widgets = {"faq_heading": heading_widget(self.faq_title)}
+        if not self.static_toc:
+            widgets["toc"] = toc_widget(self.toc_title)
+        return widgets
+
+    def with_templates(self, templates: Dict[str, int]) -> "ElementorLayout":
+        """The same layout, referencing library templates for the given static widgets."""
+        return ElementorLayout(self.toc_title, self.faq_title, self.static_toc, {**self.templates, **templates})
+
+    def _static(self, name: str, element: dict) -> dict:
+        template_id = self.templates.get(name)
+        return element if template_id is None else global_widget(template_id, element["id"])
+
+    def _tree(self, editor: Any, tabs: Any, toc: Any = None) -> List[dict]:
+        if self.static_toc:
+            toc_element = text_editor_widget(toc, widget_id="widget_toc")
+        else:
+            toc_element = self._static("toc", toc_widget(self.toc_title))
+        return [
+            # SECTION 1: Table of Contents
+            section("section_toc", [
+                column("column_toc", [toc_element])
+            ]),
+            # SECTION 2: Main Content
+            section("section_content", [
+                column("column_content", [text_editor_widget(editor)])
+            ]),
+            # SECTION 3: FAQ
+            section("section_faq", [
+                column("column_faq", [
+                    self._static("faq_heading", heading_widget(self.faq_title)),
+                    accordion_widget(tabs)
+                ])
+            ], background_background="classic", background_color="#F8F9FA"),
+        ]
+
+    def build(self, content_html: str, faq_items: List[dict], toc_html: str = "") -> List[dict]:
+        """Return the full element tree for one article.
+
+        ``toc_html`` is only used with ``static_toc``.
+        """
+        return self._tree(content_html, faq_tabs(faq_items), static_toc_editor(self.toc_title, toc_html))
+
+    def _compile(self) -> List[Any]:
+        """Serialize the static layout once, leaving slots for per-post values.
+
+        Returns a list alternating literal JSON strings and slot names.
+        """
+        slots = [_Slot("editor"), _Slot("tabs"), _Slot("toc")]
+        encoded = _dumps(self._tree(*(slot.marker for slot in slots)))
+        if not self.static_toc:
+            slots.pop()
+        # Slots are listed in the order they appear in the encoded tree
+        slots.sort(key=lambda slot: encoded.index(_dumps(slot.marker)))
+        template: List[Any] = []
+        for slot in slots:
+            literal, _, encoded = encoded.partition(_dumps(slot.marker))
+            template.extend([literal, slot.name])
+        template.append(encoded)
+        return template
+
+    def render(self, content_html: str, faq_items: List[dict], toc_html: str = "") -> str:
+        """Return the ``_elementor_data`` JSON string for one article."""
+        if self._template is None:
+            self._template = self._compile()
+        values: Dict[str, str] = {
+            # The article HTML is most of the payload; encode it with the fast backend
+            "editor": dumps_str(content_html),
+            "tabs": _dumps(faq_tabs(faq_items)),
+        }
+        if self.static_toc:
+            values["toc"] = _dumps(static_toc_editor(self.toc_title, toc_html))
+        return "".join(part if i % 2 == 0 else values[part] for i, part in enumerate(self._template))
+
+
+DEFAULT_LAYOUT = ElementorLayout()
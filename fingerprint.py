@@ -0,0 +1,64 @@
+"""
+Per-field fingerprints of post payloads, used to skip unchanged updates.
+"""
+import hashlib
+import json
+from typing import Dict, Iterable
+
+# Meta keys holding the fingerprint and upsert bookkeeping; never fingerprinted themselves
+FINGERPRINT_META_KEY = "_wpep_fingerprint"
+EXTERNAL_ID_META_KEY = "_wpep_external_id"
+_BOOKKEEPING_KEYS = {FINGERPRINT_META_KEY, EXTERNAL_ID_META_KEY}
+# Sent with every layout change, although their values never change: clearing
+# _elementor_css is what makes Elementor regenerate the post's CSS file
+_LAYOUT_COMPANION_KEYS = ("_elementor_css", "_elementor_edit_mode")
+
+
+def _digest(value) -> str:
+    if not isinstance(value, str):
+        value = json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()[:32]
+
+
+def fingerprint_payload(payload: dict) -> Dict[str, str]:
+    """Hash every field of a post payload.
+
+    Top-level fields are keyed by name and meta fields as ``meta.<key>``, so
+    a change to ``_elementor_data`` is detected without comparing the blob.
+    """
+    fingerprint = {}
+    for key, value in payload.items():
+        if key == "meta":
+            for meta_key, meta_value in value.items():
+                if meta_key not in _BOOKKEEPING_KEYS:
+                    fingerprint[f"meta.{meta_key}"] = _digest(meta_value)
+        else:
+            fingerprint[key] = _digest(value)
+    return fingerprint
+
+
+def changed_fields(new: Dict[str, str], stored: Dict[str, str]) -> Iterable[str]:
+    """Fingerprint keys whose value differs from (or is missing in) ``stored``."""
+    return [key for key, digest in new.items() if stored.get(key) != digest]
+
+
+def payload_subset(payload: dict, keys: Iterable[str]) -> dict:
+    """Return the part of ``payload`` covered by the given fingerprint keys.
+
+    When ``_elementor_data`` is included, the payload's ``_elementor_css``
+    and ``_elementor_edit_mode`` are included with it, so the new layout
+    does not keep being served with the old CSS file.
+    """
+    subset: dict = {}
+    for key in keys:
+        if key.startswith("meta."):
+            meta_key = key[len("meta."):]
+            subset.setdefault("meta", {})[meta_key] = payload["meta"][meta_key]
+        else:
+            subset[key] = payload[key]
+    meta = subset.get("meta", {})
+    if "_elementor_data" in meta:
+        for meta_key in _LAYOUT_COMPANION_KEYS:
+            if meta_key in payload["meta"]:
+                meta[meta_key] = payload["meta"][meta_key]
+    return subset
@@ -0,0 +1,108 @@
+"""
+Connection pool configuration and shared HTTP clients for WordPress services.
+"""
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+from adaptive_limit import ConcurrencyPolicy
+from transport import RetryPolicy, RetryTransport
+
+
+@dataclass
+class PoolConfig:
+    """Connection pool settings for a service's HTTP client.
+
+    Args:
+        max_connections: Upper bound on open connections per client
+        max_keepalive_connections: Idle connections kept open for reuse. Too few
+            causes reconnects under load; very large pools are slow too, because
+            httpcore scans every pooled connection on each request. Measure with
+            ``python -m benchmarks.bench_http_pool`` before going past a few dozen
+        keepalive_expiry: Seconds an idle connection is kept
+        http2: Negotiate HTTP/2 (requires the ``h2`` package, ``pip install httpx[http2]``)
+    """
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    http2: bool = False
+
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry
+        )
+
+
+def build_client(
+    username: str,
+    password: str,
+    timeout: float,
+    pool: Optional[PoolConfig] = None,
+    retry_policy: Optional[RetryPolicy] = None,
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+    concurrency: Optional[ConcurrencyPolicy] = None
+) -> httpx.AsyncClient:
+    """Build the AsyncClient used by WordPressService.
+
+    ``transport`` replaces the pooled network transport (for example with a
+    mock); retries and the optional adaptive concurrency limit are layered
+    on top of whichever transport is used.
+    """
+    pool = pool or PoolConfig()
+    if transport is None:
+        transport = httpx.AsyncHTTPTransport(limits=pool.limits(), http2=pool.http2)
+    return httpx.AsyncClient(
+        transport=RetryTransport(transport, retry_policy, concurrency),
+        timeout=httpx.Timeout(timeout),
+        auth=(username, password),
+        headers={"Content-Type": "application/json"}
+    )
+
+
+class _SharedEntry:
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+        self.refs = 0
+
+
+_shared: Dict[Tuple[str, str], _SharedEntry] = {}
+
+
+def acquire_shared_client(
+    base_url: str,
+    username: str,
+    password: str,
+    timeout: float,
+    pool: Optional[PoolConfig] = None,
+    retry_policy: Optional[RetryPolicy] = None,
+    concurrency: Optional[ConcurrencyPolicy] = None
+) -> httpx.AsyncClient:
+    """Return the client shared by services for the same host and user.
+
+    Sharing is keyed by user as well as host because the client carries that
+    user's credentials and session cookies. The first caller's pool, retry
+    and concurrency settings are used. Each call must be paired with ``release_shared_client``.
+    """
+    key = (urlsplit(base_url).netloc.lower(), username)
+    entry = _shared.get(key)
+    if entry is None or entry.client.is_closed:
+        entry = _SharedEntry(build_client(username, password, timeout, pool, retry_policy, concurrency=concurrency))
+        _shared[key] = entry
+    entry.refs += 1
+    return entry.client
+
+
+async def release_shared_client(client: httpx.AsyncClient):
+    """Drop one reference to a shared client, closing it with the last one."""
+    for key, entry in list(_shared.items()):
+        if entry.client is client:
+            entry.refs -= 1
+            if entry.refs <= 0:
+                del _shared[key]
+                await client.aclose()
+            return
+    await client.aclose()
@@ -0,0 +1,380 @@
+"""
+Persistent publish queue backed by SQLite, and the worker pool serving it.
+
+Jobs carry an ArticleSpec, a priority and the time they become due.
+Workers lease jobs for a visibility timeout and extend the lease while
+publishing. A worker that dies simply lets its leases expire, and the jobs
+go back to the queue. Leasing happens in an immediate transaction, so
+several worker processes on one machine can share a queue file.
+
+    queue = JobQueue("publish-queue.sqlite")
+    queue.enqueue(spec, priority=5, run_at=datetime(2025, 1, 1, 9, 0))
+    await QueueWorker(queue, service, concurrency=4, rate_limit=1).run()
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from models.content import ArticleSpec
+from rate_limit import get_host_limiter
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    queue TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    run_at REAL NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 5,
+    lease_owner TEXT,
+    lease_until REAL,
+    dedupe_key TEXT,
+    last_error TEXT,
+    result TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (queue, status, priority DESC, run_at, id);
+CREATE UNIQUE INDEX IF NOT EXISTS jobs_dedupe ON jobs (queue, dedupe_key) WHERE dedupe_key IS NOT NULL;
+"""
+
+RunAt = Union[None, float, datetime]
+
+
+def _timestamp(run_at: RunAt) -> float:
+    if run_at is None:
+        return time.time()
+    if isinstance(run_at, datetime):
+        return run_at.timestamp()
+    return float(run_at)
+
+
+@dataclass
+class Job:
+    """A leased job."""
+    id: int
+    payload: dict
+    priority: int
+    run_at: float
+    attempts: int
+    max_attempts: int
+    lease_until: float
+
+    @property
+    def spec(self) -> ArticleSpec:
+        return ArticleSpec.from_dict(self.payload)
+
+
+class JobQueue:
+    """SQLite job store with priorities, delayed jobs and leases.
+
+    Args:
+        path: Database file, shared by every process using the queue
+        queue: Name of the queue within the file (e.g. one per site)
+        busy_timeout: Seconds to wait for another process' write lock
+    """
+
+    def __init__(self, path: str, queue: str = "default", busy_timeout: float = 30.0):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.queue = queue
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        # Transactions are managed explicitly with BEGIN IMMEDIATE
+        self._db = sqlite3.connect(str(self.path), timeout=busy_timeout,
+                                   isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+
+    def _write(self, fn):
+        """Run ``fn(db)`` in an immediate (write-locked) transaction."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(self._db)
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+            return result
+
+    def enqueue(
+        self,
+        spec: Union[ArticleSpec, dict],
+        priority: int = 0,
+        run_at: RunAt = None,
+        max_attempts: int = 5,
+        dedupe_key: Optional[str] = None
+    ) -> Optional[int]:
+        """
+        Add a publish job.
+
+        Args:
+            spec: Article to publish
+            priority: Higher priorities are leased first among due jobs
+            run_at: Earliest time to publish (datetime or epoch seconds; default now)
+            max_attempts: Attempts before the job is marked dead
+            dedupe_key: Jobs with a key already queued in this queue are not added again
+
+        Returns:
+            The job ID, or None if ``dedupe_key`` was already present
+        """
+        if not isinstance(spec, ArticleSpec):
+            spec = ArticleSpec.from_dict(spec)
+        payload = asdict(spec)
+        now = time.time()
+
+        def insert(db):
+            cursor = db.execute(
+                "INSERT OR IGNORE INTO jobs (queue, payload, priority, run_at, max_attempts, dedupe_key, "
+                "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.queue, json.dumps(payload, ensure_ascii=False), priority, _timestamp(run_at),
+                 max_attempts, dedupe_key, now, now)
+            )
+            return cursor.lastrowid if cursor.rowcount else None
+
+        return self._write(insert)
+
+    def lease(self, owner: str, limit: int = 1, visibility_timeout: float = 300.0) -> List[Job]:
+        """Lease up to ``limit`` due jobs, highest priority first.
+
+        Due jobs are queued jobs whose ``run_at`` has passed and leased jobs
+        whose lease expired. Each lease counts as an attempt, so an expired
+        lease that used the job's last attempt marks it dead instead, as a
+        failed one would.
+        """
+        now = time.time()
+        lease_until = now + visibility_timeout
+
+        def take(db):
+            dead = db.execute(
+                "UPDATE jobs SET status = 'dead', last_error = ?, lease_owner = NULL, lease_until = NULL, "
+                "updated_at = ? WHERE queue = ? AND status = 'leased' AND lease_until <= ? AND attempts >= max_attempts",
+                ("Lease expired on the last attempt", now, self.queue, now)
+            ).rowcount
+            if dead:
+                self.logger.error(f"{dead} job(s) marked dead after their last lease expired")
+            rows = db.execute(
+                "SELECT id, payload, priority, run_at, attempts, max_attempts FROM jobs "
+                "WHERE queue = ? AND ((status = 'queued' AND run_at <= ?) OR (status = 'leased' AND lease_until <= ?)) "
+                "ORDER BY priority DESC, run_at, id LIMIT ?",
+                (self.queue, now, now, limit)
+            ).fetchall()
+            db.executemany(
+                "UPDATE jobs SET status = 'leased', lease_owner = ?, lease_until = ?, attempts = attempts + 1, "
+                "updated_at = ? WHERE id = ?",
+                [(owner, lease_until, now, row[0]) for row in rows]
+            )
+            return [
+                Job(id=row[0], payload=json.loads(row[1]), priority=row[2], run_at=row[3],
+                    attempts=row[4] + 1, max_attempts=row[5], lease_until=lease_until)
+                for row in rows
+            ]
+
+        return self._write(take)
+
+    def extend(self, job_id: int, owner: str, visibility_timeout: float = 300.0) -> bool:
+        """Push a held lease forward; False if the lease was lost to another worker."""
+        now = time.time()
+        return self._write(lambda db: db.execute(
+            "UPDATE jobs SET lease_until = ?, updated_at = ? WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+            (now + visibility_timeout, now, job_id, owner)
+        ).rowcount == 1)
+
+    def complete(self, job_id: int, owner: str, result: Optional[dict] = None) -> bool:
+        """Mark a leased job done; False if the lease was lost to another worker."""
+        now = time.time()
+        return self._write(lambda db: db.execute(
+            "UPDATE jobs SET status = 'done', result = ?, lease_owner = NULL, lease_until = NULL, updated_at = ? "
+            "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+            (json.dumps(result) if result is not None else None, now, job_id, owner)
+        ).rowcount == 1)
+
+    def fail(self, job_id: int, owner: str, error: str, retry_delay: float) -> Optional[str]:
+        """Record a failed attempt, requeueing the job after ``retry_delay`` or marking it dead.
+
+        Returns:
+            The job's new status, or None if the lease was lost
+        """
+        now = time.time()
+
+        def update(db):
+            row = db.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (job_id, owner)
+            ).fetchone()
+            if row is None:
+                return None
+            status = "dead" if row[0] >= row[1] else "queued"
+            db.execute(
+                "UPDATE jobs SET status = ?, run_at = ?, last_error = ?, lease_owner = NULL, lease_until = NULL, "
+                "updated_at = ? WHERE id = ?",
+                (status, now + retry_delay, error, now, job_id)
+            )
+            return status
+
+        return self._write(update)
+
+    def next_run_at(self) -> Optional[float]:
+        """Earliest time a job becomes due (queued run_at or lease expiry), if any."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT MIN(CASE status WHEN 'queued' THEN run_at ELSE lease_until END) FROM jobs "
+                "WHERE queue = ? AND status IN ('queued', 'leased')",
+                (self.queue,)
+            ).fetchone()
+        return row[0]
+
+    def stats(self) -> Dict[str, int]:
+        """Job counts by status."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT status, COUNT(*) FROM jobs WHERE queue = ? GROUP BY status", (self.queue,)
+            ).fetchall()
+        return dict(rows)
+
+    def requeue_dead(self) -> int:
+        """Give dead jobs a fresh set of attempts; returns how many were requeued."""
+        now = time.time()
+        return self._write(lambda db: db.execute(
+            "UPDATE jobs SET status = 'queued', attempts = 0, run_at = ?, updated_at = ? "
+            "WHERE queue = ? AND status = 'dead'",
+            (now, now, self.queue)
+        ).rowcount)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class QueueWorker:
+    """Asyncio worker pool publishing jobs from a JobQueue through one WordPressService.
+
+    Leases are extended every third of the visibility timeout while a job
+    runs. A job that fails is retried with exponential backoff until it runs
+    out of attempts. Give the service a journal, or use upsert with external
+    IDs, so a job re-run after a lost lease resumes its post instead of
+    creating a duplicate.
+
+    Args:
+        queue: Job store
+        service: Service the jobs are published through
+        concurrency: Jobs published at once by this worker
+        rate_limit: Publishes started per second against the site, shared
+            with every other batch in this process targeting the same host
+        visibility_timeout: Seconds a lease lasts without being extended
+        poll_interval: Longest sleep while waiting for jobs
+        retry_delay: Delay before the first retry; doubled on each attempt
+        upsert: Publish jobs in upsert mode
+        base_dir: Directory the jobs' local images are relative to
+        owner: Lease owner ID (default: host, PID and a random suffix)
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        service,
+        concurrency: int = 4,
+        rate_limit: Optional[float] = None,
+        visibility_timeout: float = 300.0,
+        poll_interval: float = 1.0,
+        retry_delay: float = 30.0,
+        upsert: bool = False,
+        base_dir: Optional[str] = None,
+        owner: Optional[str] = None
+    ):
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        self.queue = queue
+        self.service = service
+        self.concurrency = concurrency
+        self.limiter = get_host_limiter(service.base_url, rate_limit) if rate_limit else None
+        self.visibility_timeout = visibility_timeout
+        self.poll_interval = poll_interval
+        self.retry_delay = retry_delay
+        self.upsert = upsert
+        self.base_dir = base_dir
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.logger = logging.getLogger(__name__)
+        self.completed = 0
+        self.failed = 0
+
+    async def _keep_leased(self, job: Job):
+        while True:
+            await asyncio.sleep(self.visibility_timeout / 3)
+            if not await asyncio.to_thread(self.queue.extend, job.id, self.owner, self.visibility_timeout):
+                self.logger.warning(f"Lost the lease on job {job.id}")
+                return
+
+    async def _run_job(self, job: Job):
+        keeper = asyncio.create_task(self._keep_leased(job))
+        try:
+            if self.limiter is not None:
+                await self.limiter.acquire()
+            article = await self.service.publish_spec(job.spec, self.upsert, self.base_dir)
+        except Exception as e:
+            self.failed += 1
+            delay = min(self.retry_delay * 2 ** (job.attempts - 1), 3600.0)
+            status = await asyncio.to_thread(
+                self.queue.fail, job.id, self.owner, f"{type(e).__name__}: {e}", delay
+            )
+            self.logger.error(f"Job {job.id} attempt {job.attempts}/{job.max_attempts} failed ({status}): {e}")
+        else:
+            self.completed += 1
+            result = {"post_id": article.post_id, "url": article.url, "status": article.status}
+            if not await asyncio.to_thread(self.queue.complete, job.id, self.owner, result):
+                self.logger.warning(f"Job {job.id} finished after its lease was lost")
+        finally:
+            keeper.cancel()
+
+    async def run(self, stop: Optional[asyncio.Event] = None, drain: bool = False):
+        """
+        Lease and publish jobs until ``stop`` is set.
+
+        Args:
+            stop: Event ending the loop; jobs in flight are finished first
+            drain: Return once no job is due or running instead of waiting
+                for scheduled ones
+        """
+        stop = stop or asyncio.Event()
+        running = set()
+        try:
+            while not stop.is_set():
+                free = self.concurrency - len(running)
+                jobs = []
+                if free:
+                    jobs = await asyncio.to_thread(self.queue.lease, self.owner, free, self.visibility_timeout)
+                    for job in jobs:
+                        running.add(asyncio.create_task(self._run_job(job)))
+                if jobs and len(running) < self.concurrency:
+                    continue
+                if not running:
+                    next_run = await asyncio.to_thread(self.queue.next_run_at)
+                    if drain and (next_run is None or next_run > time.time()):
+                        break
+                    timeout = self.poll_interval
+                    if next_run is not None:
+                        timeout = min(timeout, max(0.0, next_run - time.time()))
+                else:
+                    timeout = self.poll_interval
+                stop_wait = asyncio.create_task(stop.wait())
+                done, _ = await asyncio.wait({*running, stop_wait}, timeout=timeout,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                stop_wait.cancel()
+                running -= done
+        finally:
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
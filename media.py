@@ -0,0 +1,268 @@
+"""
+Image discovery, streaming file bodies and the persistent media index used
+to upload article images to the WordPress media library.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import re
+from dataclasses import dataclass
+from html import escape
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+DEFAULT_PATH = Path.home() / ".cache" / "wp-elementor-post" / "media.json"
+CHUNK_SIZE = 256 * 1024
+# Raster formats WordPress accepts in the media library; anything else is never uploaded
+IMAGE_TYPES = frozenset({
+    "image/jpeg", "image/png", "image/gif", "image/webp", "image/avif", "image/heic", "image/bmp", "image/tiff"
+})
+
+
+@dataclass
+class ImageRef:
+    """An ``<img>`` start tag found in article HTML."""
+    offset: int
+    tag: str
+    src: str
+
+
+class _ImageScanner(HTMLParser):
+    def __init__(self, line_offsets: List[int]):
+        super().__init__(convert_charrefs=True)
+        self.line_offsets = line_offsets
+        self.images: List[ImageRef] = []
+
+    def _record(self, tag, attrs):
+        if tag != "img":
+            return
+        src = dict(attrs).get("src")
+        if src:
+            line, col = self.getpos()
+            self.images.append(ImageRef(self.line_offsets[line - 1] + col, self.get_starttag_text(), src))
+
+    handle_starttag = _record
+    handle_startendtag = _record
+
+
+def scan_images(html: str) -> List[ImageRef]:
+    """Return every ``<img>`` tag with a ``src``, in document order."""
+    line_offsets = [0]
+    index = html.find("\n")
+    while index != -1:
+        line_offsets.append(index + 1)
+        index = html.find("\n", index + 1)
+    scanner = _ImageScanner(line_offsets)
+    scanner.feed(html)
+    scanner.close()
+    return scanner.images
+
+
+def rewrite_images(html: str, images: List[ImageRef], urls: Dict[str, str]) -> str:
+    """Replace the ``src`` of each image found in ``urls``, leaving the rest of the markup untouched."""
+    parts: List[str] = []
+    position = 0
+    for image in images:
+        url = urls.get(image.src)
+        if url is None:
+            continue
+        parts.append(html[position:image.offset])
+        parts.append(_replace_src(image.tag, url))
+        position = image.offset + len(image.tag)
+    parts.append(html[position:])
+    return "".join(parts)
+
+
+_SRC_ATTRIBUTE = re.compile(r"""(\ssrc\s*=\s*)("[^"]*"|'[^']*'|[^\s"'>]+)""", re.IGNORECASE)
+
+
+def _replace_src(tag: str, url: str) -> str:
+    return _SRC_ATTRIBUTE.sub(lambda m: f'{m.group(1)}"{escape(url)}"', tag, count=1)
+
+
+def file_digest(path: str) -> str:
+    """SHA-256 of a file, read in fixed-size chunks into a reused buffer."""
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+class FileStream:
+    """Async request body streaming a file in ``chunk_size`` pieces.
+
+    Each iteration reopens the file, so httpx can resend the body when a
+    request is retried or repeated after a re-login. Only one chunk is held
+    in memory at a time and reads run in a worker thread.
+    """
+
+    def __init__(self, path: str, chunk_size: int = CHUNK_SIZE):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.size = os.path.getsize(path)
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        f = await asyncio.to_thread(open, self.path, "rb")
+        try:
+            while True:
+                chunk = await asyncio.to_thread(f.read, self.chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            f.close()
+
+
+def image_type(name: str) -> str:
+    """MIME type of an image file name.
+
+    Raises:
+        ValueError: If the name does not have an image extension
+    """
+    content_type = mimetypes.guess_type(name)[0]
+    if content_type not in IMAGE_TYPES:
+        raise ValueError(f"Not an image file: {name}")
+    return content_type
+
+
+def upload_headers(path: str, filename: Optional[str] = None) -> Dict[str, str]:
+    """Headers for a raw-body upload to ``/wp/v2/media``."""
+    filename = filename or os.path.basename(path)
+    content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    safe_name = filename.replace('"', "").replace("\\", "")
+    return {
+        "Content-Type": content_type,
+        "Content-Disposition": f'attachment; filename="{safe_name}"',
+        "Content-Length": str(os.path.getsize(path)),
+    }
+
+
+class MediaIndex:
+    """JSON index of uploaded media keyed by site and content hash.
+
+    Also remembers the hash of each local file (by path, size and mtime)
+    and each remote image URL, so unchanged sources are neither re-read
+    nor re-downloaded.
+
+    Args:
+        path: Index file (default: ``~/.cache/wp-elementor-post/media.json``)
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path) if path else DEFAULT_PATH
+        self.logger = logging.getLogger(__name__)
+        self._media: Dict[str, dict] = {}
+        self._sources: Dict[str, str] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._dirty = False
+        self.load()
+
+    @staticmethod
+    def _key(site: str, digest: str) -> str:
+        return f"{site.rstrip('/')}|{digest}"
+
+    @staticmethod
+    def source_key(source: str) -> str:
+        """Key under which a source's hash is remembered."""
+        if os.path.isfile(source):
+            stat = os.stat(source)
+            return f"{os.path.abspath(source)}|{stat.st_size}|{stat.st_mtime_ns}"
+        return source
+
+    def get(self, site: str, digest: str) -> Optional[dict]:
+        return self._media.get(self._key(site, digest))
+
+    def set(self, site: str, digest: str, media: dict):
+        self._media[self._key(site, digest)] = {"id": media["id"], "url": media["url"]}
+        self._dirty = True
+
+    def get_digest(self, source_key: str) -> Optional[str]:
+        return self._sources.get(source_key)
+
+    def set_digest(self, source_key: str, digest: str):
+        if self._sources.get(source_key) != digest:
+            self._sources[source_key] = digest
+            self._dirty = True
+
+    async def resolve(self, site: str, digest: str, upload: Callable[[], Awaitable[dict]]) -> dict:
+        """Return the media entry for ``digest``, calling ``upload`` only on a miss.
+
+        Concurrent callers with the same content wait for one upload.
+        """
+        media = self.get(site, digest)
+        if media is not None:
+            return media
+
+        key = self._key(site, digest)
+        future = self._inflight.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            media = await upload()
+            self.set(site, digest, media)
+            future.set_result(media)
+            return media
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    def load(self):
+        """Load the index from ``path``. Missing or corrupt files are ignored."""
+        if not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text())
+        except Exception as e:
+            self.logger.warning(f"Ignoring unreadable media index {self.path}: {e}")
+            return
+        self._media.update(data.get("media", {}))
+        self._sources.update(data.get("sources", {}))
+
+    def save(self):
+        """Write the index to ``path`` atomically if anything changed."""
+        if not self._dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps({"media": self._media, "sources": self._sources}))
+        tmp.replace(self.path)
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self._media)
+
+
+def split_source(src: str, base_dir: Optional[str]) -> Tuple[str, str]:
+    """Classify an image source as ``("file", path)``, ``("url", url)`` or ``("skip", src)``.
+
+    Local paths are resolved (following symlinks) against ``base_dir`` and
+    must stay inside it, so article HTML cannot pull arbitrary files, such
+    as ``/etc/passwd`` or ``../.ssh/id_rsa``, into the public media library.
+
+    Raises:
+        ValueError: For a local path outside ``base_dir``, or any local path
+            when no ``base_dir`` is given
+    """
+    if src.startswith("data:"):
+        return "skip", src
+    if src.startswith(("http://", "https://")):
+        return "url", src
+    if src.startswith("//"):
+        return "url", f"https:{src}"
+    if src.startswith("file://"):
+        src = src[len("file://"):]
+    if base_dir is None:
+        raise ValueError(f"Local image {src!r} found but no base directory was given for local images")
+    base = Path(base_dir).resolve()
+    path = (base / src).resolve()
+    if not path.is_relative_to(base):
+        raise ValueError(f"Local image {src!r} is outside {base}")
+    return "file", str(path)
@@ -0,0 +1,309 @@
+"""
+Timing spans, counters and latency histograms for WordPressService.
+
+Every REST request and every publish step runs inside a span. Finished
+spans update the metrics registry and are passed to registered hooks, and
+the registry can be exported as Prometheus text or JSON without any
+monitoring stack:
+
+    metrics = Metrics()
+    metrics.add_hook(JsonlSpanWriter("spans.jsonl"))
+    service = WordPressService(..., metrics=metrics)
+    ...
+    metrics.write("metrics.prom")
+"""
+import contextvars
+import functools
+import json
+import logging
+import re
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+# Prometheus' default latency buckets, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_HELP = {
+    "wpep_requests_total": "REST requests by method, route and status",
+    "wpep_request_duration_seconds": "REST request latency",
+    "wpep_request_bytes_total": "Request body bytes sent",
+    "wpep_request_body_bytes_total": "Request body bytes before compression",
+    "wpep_request_serialize_seconds": "Time spent serializing JSON request bodies",
+    "wpep_response_bytes_total": "Response body bytes received",
+    "wpep_steps_total": "Publish steps by outcome",
+    "wpep_step_duration_seconds": "Publish step duration",
+    "wpep_warm_ttfb_seconds": "Time to first byte of warmed pages, cold and warm",
+    "wpep_warm_pages_total": "Pages warmed after publishing by outcome",
+}
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("wpep_span", default=None)
+_root_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("wpep_root_span", default=None)
+
+# Request span attributes summed into the outermost step span (e.g. one publish)
+_TOTALS = ("bytes_sent", "bytes_received", "body_bytes", "serialize_seconds")
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def route_of(url: httpx.URL) -> str:
+    """URL path with numeric IDs replaced, keeping metric label cardinality low."""
+    return _ID_SEGMENT.sub("/{id}", url.path)
+
+
+@dataclass
+class Span:
+    """One timed request or step."""
+    name: str
+    kind: str = "step"
+    start: float = field(default_factory=time.time)
+    duration: float = 0.0
+    parent: Optional[str] = None
+    error: Optional[str] = None
+    attributes: Dict[str, object] = field(default_factory=dict)
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def record_response(self, response: httpx.Response):
+        """Attach the status code and body sizes of a finished request."""
+        request = response.request
+        try:
+            sent = len(request.content)
+        except httpx.RequestNotRead:
+            sent = int(request.headers.get("Content-Length", 0) or 0)
+        self.set(status=response.status_code, bytes_sent=sent, bytes_received=response.num_bytes_downloaded)
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+class Histogram:
+    """Cumulative-bucket histogram as used by Prometheus."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        total, rows = 0, []
+        for bound, count in zip([*map(str, self.buckets), "+Inf"], self.counts):
+            total += count
+            rows.append((bound, total))
+        return rows
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the ``q`` quantile (None if empty or beyond the last bucket)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            if total >= rank:
+                return bound
+        return None
+
+
+Hook = Callable[[Span], None]
+
+
+class Metrics:
+    """Registry of counters and histograms fed by spans.
+
+    Args:
+        buckets: Histogram bucket upper bounds in seconds
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.logger = logging.getLogger(__name__)
+        self.counters: Dict[str, Dict[Labels, float]] = {}
+        self.histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._hooks: List[Hook] = []
+
+    def add_hook(self, hook: Hook):
+        """Call ``hook(span)`` for every finished span."""
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook: Hook):
+        self._hooks.remove(hook)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        series = self.counters.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        series = self.histograms.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram(self.buckets)
+        histogram.observe(value)
+
+    @contextmanager
+    def span(self, name: str, kind: str = "step", **attributes) -> Iterator[Span]:
+        """Time the enclosed block; the span is finished even if it raises.
+
+        The outermost step span also collects the request count and the
+        summed byte counts and serialization time of every request under it,
+        so a publish span reports that post's cost on the wire.
+        """
+        parent = _current_span.get()
+        root = _root_span.get()
+        span = Span(name=name, kind=kind, parent=parent.name if parent else None, attributes=attributes)
+        token = _current_span.set(span)
+        root_token = _root_span.set(span) if root is None and kind == "step" else None
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.error = type(e).__name__
+            raise
+        finally:
+            span.duration = time.perf_counter() - started
+            _current_span.reset(token)
+            if root_token is not None:
+                _root_span.reset(root_token)
+            if root is not None and kind == "request":
+                root.attributes["requests"] = root.attributes.get("requests", 0) + 1
+                for key in _TOTALS:
+                    if key in span.attributes:
+                        root.attributes[key] = root.attributes.get(key, 0) + span.attributes[key]
+            self._finish(span)
+
+    def _finish(self, span: Span):
+        if span.kind == "request":
+            method, route = span.attributes.get("method", ""), span.attributes.get("route", "")
+            status = str(span.attributes.get("status", span.error or "error"))
+            self.inc("wpep_requests_total", method=method, route=route, status=status)
+            self.observe("wpep_request_duration_seconds", span.duration, method=method, route=route)
+            self.inc("wpep_request_bytes_total", span.attributes.get("bytes_sent", 0), method=method, route=route)
+            self.inc("wpep_response_bytes_total", span.attributes.get("bytes_received", 0), method=method, route=route)
+            if "serialize_seconds" in span.attributes:
+                self.inc("wpep_request_body_bytes_total", span.attributes["body_bytes"], method=method, route=route)
+                self.observe("wpep_request_serialize_seconds", span.attributes["serialize_seconds"],
+                             method=method, route=route)
+        else:
+            self.inc("wpep_steps_total", step=span.name, outcome="error" if span.error else "ok")
+            self.observe("wpep_step_duration_seconds", span.duration, step=span.name)
+        for hook in self._hooks:
+            try:
+                hook(span)
+            except Exception as e:
+                self.logger.warning(f"Metrics hook {hook!r} failed: {e}")
+
+    def reset(self):
+        self.counters.clear()
+        self.histograms.clear()
+
+    def as_dict(self) -> dict:
+        """JSON-friendly snapshot, with p50/p99 bucket estimates per histogram."""
+        return {
+            "counters": {
+                name: [{"labels": dict(labels), "value": value} for labels, value in series.items()]
+                for name, series in self.counters.items()
+            },
+            "histograms": {
+                name: [
+                    {
+                        "labels": dict(labels),
+                        "count": h.count,
+                        "sum": round(h.sum, 6),
+                        "p50": h.quantile(0.5),
+                        "p99": h.quantile(0.99),
+                        "buckets": dict(h.cumulative()),
+                    }
+                    for labels, h in series.items()
+                ]
+                for name, series in self.histograms.items()
+            },
+        }
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format (0.0.4)."""
+        lines: List[str] = []
+        for name, series in self.counters.items():
+            lines += [f"# HELP {name} {_HELP.get(name, name)}", f"# TYPE {name} counter"]
+            lines += [f"{name}{_labels(labels)} {_number(value)}" for labels, value in series.items()]
+        for name, series in self.histograms.items():
+            lines += [f"# HELP {name} {_HELP.get(name, name)}", f"# TYPE {name} histogram"]
+            for labels, h in series.items():
+                for bound, count in h.cumulative():
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', bound),))} {count}")
+                lines.append(f"{name}_sum{_labels(labels)} {_number(h.sum)}")
+                lines.append(f"{name}_count{_labels(labels)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        """Write a snapshot atomically: JSON for ``*.json`` paths, Prometheus text otherwise.
+
+        A ``.prom`` file can be picked up by node_exporter's textfile collector.
+        """
+        path = Path(path)
+        if path.suffix == ".json":
+            text = json.dumps(self.as_dict(), indent=2)
+        else:
+            text = self.render_prometheus()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text(text)
+        tmp.replace(path)
+
+
+def _escape(value: object) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+class JsonlSpanWriter:
+    """Hook appending every finished span to a JSONL file."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def __call__(self, span: Span):
+        self._file.write(json.dumps(span.as_dict(), default=str) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def timed(step: str):
+    """Run an async WordPressService method inside a ``step`` span of ``self.metrics``."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            with self.metrics.span(step):
+                return await func(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+DEFAULT_METRICS = Metrics()
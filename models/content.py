@@ -1,8 +1,12 @@
 """
 Data models for WordPress content.
 """
-from dataclasses import dataclass
+import hashlib
+import json
+from dataclasses import dataclass, field, fields
 from datetime import datetime
+from functools import cached_property
+from typing import Any, Dict, List, Optional, Union
 
 
 @dataclass
@@ -13,4 +17,157 @@ class PublishedArticle:
     title: str
     status: str
     published_at: datetime
-    meta: dict
\ No newline at end of file
+    meta: dict
+
+
+def meta_digest(meta: dict) -> str:
+    """Content hash of a post's meta, used to reference it in a meta store."""
+    canonical = json.dumps(meta, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+
+@dataclass(slots=True)
+class CompactArticle:
+    """Memory-light stand-in for PublishedArticle.
+
+    Keeps identifiers, status and time, and replaces ``meta`` (which can
+    hold the whole ``_elementor_data`` JSON) with its digest. The full meta
+    can be kept in a ``result_store.MetaStore`` and loaded by digest.
+    """
+    post_id: int
+    url: str
+    status: str
+    published_at: float
+    meta_digest: Optional[str] = None
+
+    @classmethod
+    def from_article(cls, article: PublishedArticle, store=None) -> "CompactArticle":
+        """Compact ``article``, spilling its meta to ``store`` if one is given."""
+        digest = None
+        if article.meta:
+            digest = store.put(article.meta) if store is not None else meta_digest(article.meta)
+        return cls(
+            post_id=article.post_id,
+            url=article.url,
+            status=article.status,
+            published_at=article.published_at.timestamp(),
+            meta_digest=digest
+        )
+
+
+@dataclass
+class ArticleSpec:
+    """Input for a single publish in a batch.
+
+    Specs with ``faq_items`` set are published through the Elementor layout
+    (TOC, content and FAQ accordion); all others go through ``publish_article``.
+    ``slug`` and ``external_id`` identify the existing post in upsert mode;
+    an ``external_id`` is resolved through the publish journal.
+    """
+    title: str
+    content: str
+    status: str = "publish"
+    categories: Optional[List[str]] = None
+    tags: Optional[List[str]] = None
+    publish_date: Optional[str] = None
+    meta_description: Optional[str] = None
+    excerpt: Optional[str] = None
+    faq_items: Optional[List[dict]] = None
+    slug: Optional[str] = None
+    external_id: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ArticleSpec":
+        """Build a spec from a plain dict, ignoring unknown keys.
+
+        ``content_html`` is accepted as an alias for ``content`` so that
+        payloads written for ``publish_elementor_widgets_meta`` can be reused.
+        """
+        if not isinstance(data, dict):
+            raise TypeError(f"Expected an object, got {type(data).__name__}")
+        data = dict(data)
+        if "content" not in data and "content_html" in data:
+            data["content"] = data.pop("content_html")
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+
+@dataclass
+class CompiledPost:
+    """An ArticleSpec rendered offline into its final REST payload.
+
+    ``kind`` is ``"article"`` or ``"elementor"``. Everything but the
+    taxonomy IDs, which are resolved by name when publishing, is ready to
+    send. ``spec_digest`` identifies the source spec in publish journals.
+    """
+    index: int
+    kind: str
+    payload: Dict[str, Any]
+    spec_digest: str
+    categories: Optional[List[str]] = None
+    tags: Optional[List[str]] = None
+    slug: Optional[str] = None
+    external_id: Optional[str] = None
+
+    @property
+    def title(self) -> str:
+        return self.payload.get("title", "")
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CompiledPost":
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+
+@dataclass
+class PublishResult:
+    """Outcome of one spec in a batch publish: either an article or an error."""
+    index: int
+    spec: Optional[Union[ArticleSpec, CompiledPost]]
+    article: Optional[PublishedArticle] = None
+    error: Optional[BaseException] = field(default=None, repr=False)
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class RemotePost:
+    """A post read back from the REST API.
+
+    ``raw`` is the API response item, kept as-is. ``_elementor_data`` is a
+    JSON string in post meta and is only decoded when ``elementor_data`` is
+    first accessed, so reading thousands of posts does not build thousands
+    of element trees nobody looks at.
+    """
+    raw: Dict[str, Any]
+
+    @property
+    def post_id(self) -> int:
+        return self.raw["id"]
+
+    @property
+    def title(self) -> str:
+        title = self.raw.get("title", "")
+        return title.get("raw", title.get("rendered", "")) if isinstance(title, dict) else title
+
+    @property
+    def status(self) -> Optional[str]:
+        return self.raw.get("status")
+
+    @property
+    def url(self) -> Optional[str]:
+        return self.raw.get("link")
+
+    @property
+    def meta(self) -> dict:
+        return self.raw.get("meta") or {}
+
+    @cached_property
+    def elementor_data(self) -> Optional[List[dict]]:
+        """Decoded Elementor element tree, or None if the post has none."""
+        data = self.meta.get("_elementor_data")
+        if not data:
+            return None
+        return json.loads(data) if isinstance(data, str) else data
@@ -0,0 +1,199 @@
+"""
+Fan-out publishing of one article set to many WordPress sites.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field, fields
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Union
+
+from config import get_site_configs
+from http_pool import PoolConfig
+from models.content import ArticleSpec, PublishResult
+from session_cache import SessionCache
+from wordpress_service import WordPressService
+
+
+@dataclass
+class SiteConfig:
+    """Connection and throughput settings for one site.
+
+    Args:
+        name: Label used in results and stats (defaults to ``base_url``)
+        concurrency: Publishes in flight for this site
+        rate_limit: Publishes started per second for this site
+    """
+    base_url: str
+    username: str
+    password: str
+    name: str = ""
+    concurrency: int = 4
+    rate_limit: Optional[float] = None
+    timeout: int = 60
+
+    def __post_init__(self):
+        if not self.name:
+            self.name = self.base_url
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SiteConfig":
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+
+@dataclass
+class SiteStats:
+    """Running totals for one site."""
+    site: str
+    published: int = 0
+    failed: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+    finished_at: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    @property
+    def throughput(self) -> float:
+        """Successful publishes per second."""
+        return self.published / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def error_rate(self) -> float:
+        total = self.published + self.failed
+        return self.failed / total if total else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "site": self.site,
+            "published": self.published,
+            "failed": self.failed,
+            "elapsed": round(self.elapsed, 3),
+            "throughput": round(self.throughput, 3),
+            "error_rate": round(self.error_rate, 4),
+        }
+
+
+@dataclass
+class SiteResult:
+    """A batch result tagged with the site it was published to."""
+    site: str
+    result: PublishResult
+
+
+SpecSource = Union[Iterable[Union[ArticleSpec, dict]], Callable[[], Iterable[Union[ArticleSpec, dict]]]]
+
+
+class MultiSitePublisher:
+    """Publishes the same articles to several sites, each with its own workers.
+
+    Every site gets one WordPressService on a shared, pooled client, and its
+    own ``publish_many`` run with the site's concurrency and rate limit.
+    Sites progress independently, so one slow or failing site does not hold
+    up the others.
+
+    Args:
+        sites: Site settings
+        pool: Connection pool settings used for every site's client
+        session_cache: Login cookie cache shared by all sites
+        **service_kwargs: Extra WordPressService arguments
+    """
+
+    def __init__(
+        self,
+        sites: List[SiteConfig],
+        pool: Optional[PoolConfig] = None,
+        session_cache: Optional[SessionCache] = None,
+        **service_kwargs
+    ):
+        names = [site.name for site in sites]
+        if len(set(names)) != len(names):
+            raise ValueError("Site names must be unique")
+        self.sites = sites
+        self.logger = logging.getLogger(__name__)
+        self.services: Dict[str, WordPressService] = {
+            site.name: WordPressService(
+                base_url=site.base_url,
+                username=site.username,
+                password=site.password,
+                timeout=site.timeout,
+                pool=pool,
+                share_client=True,
+                session_cache=session_cache,
+                **service_kwargs
+            )
+            for site in sites
+        }
+        self.stats: Dict[str, SiteStats] = {}
+
+    @classmethod
+    def from_config(cls, **kwargs) -> "MultiSitePublisher":
+        """Build a publisher for every site listed in ``config.json``."""
+        return cls([SiteConfig.from_dict(site) for site in get_site_configs()], **kwargs)
+
+    async def publish(
+        self,
+        specs: SpecSource,
+        upsert: bool = False,
+        base_dir: Optional[str] = None
+    ) -> AsyncIterator[SiteResult]:
+        """
+        Publish every spec to every site, yielding results as they complete.
+
+        Args:
+            specs: A list of specs, or a zero-argument callable returning a
+                fresh iterable for each site (for example a function opening
+                and streaming a JSONL file) so large inputs are not held in memory
+            upsert: Update existing posts instead of creating new ones
+                (see ``WordPressService.publish_many``)
+            base_dir: Directory the specs' local images are relative to
+
+        Yields:
+            SiteResult for each (site, spec) pair, in completion order
+        """
+        if not callable(specs):
+            specs = list(specs)
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+
+        async def run_site(site: SiteConfig):
+            stats = SiteStats(site=site.name)
+            self.stats[site.name] = stats
+            source = specs() if callable(specs) else specs
+            try:
+                async for result in self.services[site.name].publish_many(
+                    source, concurrency=site.concurrency, rate_limit=site.rate_limit, upsert=upsert,
+                    base_dir=base_dir
+                ):
+                    if result.ok:
+                        stats.published += 1
+                    else:
+                        stats.failed += 1
+                    await queue.put(SiteResult(site=site.name, result=result))
+            except Exception as e:
+                self.logger.error(f"Site {site.name} stopped: {e}")
+            finally:
+                stats.finished_at = time.monotonic()
+                await queue.put(done)
+
+        tasks = [asyncio.create_task(run_site(site)) for site in self.sites]
+        remaining = len(tasks)
+        try:
+            while remaining:
+                item = await queue.get()
+                if item is done:
+                    remaining -= 1
+                else:
+                    yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def report(self) -> List[dict]:
+        """Per-site throughput and error rates for the last run."""
+        return [stats.as_dict() for stats in self.stats.values()]
+
+    async def close(self):
+        for service in self.services.values():
+            await service.close()
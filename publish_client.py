@@ -0,0 +1,160 @@
+"""
+Thin client for the publishing daemon (see ``publish_daemon``).
+
+Only the standard library is imported, so a cron job or editor hook hands an
+article to the already logged-in daemon in milliseconds instead of starting
+httpx, logging in and opening connections itself:
+
+    python publish_client.py article.json
+    python publish_client.py articles.jsonl --site blog --upsert
+    python publish_client.py --stats
+
+Input files hold one spec object, a JSON array of specs, or JSONL. Results
+are printed as one JSON line per (site, spec); the exit status is 1 if any
+failed. A daemon on a TCP port (``--connect``) is sent the token it wrote to
+``DEFAULT_TOKEN_FILE``, which only its user can read.
+"""
+import argparse
+import json
+import os
+import socket
+import sys
+from pathlib import Path
+from typing import Any, List, Optional
+
+DEFAULT_SOCKET = Path.home() / ".cache" / "wp-elementor-post" / "publishd.sock"
+# Written by a daemon listening on TCP; requests must carry its contents
+DEFAULT_TOKEN_FILE = DEFAULT_SOCKET.with_name("publishd.token")
+
+
+class DaemonError(RuntimeError):
+    """The daemon could not carry out a request."""
+
+
+class DaemonClient:
+    """Sends requests to a running daemon, one connection per request.
+
+    Args:
+        socket_path: Daemon's Unix socket (default: ``DEFAULT_SOCKET``)
+        address: ``host:port`` of a daemon listening on TCP instead
+        timeout: Seconds to wait for a reply (default: no limit, since a
+            publish takes as long as the site does)
+        token_file: File holding a TCP daemon's token (default: ``DEFAULT_TOKEN_FILE``)
+    """
+
+    def __init__(self, socket_path: Optional[str] = None, address: Optional[str] = None,
+                 timeout: Optional[float] = None, token_file: Optional[str] = None):
+        self.socket_path = str(socket_path or DEFAULT_SOCKET)
+        self.address = address
+        self.timeout = timeout
+        self.token_file = Path(token_file or DEFAULT_TOKEN_FILE)
+
+    def _connect(self) -> socket.socket:
+        if self.address:
+            host, _, port = self.address.rpartition(":")
+            return socket.create_connection((host or "127.0.0.1", int(port)), timeout=self.timeout)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def request(self, message: dict) -> dict:
+        """Send one request and return the daemon's reply.
+
+        Raises:
+            DaemonError: If the daemon rejected the request
+            OSError: If the daemon is not running, the connection failed or,
+                for a TCP daemon, its token file cannot be read
+        """
+        if self.address:
+            message = {**message, "token": self.token_file.read_text(encoding="utf-8").strip()}
+        with self._connect() as sock:
+            sock.sendall(json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n")
+            with sock.makefile("rb") as reply:
+                line = reply.readline()
+        if not line:
+            raise DaemonError("Daemon closed the connection without replying")
+        response = json.loads(line)
+        if not response.get("ok"):
+            raise DaemonError(response.get("error", "Unknown error"))
+        return response
+
+    def publish(self, specs: List[Any], site: Optional[str] = None, upsert: Optional[bool] = None,
+                base_dir: Optional[str] = None) -> List[dict]:
+        """
+        Publish specs through the daemon and wait for them to finish.
+
+        Args:
+            specs: Spec dicts, as in a batch JSONL file
+            site: Site name to publish to (default: every site the daemon serves)
+            upsert: Override the daemon's upsert setting
+            base_dir: Directory the specs' local images are relative to
+                (default: the current working directory)
+
+        Returns:
+            One result record per (site, spec)
+        """
+        message = {"op": "publish", "specs": specs, "base_dir": os.path.abspath(base_dir or os.getcwd())}
+        if site:
+            message["site"] = site
+        if upsert is not None:
+            message["upsert"] = upsert
+        return self.request(message)["results"]
+
+    def stats(self) -> dict:
+        """Per-site totals, in-flight counts and connection state of the daemon."""
+        return self.request({"op": "stats"})
+
+    def ping(self) -> dict:
+        return self.request({"op": "ping"})
+
+
+def read_specs(path: str) -> List[Any]:
+    """Specs from a JSON object, JSON array or JSONL file (``-`` for stdin)."""
+    text = sys.stdin.read() if path == "-" else Path(path).read_text(encoding="utf-8")
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    return data if isinstance(data, list) else [data]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Submit articles to the publishing daemon.")
+    parser.add_argument("input", nargs="?", help="JSON or JSONL file of article specs, or - for stdin")
+    parser.add_argument("--socket", default=None, help=f"Daemon socket (default: {DEFAULT_SOCKET})")
+    parser.add_argument("--connect", default=None, help="host:port of a daemon started with --listen")
+    parser.add_argument("--token-file", default=None,
+                        help=f"Token of the daemon at --connect (default: {DEFAULT_TOKEN_FILE})")
+    parser.add_argument("--site", default=None, help="Publish to this site only (default: all of the daemon's sites)")
+    parser.add_argument("--upsert", action="store_true", default=None,
+                        help="Update posts matched by external_id or slug, skipping unchanged ones")
+    parser.add_argument("--media-dir", default=None,
+                        help="Directory local images are relative to (default: the input file's directory)")
+    parser.add_argument("--timeout", type=float, default=None, help="Seconds to wait for the daemon")
+    parser.add_argument("--stats", action="store_true", help="Print the daemon's stats and exit")
+    args = parser.parse_args(argv)
+    if not args.stats and not args.input:
+        parser.error("an input file or --stats is required")
+
+    client = DaemonClient(args.socket, args.connect, args.timeout, args.token_file)
+    try:
+        if args.stats:
+            print(json.dumps(client.stats(), indent=2))
+            return 0
+        base_dir = args.media_dir or (os.path.dirname(os.path.abspath(args.input)) if args.input != "-" else None)
+        results = client.publish(read_specs(args.input), site=args.site, upsert=args.upsert, base_dir=base_dir)
+    except (OSError, DaemonError) as e:
+        print(f"Daemon request failed: {e}", file=sys.stderr)
+        return 2
+    for record in results:
+        print(json.dumps(record, ensure_ascii=False))
+    return 1 if any(not record["ok"] for record in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,369 @@
+"""
+Long-lived publishing daemon.
+
+A cron job that runs ``publish_elementor_widgets.py`` for one post pays for
+importing httpx, building a WordPressService, logging in through
+``/wp-login.php`` and opening cold connections, which together take longer
+than the publish itself. ``PublishDaemon`` pays that once: it keeps one
+logged-in, pooled service per site and serves publish jobs over a Unix
+socket (or a localhost TCP port). ``publish_client`` submits jobs to it.
+
+The protocol is one JSON object per line in each direction. A request has an
+``op``:
+
+- ``{"op": "publish", "specs": [...], "site": "blog", "upsert": true,
+  "base_dir": "/home/me/articles"}``: publish specs (dicts, as in a batch JSONL
+  file, or compiled posts) to one site, or to every site when ``site`` is
+  omitted, and reply once all are done with ``{"ok": true, "results": [...]}``.
+  Local images are resolved against the client's ``base_dir``; without one,
+  specs referencing local images fail.
+- ``{"op": "stats"}``: per-site totals, in-flight counts and adaptive limits
+- ``{"op": "ping"}``
+
+On a TCP port, which every local user can connect to, each request must also
+carry ``"token"``: the secret the daemon writes, readable by its owner only,
+to a token file at startup.
+
+Failures to parse or route a request are answered with
+``{"ok": false, "error": "..."}``; a failed spec is reported in its result.
+"""
+import asyncio
+import hmac
+import ipaddress
+import json
+import logging
+import os
+import secrets
+import socket
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from adaptive_limit import host_limits
+from http_pool import PoolConfig
+from models.content import ArticleSpec, CompiledPost
+from multisite import MultiSitePublisher, SiteConfig, SiteStats
+from publish_client import DEFAULT_SOCKET, DEFAULT_TOKEN_FILE
+from rate_limit import RateLimiter, get_host_limiter
+from request_body import dumps_bytes
+from session_cache import SessionCache
+from wordpress_service import WordPressService
+
+# Largest request line accepted; a request carries whole articles
+MAX_REQUEST_SIZE = 64 * 1024 * 1024
+
+
+def check_loopback(host: str):
+    """Refuse to listen anywhere but loopback.
+
+    The daemon publishes with the stored WordPress credentials, so only
+    local processes may reach it (and, on TCP, only those holding its token).
+
+    Raises:
+        ValueError: If ``host`` is not a loopback name or address
+    """
+    if host == "localhost":
+        return
+    try:
+        loopback = ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        loopback = False
+    if not loopback:
+        raise ValueError(f"Refusing to listen on {host!r}: the daemon only accepts loopback addresses")
+
+
+def write_token(path: Path) -> str:
+    """Write a fresh random token to ``path``, readable by the current user only, and return it."""
+    path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+    token = secrets.token_urlsafe(32)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    # Created 0600 from the start, then moved over any older token
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(token)
+    os.replace(tmp, path)
+    return token
+
+
+class PublishDaemon:
+    """Serves publish jobs with warm per-site services.
+
+    Args:
+        sites: Site settings; ``concurrency`` and ``rate_limit`` apply across
+            all connected clients
+        pool: Connection pool settings used for every site's client
+        session_cache: Login cookie cache shared by all sites
+        upsert: Default upsert mode for jobs that do not set one
+        keepalive: Ping a site that has been idle this many seconds, keeping
+            its pooled connections and session alive (0 disables)
+        warm_taxonomies: Load every category and tag into the taxonomy cache
+            at startup
+        **service_kwargs: Extra WordPressService arguments
+    """
+
+    def __init__(
+        self,
+        sites: List[SiteConfig],
+        pool: Optional[PoolConfig] = None,
+        session_cache: Optional[SessionCache] = None,
+        upsert: bool = False,
+        keepalive: float = 20.0,
+        warm_taxonomies: bool = False,
+        **service_kwargs
+    ):
+        self.publisher = MultiSitePublisher(sites, pool=pool, session_cache=session_cache, **service_kwargs)
+        self.sites: Dict[str, SiteConfig] = {site.name: site for site in sites}
+        self.services: Dict[str, WordPressService] = self.publisher.services
+        self.cache_warmer = service_kwargs.get("cache_warmer")
+        self.upsert = upsert
+        self.keepalive = keepalive
+        self.warm_taxonomies = warm_taxonomies
+        self.logger = logging.getLogger(__name__)
+        self.stats: Dict[str, SiteStats] = {name: SiteStats(site=name) for name in self.sites}
+        self.started_at = time.monotonic()
+        self.jobs = 0
+        self._slots = {name: asyncio.Semaphore(site.concurrency) for name, site in self.sites.items()}
+        self._limiters: Dict[str, Optional[RateLimiter]] = {
+            name: get_host_limiter(site.base_url, site.rate_limit) if site.rate_limit else None
+            for name, site in self.sites.items()
+        }
+        self._in_flight = {name: 0 for name in self.sites}
+        self._last_used = {name: time.monotonic() for name in self.sites}
+        self.address: Optional[str] = None
+        self._connections: Dict[asyncio.Task, asyncio.StreamWriter] = {}
+        self._busy = set()
+        self._stopping = False
+        # Required in every request while listening on TCP
+        self._token: Optional[str] = None
+
+    async def start(self):
+        """Log in to every site (and warm its caches) before taking jobs."""
+        async def warm(name: str, service: WordPressService):
+            try:
+                if not await service.ensure_session():
+                    self.logger.warning(f"No session for {name}; using application-password auth")
+                if self.warm_taxonomies:
+                    await service.warm_taxonomy_cache()
+                await service.ping()
+            except Exception as e:
+                self.logger.error(f"Could not warm up {name}: {e}")
+
+        await asyncio.gather(*(warm(name, service) for name, service in self.services.items()))
+        self.logger.info(f"Warmed up {len(self.services)} site(s)")
+
+    async def _keep_warm(self):
+        while True:
+            await asyncio.sleep(self.keepalive / 2)
+            now = time.monotonic()
+            for name, service in self.services.items():
+                if self._in_flight[name] or now - self._last_used[name] < self.keepalive:
+                    continue
+                self._last_used[name] = now
+                try:
+                    await service.ping()
+                except Exception as e:
+                    self.logger.warning(f"Keepalive ping to {name} failed: {e}")
+
+    async def _publish_one(self, name: str, index: int, raw: Any, upsert: bool, base_dir: Optional[str]) -> dict:
+        record = {"site": name, "index": index, "ok": False, "title": None}
+        try:
+            if isinstance(raw, dict) and "payload" in raw:
+                spec = CompiledPost.from_dict(raw)
+            else:
+                spec = ArticleSpec.from_dict(raw)
+        except Exception as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+            self.stats[name].failed += 1
+            return record
+        record["title"] = spec.title
+
+        async with self._slots[name]:
+            self._in_flight[name] += 1
+            try:
+                if self._limiters[name] is not None:
+                    await self._limiters[name].acquire()
+                article = await self.services[name].publish_spec(spec, upsert, base_dir)
+            except Exception as e:
+                self.logger.error(f"Publishing {spec.title!r} to {name} failed: {e}")
+                self.stats[name].failed += 1
+                record["error"] = f"{type(e).__name__}: {e}"
+                return record
+            finally:
+                self._in_flight[name] -= 1
+                self._last_used[name] = time.monotonic()
+        self.stats[name].published += 1
+        record.update(ok=True, post_id=article.post_id, url=article.url, status=article.status)
+        return record
+
+    async def publish(
+        self,
+        specs: List[Any],
+        site: Optional[str] = None,
+        upsert: Optional[bool] = None,
+        base_dir: Optional[str] = None
+    ) -> List[dict]:
+        """
+        Publish specs to one site or all of them.
+
+        Args:
+            specs: ArticleSpec dicts or compiled post dicts
+            site: Site name (default: every site)
+            upsert: Override the daemon's default upsert mode
+            base_dir: The client's directory local images are relative to
+
+        Returns:
+            One result record per (site, spec), sites in configuration order
+        """
+        if site is not None and site not in self.services:
+            raise ValueError(f"Unknown site {site!r}")
+        if not isinstance(specs, list):
+            raise ValueError("specs must be a list")
+        if base_dir is not None and not os.path.isabs(base_dir):
+            raise ValueError("base_dir must be an absolute path")
+        upsert = self.upsert if upsert is None else upsert
+        names = [site] if site is not None else list(self.services)
+        self.jobs += 1
+        return list(await asyncio.gather(*(
+            self._publish_one(name, index, raw, upsert, base_dir) for name in names for index, raw in enumerate(specs)
+        )))
+
+    def report(self) -> dict:
+        """Uptime, jobs served, per-site totals and, with a cache warmer, page TTFBs."""
+        report = {
+            "uptime": round(time.monotonic() - self.started_at, 3),
+            "jobs": self.jobs,
+            "sites": [
+                {**self.stats[name].as_dict(), "in_flight": self._in_flight[name]}
+                for name in self.sites
+            ],
+            "concurrency_limits": host_limits(),
+        }
+        if self.cache_warmer is not None:
+            report["cache_warm"] = self.cache_warmer.summary()
+        return report
+
+    async def _dispatch(self, request: Any) -> dict:
+        if not isinstance(request, dict):
+            raise ValueError("Request must be a JSON object")
+        if self._token is not None and not hmac.compare_digest(str(request.get("token", "")), self._token):
+            raise PermissionError("Missing or wrong token")
+        op = request.get("op")
+        if op == "publish":
+            specs = request.get("specs")
+            if specs is None and "spec" in request:
+                specs = [request["spec"]]
+            results = await self.publish(specs, request.get("site"), request.get("upsert"), request.get("base_dir"))
+            return {"ok": True, "results": results}
+        if op == "stats":
+            return {"ok": True, **self.report()}
+        if op == "ping":
+            return {"ok": True, "uptime": round(time.monotonic() - self.started_at, 3)}
+        raise ValueError(f"Unknown op {op!r}")
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._connections[asyncio.current_task()] = writer
+        try:
+            while not self._stopping:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    writer.write(dumps_bytes({"ok": False, "error": "Request too large"}) + b"\n")
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                self._busy.add(asyncio.current_task())
+                try:
+                    response = await self._dispatch(json.loads(line))
+                except Exception as e:
+                    response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+                finally:
+                    self._busy.discard(asyncio.current_task())
+                writer.write(dumps_bytes(response) + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self._connections.pop(asyncio.current_task(), None)
+            writer.close()
+
+    async def serve(
+        self,
+        socket_path: Optional[str] = None,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+        stop: Optional[asyncio.Event] = None,
+        token_file: Optional[str] = None
+    ):
+        """
+        Warm up, then serve requests until ``stop`` is set.
+
+        Listens on ``socket_path`` (default: ``DEFAULT_SOCKET``) unless a
+        TCP ``port`` is given, in which case ``host`` must be a loopback
+        address and requests must carry the token written to ``token_file``
+        (default: ``DEFAULT_TOKEN_FILE``). The socket and token files are
+        created accessible to the current user only; a stale socket left by
+        a crashed daemon is replaced. Jobs in progress are finished before
+        returning.
+        """
+        stop = stop or asyncio.Event()
+        host = host or "127.0.0.1"
+        if port is not None:
+            check_loopback(host)
+        await self.start()
+        if port is not None:
+            token_path = Path(token_file or DEFAULT_TOKEN_FILE)
+            self._token = write_token(token_path)
+            server = await asyncio.start_server(self._handle_connection, host, port, limit=MAX_REQUEST_SIZE)
+            where = f"{host}:{server.sockets[0].getsockname()[1]}"
+        else:
+            path = Path(socket_path or DEFAULT_SOCKET)
+            path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+            _remove_stale_socket(path)
+            # Created with 0600 permissions from the start, not chmod'ed after bind
+            umask = os.umask(0o177)
+            try:
+                server = await asyncio.start_unix_server(self._handle_connection, str(path), limit=MAX_REQUEST_SIZE)
+            finally:
+                os.umask(umask)
+            where = str(path)
+        self.address = where
+        self.logger.info(f"Publishing daemon listening on {where}")
+
+        keeper = asyncio.create_task(self._keep_warm()) if self.keepalive else None
+        try:
+            await stop.wait()
+        finally:
+            self._stopping = True
+            server.close()
+            if keeper is not None:
+                keeper.cancel()
+            # Idle connections are closed; those running a job reply first
+            for task, writer in list(self._connections.items()):
+                if task not in self._busy:
+                    writer.close()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+            await server.wait_closed()
+            if port is None:
+                Path(where).unlink(missing_ok=True)
+            else:
+                token_path.unlink(missing_ok=True)
+
+    async def close(self):
+        await self.publisher.close()
+
+
+def _remove_stale_socket(path: Path):
+    """Delete a socket file no daemon is listening on; refuse to replace a live one."""
+    if not path.exists():
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(str(path))
+    except OSError:
+        path.unlink()
+    else:
+        raise RuntimeError(f"A daemon is already listening on {path}")
+    finally:
+        probe.close()
@@ -1,22 +1,155 @@
+"""
+Publish Elementor articles to WordPress.
+
+Without arguments this publishes a built-in sample article. The ``batch``
+command streams article specs from a JSONL file and publishes them
+concurrently, writing one JSON result line per article as it completes:
+
+    python publish_elementor_widgets.py batch articles.jsonl --workers 8 --results results.jsonl
+
+Each input line is a JSON object with the ArticleSpec fields (``title``,
+``content`` or ``content_html``, ``status``, ``categories``, ``tags``,
+``publish_date``, ``meta_description``, ``excerpt``, ``faq_items``).
+Credentials come from the command line, then ``config.json``.
+
+``enqueue`` and ``worker`` put the same specs in a persistent queue and
+publish them later, optionally at a scheduled time and from several worker
+processes:
+
+    python publish_elementor_widgets.py enqueue articles.jsonl --queue queue.sqlite --at 2025-01-01T09:00
+    python publish_elementor_widgets.py worker --queue queue.sqlite --workers 4 --rate-limit 1
+
+``compile`` renders specs on all cores ahead of time and ``publish-compiled``
+sends the spooled payloads, so publishing does no rendering at all:
+
+    python publish_elementor_widgets.py --preprocess-html compile articles.jsonl articles.compiled.jsonl.gz
+    python publish_elementor_widgets.py publish-compiled articles.compiled.jsonl.gz --workers 8
+
+``daemon`` stays resident with a logged-in, pooled service per site and takes
+jobs from ``publish_client.py`` over a Unix socket:
+
+    python publish_elementor_widgets.py daemon --journal journal.jsonl &
+    python publish_client.py article.json
+"""
+import argparse
 import asyncio
-from wordpress_service import WordPressService
+import json
+import logging
+import os
+import signal
+import sys
+from datetime import datetime
+from typing import Iterator, Optional, TextIO, Tuple
+
+from adaptive_limit import ConcurrencyPolicy, host_limits
+from cache_warmer import CacheWarmer
+from compile_stage import compile_specs, iter_compiled
+from config import get_config, get_site_configs
+from content_pipeline import ContentPipeline
+from elementor_layout import ElementorLayout
+from job_queue import JobQueue, QueueWorker
+from media import MediaIndex
+from metrics import DEFAULT_METRICS, JsonlSpanWriter
+from multisite import MultiSitePublisher, SiteConfig
+from publish_daemon import PublishDaemon, check_loopback
+from publish_journal import PublishJournal
+from result_store import BatchResults, MetaStore
+from session_cache import SessionCache
+from template_library import TemplateLibrary
+from wordpress_service import DEFAULT_READ_FIELDS, WordPressService
+
 
+def site_credentials(args: argparse.Namespace) -> Tuple[str, str, str]:
+    """Base URL, username and password from the command line, else config.json.
 
-wp_service = WordPressService(
-        base_url="https://www.idsexpress.net", # example https://www.idsexpress.net
-        username="idsexpress@aol.com", # example aaa@a.com
-        password="xwPl Ma5g 1HRK 7PxW IY9N T2ti", # Application password
-        cookies=None
+    There is no built-in site: every command, the single-post demo included,
+    must be told which site to write to.
+
+    Raises:
+        ValueError: If a setting is missing
+    """
+    config = get_config()
+    settings = {
+        "--base-url": args.base_url or config.get("base_url"),
+        "--username": args.username or config.get("username"),
+        "--password": args.password or config.get("password"),
+    }
+    missing = [name for name, value in settings.items() if not value]
+    if missing:
+        raise ValueError(
+            f"{args.command or 'publish'} needs a site: pass {', '.join(missing)} or set them in config.json"
+        )
+    return tuple(settings.values())
+
+
+def build_service(args: argparse.Namespace) -> WordPressService:
+    base_url, username, password = site_credentials(args)
+    preprocess = args.preprocess_html
+    return WordPressService(
+        base_url=base_url,
+        username=username,
+        password=password,
+        cookies=None,
+        session_cache=None if args.no_session_cache else SessionCache(args.session_cache),
+        content_pipeline=ContentPipeline() if preprocess else None,
+        layout=ElementorLayout(static_toc=True) if preprocess else None,
+        media_index=MediaIndex(args.media_index) if args.upload_images else None,
+        concurrency_policy=ConcurrencyPolicy(max_limit=args.max_in_flight) if args.adaptive_concurrency else None,
+        gzip_requests=args.gzip_requests,
+        batch_writes=args.batch_writes,
+        cache_warmer=build_warmer(args),
+        template_library=TemplateLibrary(args.template_cache) if args.use_templates else None
     )
-async def publish():
+
+
+def media_dir(args: argparse.Namespace) -> str:
+    """Directory local images are resolved against: ``--media-dir``, else the input file's, else the cwd."""
+    if args.media_dir:
+        return os.path.abspath(args.media_dir)
+    path = getattr(args, "input", None)
+    if path and path != "-":
+        return os.path.dirname(os.path.abspath(path))
+    return os.getcwd()
+
+
+def build_warmer(args: argparse.Namespace) -> Optional[CacheWarmer]:
+    if not args.warm_cache:
+        return None
+    return CacheWarmer(concurrency=args.warm_concurrency, rate_limit=args.warm_rate_limit)
+
+
+async def finish_warming(warmer: Optional[CacheWarmer]):
+    """Wait for pages still being warmed and print cold/warm TTFB."""
+    if warmer is None:
+        return
+    await warmer.close()
+    print(json.dumps({"cache_warm": warmer.summary()}), file=sys.stderr)
+
+
+def iter_jsonl(stream: TextIO) -> Iterator:
+    """Yield one parsed object per non-blank line, reading lazily.
+
+    Malformed lines are yielded as their raw text so that the batch reports
+    them as failed items instead of stopping.
+    """
+    for line_no, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            logging.getLogger(__name__).error(f"Line {line_no}: invalid JSON: {e}")
+            yield line
+
+
+async def publish(wp_service: WordPressService, args: argparse.Namespace):
     try:
-        await wp_service.login_with_credentials()
+        await wp_service.ensure_session()
     except Exception as e:
         print(f"Login failed: {e}")
         return
-    
-    
-    await wp_service.login_with_credentials()
+
     content_html = """
         <h2>Introduction</h2>
         <p>This is the intro section.</p>
@@ -31,15 +164,479 @@ async def publish():
         {"question": "Is it legal to find emails online?", "answer": "Yes, as long as you use them for legitimate business purposes and follow GDPR or CAN-SPAN rules."},
         {"question": "What's the most accurate way to find emails?", "answer": "Using Email verifier tools like LeadsScraper.io ensures higher accuracy than manual guessing."},
     ]
-    try: 
-        await wp_service.publish_elementor_widgets_meta(content_html, faq_items)   
+    try:
+        data = await wp_service.publish_elementor_widgets_meta(content_html, faq_items, base_dir=media_dir(args))
+        print("Post created:", data.get("link"))
     except Exception as e:
         print(f"Error publishing Elementor widgets meta: {e}")
     finally:
-        await wp_service.close()            
-    
+        await wp_service.close()
+        await finish_warming(wp_service.cache_warmer)
+
+
+async def publish_batch(wp_service: WordPressService, args: argparse.Namespace) -> int:
+    """Stream specs (or, for ``publish-compiled``, compiled posts) from ``args.input``
+    and write results to ``args.results``.
+
+    Returns:
+        Number of failed items
+    """
+    if args.command == "publish-compiled":
+        source, specs = None, iter_compiled(args.input)
+    else:
+        source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+        specs = iter_jsonl(source)
+    results = sys.stdout if args.results == "-" else open(args.results, "a", encoding="utf-8")
+    meta_store = MetaStore(args.meta_store) if args.meta_store else None
+    batch = BatchResults(meta_store)
+    try:
+        await wp_service.ensure_session()
+
+        async for result in wp_service.publish_many(
+            specs,
+            concurrency=args.workers,
+            rate_limit=args.rate_limit,
+            upsert=args.upsert,
+            base_dir=media_dir(args)
+        ):
+            record = {"index": result.index, "ok": result.ok,
+                      "title": result.spec.title if result.spec else None}
+            if result.ok:
+                record.update(post_id=result.article.post_id, url=result.article.url,
+                              status=result.article.status)
+            else:
+                record["error"] = f"{type(result.error).__name__}: {result.error}"
+            results.write(json.dumps(record, ensure_ascii=False) + "\n")
+            results.flush()
+            batch.append(result)
+    finally:
+        if meta_store is not None:
+            meta_store.close()
+        if source is not None and source is not sys.stdin:
+            source.close()
+        if results is not sys.stdout:
+            results.close()
+        if wp_service.journal is not None:
+            wp_service.journal.close()
+        await wp_service.close()
+        await finish_warming(wp_service.cache_warmer)
+
+    print(f"Published {batch.succeeded}, failed {batch.failed}", file=sys.stderr)
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            json.dump(batch.summary(), f, indent=2)
+    return batch.failed
+
+
+async def publish_fanout(args: argparse.Namespace) -> int:
+    """Publish ``args.input`` to every site in config.json.
+
+    Each site streams the input file independently, so a slow site never
+    holds back the others. Returns the number of failed items.
+    """
+    journal = PublishJournal(args.journal) if args.journal else None
+    warmer = build_warmer(args)
+    publisher = MultiSitePublisher.from_config(
+        session_cache=None if args.no_session_cache else SessionCache(args.session_cache),
+        journal=journal,
+        # One pipeline for every site, so each article is processed once
+        content_pipeline=ContentPipeline() if args.preprocess_html else None,
+        layout=ElementorLayout(static_toc=True) if args.preprocess_html else None,
+        media_index=MediaIndex(args.media_index) if args.upload_images else None,
+        concurrency_policy=ConcurrencyPolicy(max_limit=args.max_in_flight) if args.adaptive_concurrency else None,
+        gzip_requests=args.gzip_requests,
+        batch_writes=args.batch_writes,
+        # Shared by every site: warming has one concurrency budget, templates are cached per site
+        cache_warmer=warmer,
+        template_library=TemplateLibrary(args.template_cache) if args.use_templates else None
+    )
+    if not publisher.sites:
+        print("No sites configured in config.json", file=sys.stderr)
+        if warmer is not None:
+            await warmer.close()
+        return 1
+
+    def open_specs():
+        with open(args.input, encoding="utf-8") as source:
+            yield from iter_jsonl(source)
 
+    results = sys.stdout if args.results == "-" else open(args.results, "a", encoding="utf-8")
+    failed = 0
+    try:
+        async for item in publisher.publish(open_specs, upsert=args.upsert, base_dir=media_dir(args)):
+            result = item.result
+            record = {"site": item.site, "index": result.index, "ok": result.ok,
+                      "title": result.spec.title if result.spec else None}
+            if result.ok:
+                record.update(post_id=result.article.post_id, url=result.article.url)
+            else:
+                failed += 1
+                record["error"] = f"{type(result.error).__name__}: {result.error}"
+            results.write(json.dumps(record, ensure_ascii=False) + "\n")
+            results.flush()
+    finally:
+        if results is not sys.stdout:
+            results.close()
+        if journal is not None:
+            journal.close()
+        await publisher.close()
+        await finish_warming(warmer)
+
+    for stats in publisher.report():
+        print(json.dumps(stats), file=sys.stderr)
+    return failed
+
+
+async def export(wp_service: WordPressService, args: argparse.Namespace) -> int:
+    """Export existing posts to ``args.output``; returns the number written."""
+    try:
+        fields = args.fields.split(",") if args.fields else None
+        count = await wp_service.export_posts(
+            args.output, status=args.status, fields=fields, per_page=args.per_page, prefetch=args.prefetch
+        )
+    finally:
+        await wp_service.close()
+    print(f"Exported {count} posts to {args.output}", file=sys.stderr)
+    return count
+
+
+def compile_input(args: argparse.Namespace) -> int:
+    """Render specs from ``args.input`` into ``args.output``; returns the number that failed."""
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    try:
+        compiled, failed = compile_specs(
+            iter_jsonl(source), args.output,
+            workers=args.compile_workers,
+            chunk_size=args.chunk_size,
+            layout=ElementorLayout(static_toc=True) if args.preprocess_html else None,
+            preprocess=args.preprocess_html,
+            upload_images=args.upload_images
+        )
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    print(f"Compiled {compiled}, failed {failed}", file=sys.stderr)
+    return failed
+
+
+def enqueue(args: argparse.Namespace) -> int:
+    """Add specs from ``args.input`` to the job queue; returns the number of invalid lines."""
+    queue = JobQueue(args.queue, args.queue_name)
+    run_at = datetime.fromisoformat(args.at) if args.at else None
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    added = skipped = invalid = 0
+    try:
+        for item in iter_jsonl(source):
+            try:
+                job_id = queue.enqueue(item, priority=args.priority, run_at=run_at,
+                                       max_attempts=args.max_attempts,
+                                       dedupe_key=item.get("external_id") if args.dedupe else None)
+            except (TypeError, AttributeError) as e:
+                logging.getLogger(__name__).error(f"Skipping invalid spec: {e}")
+                invalid += 1
+                continue
+            if job_id is None:
+                skipped += 1
+            else:
+                added += 1
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        queue.close()
+    print(f"Queued {added}, already queued {skipped}, invalid {invalid}", file=sys.stderr)
+    return invalid
+
+
+async def work(wp_service: WordPressService, args: argparse.Namespace) -> int:
+    """Publish jobs from the queue until interrupted (or drained); returns the failed attempts."""
+    queue = JobQueue(args.queue, args.queue_name)
+    worker = QueueWorker(
+        queue, wp_service,
+        concurrency=args.workers,
+        rate_limit=args.rate_limit,
+        visibility_timeout=args.visibility_timeout,
+        poll_interval=args.poll_interval,
+        upsert=args.upsert,
+        base_dir=media_dir(args)
+    )
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+    try:
+        await wp_service.ensure_session()
+        await worker.run(stop, drain=args.drain)
+    finally:
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.remove_signal_handler(signum)
+        if wp_service.journal is not None:
+            wp_service.journal.close()
+        await wp_service.close()
+        await finish_warming(wp_service.cache_warmer)
+        print(json.dumps({"completed": worker.completed, "failed": worker.failed, "queue": queue.stats()}),
+              file=sys.stderr)
+        queue.close()
+    return worker.failed
+
+
+async def run_daemon(args: argparse.Namespace) -> int:
+    """Serve publish jobs until SIGINT/SIGTERM."""
+    host, port = None, None
+    if args.listen:
+        host, _, port = args.listen.rpartition(":")
+        host = host.strip("[]") or "127.0.0.1"
+        try:
+            check_loopback(host)
+            port = int(port)
+        except ValueError as e:
+            print(f"Invalid --listen {args.listen!r}: {e}", file=sys.stderr)
+            return 2
+    if args.base_url or not get_site_configs():
+        try:
+            base_url, username, password = site_credentials(args)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 2
+        sites = [SiteConfig(base_url=base_url, username=username, password=password)]
+    else:
+        sites = [SiteConfig.from_dict(site) for site in get_site_configs()]
+    if args.workers:
+        for site in sites:
+            site.concurrency = args.workers
+    journal = PublishJournal(args.journal) if args.journal else None
+    warmer = build_warmer(args)
+    daemon = PublishDaemon(
+        sites,
+        session_cache=None if args.no_session_cache else SessionCache(args.session_cache),
+        upsert=args.upsert,
+        keepalive=args.keepalive,
+        warm_taxonomies=args.warm_taxonomies,
+        journal=journal,
+        content_pipeline=ContentPipeline() if args.preprocess_html else None,
+        layout=ElementorLayout(static_toc=True) if args.preprocess_html else None,
+        media_index=MediaIndex(args.media_index) if args.upload_images else None,
+        concurrency_policy=ConcurrencyPolicy(max_limit=args.max_in_flight) if args.adaptive_concurrency else None,
+        gzip_requests=args.gzip_requests,
+        batch_writes=args.batch_writes,
+        cache_warmer=warmer,
+        template_library=TemplateLibrary(args.template_cache) if args.use_templates else None
+    )
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+    try:
+        await daemon.serve(args.socket, host, port, stop, args.token_file)
+    finally:
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.remove_signal_handler(signum)
+        print(json.dumps(daemon.report()), file=sys.stderr)
+        if journal is not None:
+            journal.close()
+        await daemon.close()
+        await finish_warming(warmer)
+    return 0
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Publish Elementor articles to WordPress.")
+    parser.add_argument("--base-url", help="Site URL (default: config.json base_url)")
+    parser.add_argument("--username", help="WordPress username (default: config.json username)")
+    parser.add_argument("--password", help="Application password (default: config.json password)")
+    parser.add_argument("--session-cache", default=None,
+                        help="Login cookie cache file (default: ~/.cache/wp-elementor-post/sessions.json)")
+    parser.add_argument("--no-session-cache", action="store_true",
+                        help="Always log in instead of reusing cached session cookies")
+    parser.add_argument("--preprocess-html", action="store_true",
+                        help="Anchor headings, sanitize and minify article HTML and publish a pre-built TOC")
+    parser.add_argument("--upload-images", action="store_true",
+                        help="Upload images referenced by <img src> to the media library and rewrite their URLs")
+    parser.add_argument("--media-dir", default=None,
+                        help="Directory local image paths are resolved against and must be inside "
+                             "(default: the input file's directory, else the working directory)")
+    parser.add_argument("--media-index", default=None,
+                        help="Index of uploaded images (default: ~/.cache/wp-elementor-post/media.json)")
+    parser.add_argument("--metrics", default=None,
+                        help="Write request/step metrics on exit (.json for JSON, otherwise Prometheus text)")
+    parser.add_argument("--trace", default=None, help="Append every request and step span to this JSONL file")
+    parser.add_argument("--adaptive-concurrency", action="store_true",
+                        help="Tune requests in flight from latency and 429/503s; --workers becomes a ceiling")
+    parser.add_argument("--max-in-flight", type=int, default=64,
+                        help="Highest request concurrency the adaptive limit may reach (default: 64)")
+    parser.add_argument("--gzip-requests", action="store_true",
+                        help="Gzip large JSON request bodies (falls back to plain bodies if the site rejects them)")
+    parser.add_argument("--batch-writes", action="store_true",
+                        help="Group concurrent writes into /wp-json/batch/v1 requests (WordPress 5.6+)")
+    parser.add_argument("--use-templates", action="store_true",
+                        help="Save the layout's static widgets to the Elementor library once and reference them")
+    parser.add_argument("--template-cache", default=None,
+                        help="Cache of library template IDs (default: ~/.cache/wp-elementor-post/templates.json)")
+    parser.add_argument("--warm-cache", action="store_true",
+                        help="Fetch each published page afterwards to warm page caches and Elementor CSS")
+    parser.add_argument("--warm-concurrency", type=int, default=4, help="Page fetches in flight while warming")
+    parser.add_argument("--warm-rate-limit", type=float, default=2.0,
+                        help="Page fetches started per second per site while warming (default: 2)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log progress to stderr")
+    commands = parser.add_subparsers(dest="command")
+
+    commands.add_parser("sample", help="Publish the built-in sample article (default)")
+
+    batch = commands.add_parser("batch", help="Publish article specs from a JSONL file")
+    batch.add_argument("input", help="JSONL file of article specs, or - for stdin")
+    batch.add_argument("--workers", type=int, default=4, help="Concurrent publishes (default: 4)")
+    batch.add_argument("--rate-limit", type=float, default=None,
+                       help="Maximum publishes started per second against the site")
+    batch.add_argument("--results", default="-",
+                       help="JSONL file results are appended to, or - for stdout (default)")
+    batch.add_argument("--journal", default=None,
+                       help="Publish journal; re-running with the same journal skips finished "
+                            "articles and resumes partially published ones")
+    batch.add_argument("--upsert", action="store_true",
+                       help="Update posts matched by external_id or slug, skipping unchanged ones")
+    batch.add_argument("--meta-store", default=None,
+                       help="SQLite file the full post meta of each result is kept in")
+    batch.add_argument("--summary", default=None,
+                       help="Write a JSON summary (counts by status and error type) to this file")
+
+    fanout = commands.add_parser("fanout", help="Publish a JSONL file to every site in config.json")
+    fanout.add_argument("input", help="JSONL file of article specs")
+    fanout.add_argument("--results", default="-",
+                        help="JSONL file results are appended to, or - for stdout (default)")
+    fanout.add_argument("--journal", default=None, help="Publish journal shared by all sites")
+    fanout.add_argument("--upsert", action="store_true",
+                        help="Update posts matched by external_id or slug, skipping unchanged ones")
+
+    export_cmd = commands.add_parser("export", help="Stream existing posts to a (gzip) JSONL file")
+    export_cmd.add_argument("output", help="Output file; a .gz suffix enables gzip compression")
+    export_cmd.add_argument("--status", default="publish", help="Post status(es), comma separated (default: publish)")
+    export_cmd.add_argument("--fields", default=",".join(DEFAULT_READ_FIELDS),
+                            help="Comma-separated _fields to request, empty for all (default: %(default)s)")
+    export_cmd.add_argument("--per-page", type=int, default=100, help="Posts per request (max 100)")
+    export_cmd.add_argument("--prefetch", type=int, default=4, help="Page requests kept in flight")
+
+    enqueue_cmd = commands.add_parser("enqueue", help="Add article specs from a JSONL file to a publish queue")
+    enqueue_cmd.add_argument("input", help="JSONL file of article specs, or - for stdin")
+    enqueue_cmd.add_argument("--queue", required=True, help="SQLite queue file")
+    enqueue_cmd.add_argument("--queue-name", default="default", help="Queue within the file (default: default)")
+    enqueue_cmd.add_argument("--priority", type=int, default=0, help="Higher priorities publish first")
+    enqueue_cmd.add_argument("--at", default=None,
+                             help="Publish no earlier than this ISO 8601 time (default: now)")
+    enqueue_cmd.add_argument("--max-attempts", type=int, default=5, help="Attempts before a job is marked dead")
+    enqueue_cmd.add_argument("--dedupe", action="store_true",
+                             help="Skip specs whose external_id is already in the queue")
+
+    compile_cmd = commands.add_parser("compile", help="Render article specs to a file of ready-to-send payloads")
+    compile_cmd.add_argument("input", help="JSONL file of article specs, or - for stdin")
+    compile_cmd.add_argument("output", help="Output file; a .gz suffix enables gzip compression")
+    compile_cmd.add_argument("--compile-workers", type=int, default=None,
+                             help="Render processes (default: one per CPU)")
+    compile_cmd.add_argument("--chunk-size", type=int, default=32, help="Specs sent to a process at a time")
+
+    compiled = commands.add_parser("publish-compiled", help="Publish a file written by the compile command")
+    compiled.add_argument("input", help="Compiled file (.jsonl or .jsonl.gz)")
+    compiled.add_argument("--workers", type=int, default=4, help="Concurrent publishes (default: 4)")
+    compiled.add_argument("--rate-limit", type=float, default=None,
+                          help="Maximum publishes started per second against the site")
+    compiled.add_argument("--results", default="-",
+                          help="JSONL file results are appended to, or - for stdout (default)")
+    compiled.add_argument("--journal", default=None,
+                          help="Publish journal; re-running with the same journal skips finished posts")
+    compiled.add_argument("--upsert", action="store_true",
+                          help="Update posts matched by external_id or slug, skipping unchanged ones")
+    compiled.add_argument("--meta-store", default=None,
+                          help="SQLite file the full post meta of each result is kept in")
+    compiled.add_argument("--summary", default=None,
+                          help="Write a JSON summary (counts by status and error type) to this file")
+
+    worker = commands.add_parser("worker", help="Publish jobs from a publish queue")
+    worker.add_argument("--queue", required=True, help="SQLite queue file")
+    worker.add_argument("--queue-name", default="default", help="Queue within the file (default: default)")
+    worker.add_argument("--workers", type=int, default=4, help="Concurrent publishes (default: 4)")
+    worker.add_argument("--rate-limit", type=float, default=None,
+                        help="Maximum publishes started per second against the site")
+    worker.add_argument("--visibility-timeout", type=float, default=300.0,
+                        help="Seconds before a job held by a dead worker is retried (default: 300)")
+    worker.add_argument("--poll-interval", type=float, default=1.0, help="Longest idle sleep in seconds")
+    worker.add_argument("--journal", default=None,
+                        help="Publish journal, so jobs retried after a crash resume their post")
+    worker.add_argument("--upsert", action="store_true",
+                        help="Update posts matched by external_id or slug, skipping unchanged ones")
+    worker.add_argument("--drain", action="store_true",
+                        help="Exit once no job is due instead of waiting for scheduled ones")
+
+    daemon = commands.add_parser("daemon", help="Serve publish jobs from publish_client.py with warm sessions")
+    daemon.add_argument("--socket", default=None,
+                        help="Unix socket to listen on (default: ~/.cache/wp-elementor-post/publishd.sock)")
+    daemon.add_argument("--listen", default=None,
+                        help="Listen on a loopback host:port (e.g. 127.0.0.1:8765) instead; clients must send "
+                             "the token written to --token-file")
+    daemon.add_argument("--token-file", default=None,
+                        help="Where --listen writes its token (default: ~/.cache/wp-elementor-post/publishd.token)")
+    daemon.add_argument("--workers", type=int, default=None,
+                        help="Concurrent publishes per site (default: config.json, else 4)")
+    daemon.add_argument("--journal", default=None, help="Publish journal shared by all jobs")
+    daemon.add_argument("--upsert", action="store_true", help="Publish jobs in upsert mode unless they say otherwise")
+    daemon.add_argument("--keepalive", type=float, default=20.0,
+                        help="Ping sites idle this many seconds to keep connections warm (0 disables)")
+    daemon.add_argument("--warm-taxonomies", action="store_true",
+                        help="Load every category and tag ID at startup")
+    return parser.parse_args(argv)
+
+
+def run_command(args: argparse.Namespace) -> int:
+    if args.command in ("compile", "publish-compiled") and args.use_templates:
+        print("--use-templates is not supported for compiled posts; their layout is fixed at compile time",
+              file=sys.stderr)
+        return 2
+    if args.command == "publish-compiled" and args.upload_images:
+        print("Compiled posts are not scanned for images when publishing; pass --upload-images to compile, "
+              "which rejects specs with images, and publish those with batch", file=sys.stderr)
+        return 2
+    if args.command == "fanout":
+        return 1 if asyncio.run(publish_fanout(args)) else 0
+    if args.command == "enqueue":
+        return 1 if enqueue(args) else 0
+    if args.command == "compile":
+        return 1 if compile_input(args) else 0
+    if args.command == "daemon":
+        return asyncio.run(run_daemon(args))
+    try:
+        wp_service = build_service(args)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    if args.command == "worker":
+        if args.journal:
+            wp_service.journal = PublishJournal(args.journal)
+        return 1 if asyncio.run(work(wp_service, args)) else 0
+    if args.command == "export":
+        asyncio.run(export(wp_service, args))
+        return 0
+    if args.command in ("batch", "publish-compiled"):
+        if args.journal:
+            wp_service.journal = PublishJournal(args.journal)
+        return 1 if asyncio.run(publish_batch(wp_service, args)) else 0
+    asyncio.run(publish(wp_service, args))
+    return 0
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    trace = JsonlSpanWriter(args.trace) if args.trace else None
+    if trace is not None:
+        DEFAULT_METRICS.add_hook(trace)
+    try:
+        return run_command(args)
+    finally:
+        if trace is not None:
+            DEFAULT_METRICS.remove_hook(trace)
+            trace.close()
+        if args.metrics:
+            DEFAULT_METRICS.write(args.metrics)
+        if args.adaptive_concurrency:
+            print(json.dumps({"concurrency_limits": host_limits()}), file=sys.stderr)
 
 
 if __name__ == "__main__":
-    asyncio.run(publish())
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""
+Append-only journal of publish progress, used to make batches restartable.
+"""
+import hashlib
+import json
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+from models.content import ArticleSpec, PublishedArticle
+
+
+def spec_key(spec: ArticleSpec, site: str = "") -> str:
+    """Content hash identifying a spec across runs.
+
+    ``site`` namespaces the key so one journal can serve several sites.
+    """
+    canonical = json.dumps(asdict(spec), sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(f"{site}\n{canonical}".encode("utf-8")).hexdigest()
+
+
+def compiled_key(digest: str, site: str = "") -> str:
+    """Journal key of a compiled post, from the site-less ``spec_key`` stored with it.
+
+    Distinct from the ``spec_key`` of the same spec for that site, so
+    compiled and uncompiled runs keep separate journal entries.
+    """
+    return hashlib.sha256(f"{site}\ncompiled:{digest}".encode("utf-8")).hexdigest()
+
+
+@dataclass
+class JournalEntry:
+    """Replayed state of one spec."""
+    post_id: Optional[int] = None
+    steps: Set[str] = field(default_factory=set)
+    done: bool = False
+    url: Optional[str] = None
+    title: Optional[str] = None
+    status: Optional[str] = None
+
+
+class PublishJournal:
+    """JSONL journal recording which posts were created and which steps finished.
+
+    Every event is appended and flushed immediately, so a crash loses at most
+    the event being written; a torn last line is ignored on replay.
+
+    Args:
+        path: Journal file, created if missing
+        fsync: Also fsync after each event (slower, survives power loss)
+    """
+
+    def __init__(self, path: str, fsync: bool = False):
+        self.path = Path(path)
+        self.fsync = fsync
+        self.logger = logging.getLogger(__name__)
+        self._entries: Dict[str, JournalEntry] = {}
+        self._external_ids: Dict[str, int] = {}
+        self._replay()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def _replay(self):
+        if not self.path.exists():
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    self.logger.warning(f"Ignoring unreadable journal line {line_no} in {self.path}")
+                    continue
+                kind = event["event"]
+                if kind == "external_id":
+                    self._external_ids[event["key"]] = event["post_id"]
+                    continue
+                entry = self._entries.setdefault(event["key"], JournalEntry())
+                if kind == "created":
+                    entry.post_id = event["post_id"]
+                elif kind == "step":
+                    entry.steps.add(event["step"])
+                elif kind == "done":
+                    entry.done = True
+                    entry.post_id = event["post_id"]
+                    entry.url = event.get("url")
+                    entry.title = event.get("title")
+                    entry.status = event.get("status")
+
+    def _append(self, event: dict):
+        event["ts"] = time.time()
+        self._file.write(json.dumps(event, ensure_ascii=False) + "\n")
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def get(self, key: str) -> Optional[JournalEntry]:
+        return self._entries.get(key)
+
+    def record_created(self, key: str, post_id: int):
+        self._entries.setdefault(key, JournalEntry()).post_id = post_id
+        self._append({"key": key, "event": "created", "post_id": post_id})
+
+    def record_step(self, key: str, step: str):
+        self._entries.setdefault(key, JournalEntry()).steps.add(step)
+        self._append({"key": key, "event": "step", "step": step})
+
+    def record_done(self, key: str, article: PublishedArticle):
+        entry = self._entries.setdefault(key, JournalEntry())
+        entry.done = True
+        entry.post_id = article.post_id
+        entry.url, entry.title, entry.status = article.url, article.title, article.status
+        self._append({
+            "key": key, "event": "done", "post_id": article.post_id,
+            "url": article.url, "title": article.title, "status": article.status
+        })
+
+    def post_id_for(self, external_id: str) -> Optional[int]:
+        """Post last published under an upsert external ID."""
+        return self._external_ids.get(external_id)
+
+    def record_external_id(self, external_id: str, post_id: int):
+        if self._external_ids.get(external_id) == post_id:
+            return
+        self._external_ids[external_id] = post_id
+        self._append({"key": external_id, "event": "external_id", "post_id": post_id})
+
+    def close(self):
+        self._file.close()
@@ -0,0 +1,70 @@
+"""
+Async rate limiting helpers shared by WordPress clients.
+"""
+import asyncio
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+
+class RateLimiter:
+    """Token bucket limiting how many requests start per second.
+
+    Args:
+        rate: Sustained requests per second
+        burst: Bucket size, i.e. how many requests may start back to back
+    """
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1, int(rate)))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        """Wait until a token is available and consume it."""
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+
+_host_limiters: Dict[str, RateLimiter] = {}
+
+
+def host_of(url: str) -> str:
+    """Return the ``host[:port]`` part of a URL, lower-cased."""
+    return urlsplit(url).netloc.lower()
+
+
+def get_host_limiter(url: str, rate: float, burst: Optional[int] = None) -> RateLimiter:
+    """Return the process-wide limiter for the host of ``url``.
+
+    Every caller targeting the same host shares one bucket, so several
+    services or batches cannot jointly exceed the site's limit. The first
+    caller's ``rate``/``burst`` win; later callers reuse the existing bucket.
+    """
+    host = host_of(url)
+    limiter = _host_limiters.get(host)
+    if limiter is None:
+        limiter = RateLimiter(rate, burst)
+        _host_limiters[host] = limiter
+    return limiter
@@ -0,0 +1,118 @@
+"""
+One-pass JSON request bodies, with optional gzip.
+
+``encode_json`` serializes a payload straight to UTF-8 bytes, with orjson
+when it is installed, and those bytes are handed to httpx as the request
+content. httpx's ``json=`` builds a ``str`` and encodes it again, so a post
+whose ``_elementor_data`` alone is several hundred KB is buffered once here
+instead of twice.
+
+Gzip request bodies are opt-in because WordPress hosts only accept them when
+the web server decompresses input (e.g. Apache ``SetInputFilter DEFLATE``).
+A host that answers a gzip body with ``rest_invalid_json`` or 415 rejected
+it before doing any work; it is remembered as unsupported and the request
+is resent uncompressed.
+"""
+import gzip
+import json
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import httpx
+
+try:
+    import orjson
+except ImportError:  # optional: pip install orjson
+    orjson = None
+
+# Bodies smaller than this gain little from compression
+DEFAULT_GZIP_MIN_SIZE = 8 * 1024
+GZIP_LEVEL = 5
+
+_gzip_support: Dict[str, bool] = {}
+
+
+def dumps_bytes(value: Any) -> bytes:
+    """Compact UTF-8 JSON, via orjson when available."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(value)
+        except TypeError:
+            # Lone surrogates, huge ints or non-str keys: let json handle or reject them
+            pass
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps_str(value: str) -> str:
+    """JSON string literal for ``value``, identical to ``json.dumps(value, ensure_ascii=False)``."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(value).decode("utf-8")
+        except TypeError:
+            pass
+    return json.dumps(value, ensure_ascii=False)
+
+
+@dataclass
+class EncodedBody:
+    """A serialized request body and what it cost to produce.
+
+    ``size`` is the uncompressed length; ``serialize_seconds`` includes compression.
+    """
+    content: bytes
+    size: int
+    serialize_seconds: float
+    encoding: Optional[str] = None
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        headers = {"Content-Type": "application/json; charset=utf-8"}
+        if self.encoding:
+            headers["Content-Encoding"] = self.encoding
+        return headers
+
+    def decompressed(self) -> "EncodedBody":
+        """The same body without content encoding, for hosts that reject it."""
+        if self.encoding != "gzip":
+            return self
+        return EncodedBody(gzip.decompress(self.content), self.size, self.serialize_seconds)
+
+
+def encode_bytes(content: bytes, gzip_min_size: Optional[int] = None, serialize_seconds: float = 0.0) -> EncodedBody:
+    """Wrap already serialized JSON, gzip-compressing it if it reaches ``gzip_min_size`` bytes."""
+    started = time.perf_counter()
+    size = len(content)
+    encoding = None
+    if gzip_min_size is not None and size >= gzip_min_size:
+        content = gzip.compress(content, compresslevel=GZIP_LEVEL, mtime=0)
+        encoding = "gzip"
+    return EncodedBody(content, size, serialize_seconds + time.perf_counter() - started, encoding)
+
+
+def encode_json(value: Any, gzip_min_size: Optional[int] = None) -> EncodedBody:
+    """Serialize ``value`` once, gzip-compressing it if it reaches ``gzip_min_size`` bytes."""
+    started = time.perf_counter()
+    content = dumps_bytes(value)
+    return encode_bytes(content, gzip_min_size, time.perf_counter() - started)
+
+
+def gzip_supported(host: str) -> Optional[bool]:
+    """Whether ``host`` accepted (True) or rejected (False) gzip bodies; None until known."""
+    return _gzip_support.get(host)
+
+
+def record_gzip_support(host: str, supported: bool):
+    _gzip_support[host] = supported
+
+
+def rejected_encoding(response: httpx.Response) -> bool:
+    """True if the server could not read a compressed body (and so did nothing with it)."""
+    if response.status_code == 415:
+        return True
+    if response.status_code != 400:
+        return False
+    try:
+        return response.json().get("code") == "rest_invalid_json"
+    except (ValueError, AttributeError):
+        return False
@@ -0,0 +1,273 @@
+"""
+Coalescing of REST writes into ``/wp-json/batch/v1`` requests.
+
+WordPress 5.6+ runs up to 25 sub-requests (the site may raise the limit) in
+one ``POST /wp-json/batch/v1``. ``RestBatcher`` collects the JSON writes a
+service sends within a short linger window, from any number of concurrent
+publishes, and sends them together. Each caller still gets its own
+``httpx.Response`` built from its sub-response, so code written against
+single requests works unchanged.
+
+Support is detected once per host with ``OPTIONS /wp-json/batch/v1``, which
+also reports the site's maximum batch size. Writes fall back to individual
+requests when the site has no batch route, when the batch request itself is
+rejected before anything runs, and for routes that do not allow batching.
+"""
+import asyncio
+import contextvars
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+
+import httpx
+
+from rate_limit import host_of
+from request_body import dumps_bytes, encode_bytes
+
+BATCH_ROUTE = "/batch/v1"
+DEFAULT_MAX_ITEMS = 25
+WRITE_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+# Statuses meaning the batch request was refused before any sub-request ran
+_REJECTED_STATUSES = frozenset({400, 404, 405, 413, 414})
+
+_batch_limits: Dict[str, int] = {}
+
+
+class IncompleteBatchError(httpx.HTTPError):
+    """A batch response did not answer this write; it may or may not have been applied."""
+
+
+def batch_limit(host: str) -> Optional[int]:
+    """Maximum batch size detected for ``host`` (0 if unsupported), or None before detection."""
+    return _batch_limits.get(host)
+
+
+@dataclass
+class _Item:
+    method: str
+    url: str
+    path: str
+    content: bytes
+    serialize_seconds: float
+    idempotent: bool
+    future: asyncio.Future = field(repr=False)
+
+    def encoded(self) -> bytes:
+        head = dumps_bytes({"method": self.method, "path": self.path})
+        # Splice the pre-serialized body into the sub-request object
+        return head[:-1] + b',"body":' + self.content + b"}"
+
+
+class RestBatcher:
+    """Batches a WordPressService's JSON writes.
+
+    Args:
+        service: Service whose ``_send_now`` sends the batch and fallback requests
+        linger: Seconds a write waits for others to join its batch
+        max_items: Upper bound on sub-requests per batch (the site's limit applies if lower)
+        max_bytes: Start a new batch rather than grow one past this many body bytes
+    """
+
+    def __init__(self, service, linger: float = 0.01, max_items: int = DEFAULT_MAX_ITEMS,
+                 max_bytes: int = 4 * 1024 * 1024):
+        self.service = service
+        self.linger = linger
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.logger = logging.getLogger(__name__)
+        self.host = host_of(service.base_url)
+        self.rest_root = f"{service.base_url}/wp-json"
+        self.batch_url = f"{self.rest_root}{BATCH_ROUTE}"
+        self.batches = 0
+        self.batched_items = 0
+        self._pending: List[_Item] = []
+        self._pending_bytes = 0
+        self._timer: Optional[asyncio.Task] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._detect_lock = asyncio.Lock()
+
+    def accepts(self, method: str, url: str, kwargs: dict) -> bool:
+        """Whether a ``_send`` call is a JSON write this batcher can carry."""
+        return (
+            method in WRITE_METHODS
+            and kwargs.get("json") is not None
+            and url.startswith(self.rest_root + "/")
+            and set(kwargs) <= {"json", "params", "extensions"}
+        )
+
+    async def _limit(self) -> int:
+        limit = _batch_limits.get(self.host)
+        if limit is not None:
+            return limit
+        async with self._detect_lock:
+            limit = _batch_limits.get(self.host)
+            if limit is None:
+                limit = await self._detect()
+                _batch_limits[self.host] = limit
+        return limit
+
+    async def _detect(self) -> int:
+        try:
+            response = await self.service._send_now("OPTIONS", self.batch_url)
+        except httpx.HTTPError as e:
+            self.logger.warning(f"Could not detect batch support on {self.host}: {e}")
+            return 0
+        if response.status_code != 200:
+            self.logger.info(f"{self.host} has no {BATCH_ROUTE} route; sending writes individually")
+            return 0
+        try:
+            limit = int(response.json()["endpoints"][0]["args"]["requests"]["maxItems"])
+        except (ValueError, KeyError, IndexError, TypeError):
+            limit = DEFAULT_MAX_ITEMS
+        self.logger.info(f"{self.host} supports batches of up to {limit} writes")
+        return limit
+
+    async def submit(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Queue one write and wait for its own response."""
+        limit = min(self.max_items, await self._limit())
+        if limit < 2:
+            return await self.service._send_now(method, url, **kwargs)
+
+        url = str(httpx.URL(url, params=kwargs.get("params")))
+        extensions = kwargs.get("extensions") or {}
+        started = time.perf_counter()
+        content = dumps_bytes(kwargs["json"])
+        item = _Item(
+            method=method,
+            url=url,
+            path=url[len(self.rest_root):],
+            content=content,
+            serialize_seconds=time.perf_counter() - started,
+            idempotent=extensions.get("idempotent", method in ("PUT", "DELETE")),
+            future=asyncio.get_running_loop().create_future()
+        )
+        if self._pending and self._pending_bytes + len(content) > self.max_bytes:
+            self._flush()
+        self._pending.append(item)
+        self._pending_bytes += len(content)
+        if len(self._pending) >= limit:
+            self._flush()
+        elif self._timer is None:
+            self._timer = self._spawn(self._flush_later())
+        return await item.future
+
+    def _spawn(self, coro) -> asyncio.Task:
+        # A fresh context keeps a batch's request span out of whichever publish happened to start it
+        task = asyncio.create_task(coro, context=contextvars.Context())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.linger)
+        self._timer = None
+        self._flush()
+
+    def _flush(self):
+        if self._timer is not None and self._timer is not asyncio.current_task():
+            self._timer.cancel()
+        self._timer = None
+        items, self._pending, self._pending_bytes = self._pending, [], 0
+        if items:
+            self._spawn(self._send(items))
+
+    async def _send(self, items: List[_Item]):
+        try:
+            await self._send_batch(items)
+        finally:
+            # Whatever went wrong, no caller may be left waiting forever
+            self._fail(items, IncompleteBatchError(f"No response for this write in a batch sent to {self.host}"))
+
+    async def _send_batch(self, items: List[_Item]):
+        if len(items) == 1:
+            await self._send_individually(items)
+            return
+        started = time.perf_counter()
+        envelope = b'{"validation":"normal","requests":[' + b",".join(item.encoded() for item in items) + b"]}"
+        body = encode_bytes(
+            envelope,
+            self.service._gzip_min_size(),
+            sum(item.serialize_seconds for item in items) + time.perf_counter() - started
+        )
+        try:
+            response = await self.service._send_now(
+                "POST", self.batch_url, body=body,
+                extensions={"idempotent": all(item.idempotent for item in items)}
+            )
+        except Exception as e:
+            self._fail(items, e)
+            return
+
+        if response.status_code in _REJECTED_STATUSES:
+            self.logger.warning(
+                f"Batch of {len(items)} writes rejected by {self.host} (HTTP {response.status_code}); "
+                f"sending them individually"
+            )
+            if response.status_code in (404, 405):
+                _batch_limits[self.host] = 0
+            await self._send_individually(items)
+            return
+        try:
+            response.raise_for_status()
+            results = response.json()["responses"]
+            if not isinstance(results, list):
+                raise ValueError(f"Malformed batch response from {self.host}")
+        except Exception as e:
+            self._fail(items, e)
+            return
+
+        self.batches += 1
+        self.batched_items += len(items)
+        retry = []
+        for item, result in zip(items, results):
+            body = result.get("body")
+            if isinstance(body, dict) and body.get("code") == "rest_batch_not_allowed":
+                retry.append(item)
+                continue
+            headers = {name: str(value) for name, value in (result.get("headers") or {}).items()}
+            self._deliver(item, httpx.Response(
+                result.get("status", 200), json=body, headers=headers,
+                request=httpx.Request(item.method, item.url)
+            ))
+        if len(results) < len(items):
+            self.logger.error(
+                f"Batch response from {self.host} answered {len(results)} of {len(items)} writes"
+            )
+            self._fail(items[len(results):], IncompleteBatchError(
+                f"Batch response from {self.host} answered {len(results)} of {len(items)} writes"
+            ))
+        if retry:
+            await self._send_individually(retry)
+
+    async def _send_individually(self, items: List[_Item]):
+        async def send(item: _Item):
+            try:
+                response = await self.service._send_now(
+                    item.method, item.url,
+                    body=encode_bytes(item.content, self.service._gzip_min_size(), item.serialize_seconds),
+                    extensions={"idempotent": item.idempotent}
+                )
+            except Exception as e:
+                self._fail([item], e)
+            else:
+                self._deliver(item, response)
+
+        await asyncio.gather(*(send(item) for item in items))
+
+    @staticmethod
+    def _deliver(item: _Item, response: httpx.Response):
+        if not item.future.done():
+            item.future.set_result(response)
+
+    @staticmethod
+    def _fail(items: List[_Item], error: BaseException):
+        for item in items:
+            if not item.future.done():
+                item.future.set_exception(error)
+
+    async def close(self):
+        """Send anything still queued and wait for batches in flight."""
+        self._flush()
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
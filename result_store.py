@@ -0,0 +1,228 @@
+"""
+Compact storage for large batch results.
+
+``BatchResults`` keeps one row per publish in parallel arrays instead of a
+list of objects, and ``MetaStore`` holds the full post meta on disk so only
+a digest stays in memory.
+"""
+import csv
+import gzip
+import json
+import sqlite3
+import threading
+import time
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import AsyncIterable, Dict, Iterator, List, Optional
+
+from models.content import CompactArticle, PublishResult, meta_digest
+
+
+class MetaStore:
+    """Content-addressed SQLite store of post meta dicts.
+
+    Identical meta (for example the same layout published twice) is stored
+    once. Writes are committed in batches; ``flush`` or ``close`` commits
+    the rest.
+
+    Args:
+        path: Database file, created if missing
+        commit_every: Writes buffered before a commit
+    """
+
+    def __init__(self, path: str, commit_every: int = 500):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.commit_every = commit_every
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (digest TEXT PRIMARY KEY, data TEXT NOT NULL)")
+
+    def put(self, meta: dict) -> str:
+        """Store ``meta`` and return its digest."""
+        digest = meta_digest(meta)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR IGNORE INTO meta (digest, data) VALUES (?, ?)",
+                (digest, json.dumps(meta, ensure_ascii=False, default=str))
+            )
+            self._pending += 1
+            if self._pending >= self.commit_every:
+                self._db.commit()
+                self._pending = 0
+        return digest
+
+    def get(self, digest: str) -> Optional[dict]:
+        with self._lock:
+            row = self._db.execute("SELECT data FROM meta WHERE digest = ?", (digest,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def flush(self):
+        with self._lock:
+            self._db.commit()
+            self._pending = 0
+
+    def close(self):
+        self.flush()
+        self._db.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM meta").fetchone()[0]
+
+
+class BatchResults:
+    """Columnar container for batch publish results.
+
+    Each result is stored as one row across typed arrays (index, post ID,
+    timestamp, status code, meta digest) plus a URL list and a sparse error
+    map, costing roughly 100-200 bytes per row instead of a full
+    PublishedArticle with its meta. Summaries and exports read the columns
+    directly without building per-row objects.
+
+    Args:
+        meta_store: Where each article's full meta is spilled; without one
+            only its digest is kept
+    """
+
+    _DIGEST_BYTES = 16
+
+    def __init__(self, meta_store: Optional[MetaStore] = None):
+        self.meta_store = meta_store
+        self._index = array("q")
+        self._post_id = array("q")
+        self._published_at = array("d")
+        self._status = array("H")
+        self._digests = bytearray()
+        self._urls: List[Optional[str]] = []
+        self._status_names: List[str] = []
+        self._status_codes: Dict[str, int] = {}
+        self._errors: Dict[int, str] = {}
+        self._titles: Dict[int, str] = {}
+        self._created = time.time()
+
+    def _status_code(self, status: str) -> int:
+        code = self._status_codes.get(status)
+        if code is None:
+            code = self._status_codes[status] = len(self._status_names)
+            self._status_names.append(status)
+        return code
+
+    def append(self, result: PublishResult):
+        """Add one result; its article and meta are not retained."""
+        row = len(self._index)
+        self._index.append(result.index)
+        if result.ok:
+            article = CompactArticle.from_article(result.article, self.meta_store)
+            self._post_id.append(article.post_id)
+            self._published_at.append(article.published_at)
+            self._status.append(self._status_code(article.status))
+            self._urls.append(article.url)
+            digest = article.meta_digest
+        else:
+            self._post_id.append(-1)
+            self._published_at.append(time.time())
+            self._status.append(self._status_code("failed"))
+            self._urls.append(None)
+            self._errors[row] = f"{type(result.error).__name__}: {result.error}"
+            if result.spec is not None:
+                self._titles[row] = result.spec.title
+            digest = None
+        self._digests += bytes.fromhex(digest) if digest else bytes(self._DIGEST_BYTES)
+
+    @classmethod
+    async def collect(
+        cls,
+        results: AsyncIterable[PublishResult],
+        meta_store: Optional[MetaStore] = None
+    ) -> "BatchResults":
+        """Consume a ``publish_many`` stream into a new container."""
+        batch = cls(meta_store)
+        async for result in results:
+            batch.append(result)
+        return batch
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    @property
+    def failed(self) -> int:
+        return len(self._errors)
+
+    @property
+    def succeeded(self) -> int:
+        return len(self) - self.failed
+
+    def _digest(self, row: int) -> Optional[str]:
+        raw = self._digests[row * self._DIGEST_BYTES:(row + 1) * self._DIGEST_BYTES]
+        return raw.hex() if any(raw) else None
+
+    def article(self, row: int) -> Optional[CompactArticle]:
+        """The compact article for one row, or None if that publish failed."""
+        if row in self._errors:
+            return None
+        return CompactArticle(
+            post_id=self._post_id[row],
+            url=self._urls[row],
+            status=self._status_names[self._status[row]],
+            published_at=self._published_at[row],
+            meta_digest=self._digest(row)
+        )
+
+    def meta(self, row: int) -> Optional[dict]:
+        """Load a row's full meta from the meta store."""
+        digest = self._digest(row)
+        if digest is None or self.meta_store is None:
+            return None
+        return self.meta_store.get(digest)
+
+    def summary(self) -> dict:
+        """Counts by status and error type, and the batch's time span."""
+        statuses = Counter(self._status)
+        errors = Counter(error.split(":", 1)[0] for error in self._errors.values())
+        first = min(self._published_at) if self._published_at else None
+        last = max(self._published_at) if self._published_at else None
+        return {
+            "total": len(self),
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "statuses": {self._status_names[code]: count for code, count in statuses.items()},
+            "errors": dict(errors),
+            "first_at": first,
+            "last_at": last,
+            "elapsed": round((last or self._created) - self._created, 3),
+        }
+
+    def iter_rows(self) -> Iterator[dict]:
+        """Yield one plain dict per row, building each only when requested."""
+        for row in range(len(self)):
+            record = {
+                "index": self._index[row],
+                "ok": row not in self._errors,
+                "post_id": self._post_id[row] if row not in self._errors else None,
+                "url": self._urls[row],
+                "status": self._status_names[self._status[row]],
+                "published_at": self._published_at[row] if row not in self._errors else None,
+                "meta_digest": self._digest(row),
+            }
+            if row in self._errors:
+                record["error"] = self._errors[row]
+                record["title"] = self._titles.get(row)
+            yield record
+
+    def export_jsonl(self, path: str):
+        """Write every row as JSONL; ``.gz`` paths are gzip-compressed."""
+        opener = gzip.open if str(path).endswith(".gz") else open
+        with opener(path, "wt", encoding="utf-8") as f:
+            for record in self.iter_rows():
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def export_csv(self, path: str):
+        columns = ["index", "ok", "post_id", "url", "status", "published_at", "meta_digest", "error", "title"]
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=columns)
+            writer.writeheader()
+            writer.writerows(self.iter_rows())
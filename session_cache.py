@@ -0,0 +1,126 @@
+"""
+On-disk cache of WordPress login cookies and per-client session state.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+import weakref
+from http.cookiejar import Cookie
+from pathlib import Path
+from typing import List, Optional
+
+import httpx
+
+
+DEFAULT_PATH = Path.home() / ".cache" / "wp-elementor-post" / "sessions.json"
+
+
+def _cookie_to_dict(cookie: Cookie) -> dict:
+    return {
+        "name": cookie.name,
+        "value": cookie.value,
+        "domain": cookie.domain,
+        "path": cookie.path,
+        "secure": cookie.secure,
+        "expires": cookie.expires,
+    }
+
+
+class SessionCache:
+    """JSON file of session cookies keyed by site URL and user.
+
+    A session stays valid until its earliest ``wordpress_logged_in`` cookie
+    expires; browser-session cookies without an expiry are kept for
+    ``default_ttl`` seconds. The file is written with owner-only permissions
+    since it holds credentials.
+
+    Args:
+        path: Cache file location
+        default_ttl: Lifetime assumed for cookies without an expiry
+    """
+
+    def __init__(self, path: Optional[str] = None, default_ttl: float = 12 * 3600):
+        self.path = Path(path) if path else DEFAULT_PATH
+        self.default_ttl = default_ttl
+        self.logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def _key(base_url: str, username: str) -> str:
+        return f"{base_url.rstrip('/')}|{username}"
+
+    def _read(self) -> dict:
+        if not self.path.exists():
+            return {}
+        try:
+            return json.loads(self.path.read_text())
+        except Exception as e:
+            self.logger.warning(f"Ignoring unreadable session cache {self.path}: {e}")
+            return {}
+
+    def _write(self, data: dict):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+        tmp.replace(self.path)
+
+    def load(self, base_url: str, username: str) -> Optional[List[dict]]:
+        """Return the cached cookies for a site and user, or None if missing or expired."""
+        entry = self._read().get(self._key(base_url, username))
+        if not entry or entry["expires_at"] <= time.time():
+            return None
+        return entry["cookies"]
+
+    def store(self, base_url: str, username: str, cookies: httpx.Cookies):
+        """Cache the session cookies currently held in ``cookies``."""
+        saved = [_cookie_to_dict(cookie) for cookie in cookies.jar]
+        logged_in = [c["expires"] for c in saved if c["name"].startswith("wordpress_logged_in")]
+        expiries = [e for e in logged_in if e is not None]
+        if expiries:
+            expires_at = min(expiries)
+        else:
+            expires_at = time.time() + self.default_ttl
+        data = self._read()
+        data[self._key(base_url, username)] = {"expires_at": expires_at, "cookies": saved}
+        self._write(data)
+
+    def invalidate(self, base_url: str, username: str):
+        data = self._read()
+        if data.pop(self._key(base_url, username), None) is not None:
+            self._write(data)
+
+
+def apply_cookies(client: httpx.AsyncClient, cookies: List[dict]):
+    """Load cached cookie dicts into a client's jar."""
+    for cookie in cookies:
+        client.cookies.set(cookie["name"], cookie["value"], domain=cookie["domain"], path=cookie["path"])
+
+
+class SessionState:
+    """Login bookkeeping for one HTTP client.
+
+    ``generation`` increases on every re-login, so requests that saw a 401
+    with an older generation know someone else already refreshed.
+    ``refreshed_at`` is the ``time.monotonic()`` of the last re-login.
+    """
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.generation = 0
+        self.attempted = False
+        self.refreshed_at: Optional[float] = None
+
+
+_states: "weakref.WeakKeyDictionary[httpx.AsyncClient, SessionState]" = weakref.WeakKeyDictionary()
+
+
+def get_session_state(client: httpx.AsyncClient) -> SessionState:
+    """Return the state for ``client``, shared by every service using it."""
+    state = _states.get(client)
+    if state is None:
+        state = SessionState()
+        _states[client] = state
+    return state
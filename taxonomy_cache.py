@@ -0,0 +1,141 @@
+"""
+Process-wide cache of WordPress category and tag IDs.
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+
+class TaxonomyCache:
+    """LRU/TTL cache mapping ``(taxonomy, term name)`` to a term ID.
+
+    Names are matched case-insensitively, like the search-based lookups in
+    ``WordPressService``. Concurrent resolutions of the same term share one
+    in-flight lookup, so parallel publishes never race to create duplicates.
+
+    Args:
+        ttl: Seconds an entry stays valid; ``None`` keeps entries forever
+        max_entries: Maximum entries kept before least recently used ones are evicted
+        path: Optional JSON file the cache is loaded from and saved to
+    """
+
+    def __init__(self, ttl: Optional[float] = 3600, max_entries: int = 10000, path: Optional[str] = None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path = Path(path) if path else None
+        self.logger = logging.getLogger(__name__)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[int, float]]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+        if self.path is not None:
+            self.load()
+
+    @staticmethod
+    def _key(taxonomy: str, name: str) -> Tuple[str, str]:
+        return taxonomy, name.strip().lower()
+
+    def get(self, taxonomy: str, name: str) -> Optional[int]:
+        """Return the cached term ID, or None if missing or expired."""
+        key = self._key(taxonomy, name)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        term_id, stored_at = entry
+        if self.ttl is not None and time.time() - stored_at > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return term_id
+
+    def set(self, taxonomy: str, name: str, term_id: int, stored_at: Optional[float] = None):
+        """Store a term ID, evicting the least recently used entries if full."""
+        key = self._key(taxonomy, name)
+        self._entries[key] = (term_id, stored_at if stored_at is not None else time.time())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def resolve(
+        self,
+        taxonomy: str,
+        name: str,
+        fetch: Callable[[], Awaitable[Optional[int]]]
+    ) -> Optional[int]:
+        """Return the term ID for ``name``, calling ``fetch`` only on a miss.
+
+        Callers resolving the same term while a fetch is running wait for that
+        fetch instead of starting their own. A fetch returning None is not cached.
+        """
+        term_id = self.get(taxonomy, name)
+        if term_id is not None:
+            return term_id
+
+        key = self._key(taxonomy, name)
+        future = self._inflight.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            term_id = await fetch()
+            if term_id is not None:
+                self.set(taxonomy, name, term_id)
+            future.set_result(term_id)
+            return term_id
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception retrieved when nobody else was waiting on it
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    def load(self):
+        """Load entries from ``path``, skipping expired ones. Missing or corrupt files are ignored."""
+        if self.path is None or not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text())
+        except Exception as e:
+            self.logger.warning(f"Ignoring unreadable taxonomy cache {self.path}: {e}")
+            return
+        now = time.time()
+        for taxonomy, name, term_id, stored_at in data.get("entries", []):
+            if self.ttl is None or now - stored_at <= self.ttl:
+                self.set(taxonomy, name, term_id, stored_at)
+
+    def save(self):
+        """Write all live entries to ``path`` atomically."""
+        if self.path is None:
+            return
+        entries = [[taxonomy, name, term_id, stored_at]
+                   for (taxonomy, name), (term_id, stored_at) in self._entries.items()]
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps({"entries": entries}))
+        tmp.replace(self.path)
+
+
+_caches: Dict[str, TaxonomyCache] = {}
+
+
+def get_taxonomy_cache(api_url: str, **kwargs) -> TaxonomyCache:
+    """Return the process-wide cache for a site's REST API URL.
+
+    ``kwargs`` are passed to TaxonomyCache the first time a site is seen.
+    """
+    cache = _caches.get(api_url)
+    if cache is None:
+        cache = TaxonomyCache(**kwargs)
+        _caches[api_url] = cache
+    return cache
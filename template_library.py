@@ -0,0 +1,110 @@
+"""
+Local cache of the templates this tool keeps in a site's Elementor library.
+
+The static widgets of the article layout (see
+``ElementorLayout.static_widgets``) are saved once per site as global widget
+templates (``elementor_library`` posts) and referenced from each post instead
+of being embedded in every post's ``_elementor_data``.
+
+Templates are content-addressed: the title holds a hash of the widget, so
+changing the layout's styling creates a new template version while posts
+published earlier keep the version they reference. The cache remembers each
+template's ID and ``modified_gmt`` per site, plus the ETag/Last-Modified of
+the last library listing, so ``WordPressService.sync_templates`` can
+revalidate it with one conditional request.
+"""
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Dict, Optional
+
+DEFAULT_PATH = Path.home() / ".cache" / "wp-elementor-post" / "templates.json"
+# Prefix of the titles of templates created by this tool
+TITLE_PREFIX = "wpep"
+
+
+def template_digest(element: dict) -> str:
+    """Short content hash identifying one version of a widget."""
+    canonical = json.dumps(element, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:12]
+
+
+def template_title(name: str, digest: str) -> str:
+    return f"{TITLE_PREFIX} {name} {digest}"
+
+
+def parse_title(title: str) -> Optional[str]:
+    """``name digest`` key of a title made by ``template_title``, or None for other templates."""
+    parts = title.split(" ")
+    if len(parts) != 3 or parts[0] != TITLE_PREFIX:
+        return None
+    return f"{parts[1]} {parts[2]}"
+
+
+class TemplateLibrary:
+    """JSON cache of library template IDs keyed by site, widget name and digest.
+
+    Args:
+        path: Cache file (default: ``~/.cache/wp-elementor-post/templates.json``)
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path) if path else DEFAULT_PATH
+        self.logger = logging.getLogger(__name__)
+        self._sites: Dict[str, dict] = {}
+        self._dirty = False
+        self.load()
+
+    def _site(self, site: str) -> dict:
+        return self._sites.setdefault(site.rstrip("/"), {"templates": {}, "validators": {}})
+
+    def get(self, site: str, name: str, digest: str) -> Optional[dict]:
+        return self._site(site)["templates"].get(f"{name} {digest}")
+
+    def set(self, site: str, name: str, digest: str, template: dict):
+        self._site(site)["templates"][f"{name} {digest}"] = {
+            "id": template["id"], "modified": template.get("modified")
+        }
+        self._dirty = True
+
+    def validators(self, site: str) -> Dict[str, str]:
+        """ETag/Last-Modified of the site's last library listing."""
+        return self._site(site)["validators"]
+
+    def replace(self, site: str, templates: Dict[str, dict], validators: Dict[str, str]) -> int:
+        """Take a fresh library listing for ``site``; returns how many entries changed."""
+        entry = self._site(site)
+        old = entry["templates"]
+        changed = len(old.keys() ^ templates.keys()) + sum(
+            old[key] != templates[key] for key in old.keys() & templates.keys()
+        )
+        if changed or validators != entry["validators"]:
+            entry["templates"] = templates
+            entry["validators"] = validators
+            self._dirty = True
+        return changed
+
+    def load(self):
+        """Load the cache from ``path``. Missing or corrupt files are ignored."""
+        if not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text())
+        except Exception as e:
+            self.logger.warning(f"Ignoring unreadable template cache {self.path}: {e}")
+            return
+        self._sites.update(data.get("sites", {}))
+
+    def save(self):
+        """Write the cache to ``path`` atomically if anything changed."""
+        if not self._dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps({"sites": self._sites}))
+        tmp.replace(self.path)
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return sum(len(site["templates"]) for site in self._sites.values())
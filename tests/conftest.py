@@ -0,0 +1,25 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Modules live at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import adaptive_limit  # noqa: E402
+import request_body  # noqa: E402
+import rest_batch  # noqa: E402
+import transport  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def fresh_host_state():
+    """Per-host breakers, budgets, limits and gzip support are process-wide; start each test without them."""
+    registries = (
+        transport._hosts, adaptive_limit._host_limits, rest_batch._batch_limits, request_body._gzip_support
+    )
+    for registry in registries:
+        registry.clear()
+    yield
+    for registry in registries:
+        registry.clear()
@@ -0,0 +1,115 @@
+"""In-memory WordPress REST API for ``httpx.MockTransport``, recording every request."""
+import asyncio
+import gzip
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import httpx
+
+from metrics import Metrics
+from taxonomy_cache import TaxonomyCache
+from wordpress_service import WordPressService
+
+BASE_URL = "https://wp.test"
+_POST = re.compile(r"/wp-json/wp/v2/posts/(\d+)$")
+
+
+@dataclass
+class Call:
+    method: str
+    path: str
+    params: Dict[str, str]
+    headers: httpx.Headers
+    body: bytes
+    json: Optional[dict] = None
+
+
+@dataclass
+class FakeWordPress:
+    """Login, posts and media routes of one site.
+
+    Args:
+        reject_gzip: Answer gzip-encoded JSON bodies with this status, the way a
+            site without compression support does (415, or 400 ``rest_invalid_json``)
+        media_latency: Seconds each media upload takes
+    """
+    reject_gzip: Optional[int] = None
+    media_latency: float = 0.0
+    posts: Dict[int, dict] = field(default_factory=dict)
+    calls: List[Call] = field(default_factory=list)
+    logins: int = 0
+    uploads: int = 0
+    _next_id: int = 1
+
+    def service(self, **kwargs) -> WordPressService:
+        return WordPressService(
+            BASE_URL, "editor", "password",
+            transport=httpx.MockTransport(self),
+            taxonomy_cache=TaxonomyCache(),
+            metrics=Metrics(),
+            **kwargs
+        )
+
+    def writes(self, path_prefix: str = "/wp-json/wp/v2/posts") -> List[Call]:
+        """POSTs to ``path_prefix`` and below, in order."""
+        return [call for call in self.calls if call.method == "POST" and call.path.startswith(path_prefix)]
+
+    def _id(self) -> int:
+        post_id, self._next_id = self._next_id, self._next_id + 1
+        return post_id
+
+    def _save(self, post: dict, data: dict) -> dict:
+        meta = {**post.get("meta", {}), **data.pop("meta", {})}
+        if isinstance(data.get("title"), str):
+            data["title"] = {"raw": data["title"], "rendered": data["title"]}
+        post.update(data, meta=meta)
+        post.setdefault("link", f"{BASE_URL}/?p={post['id']}")
+        return post
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        body = await request.aread()
+        path = request.url.path
+        call = Call(request.method, path, dict(request.url.params), request.headers, body)
+        self.calls.append(call)
+
+        if path == "/wp-login.php":
+            if request.method == "GET":
+                return httpx.Response(200, text="<form></form>")
+            self.logins += 1
+            return httpx.Response(302, headers={"Set-Cookie": f"wordpress_logged_in_x=s{self.logins}; Path=/"})
+
+        if path == "/wp-json/wp/v2/media":
+            await asyncio.sleep(self.media_latency)
+            self.uploads += 1
+            media_id = self._id()
+            return httpx.Response(201, json={"id": media_id, "source_url": f"{BASE_URL}/uploads/{media_id}.png"})
+
+        if request.headers.get("Content-Type", "").startswith("application/json") and body:
+            if request.headers.get("Content-Encoding") == "gzip":
+                if self.reject_gzip == 415:
+                    return httpx.Response(415, json={"code": "rest_unsupported_media_type"})
+                if self.reject_gzip:
+                    return httpx.Response(400, json={"code": "rest_invalid_json", "message": "Invalid JSON body"})
+                body = gzip.decompress(body)
+            call.json = json.loads(body)
+
+        if path == "/wp-json/wp/v2/posts":
+            if request.method == "GET":
+                slug = request.url.params.get("slug")
+                return httpx.Response(200, json=[post for post in self.posts.values() if post.get("slug") == slug])
+            post = self._save({"id": self._id()}, dict(call.json))
+            self.posts[post["id"]] = post
+            return httpx.Response(201, json=post)
+
+        match = _POST.match(path)
+        if match:
+            post = self.posts.get(int(match.group(1)))
+            if post is None:
+                return httpx.Response(404, json={"code": "rest_post_invalid_id"})
+            if request.method == "POST":
+                self._save(post, dict(call.json))
+            return httpx.Response(200, json=post)
+
+        return httpx.Response(404, json={"code": "rest_no_route"})
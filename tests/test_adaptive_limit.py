@@ -0,0 +1,94 @@
+import asyncio
+
+import httpx
+
+from adaptive_limit import ConcurrencyPolicy, get_host_limit
+from transport import RetryPolicy, RetryTransport
+
+HOST = "wp.test"
+
+
+class Site:
+    """Mock site with ``capacity`` workers: requests beyond it queue up (``queueing``) or get 429s."""
+
+    def __init__(self, capacity: int, service_time: float = 0.005):
+        self.capacity = capacity
+        self.service_time = service_time
+        self.queueing = False
+        self.active = 0
+        self.peak = 0
+        self.rejected = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            if self.active > self.capacity and not self.queueing:
+                self.rejected += 1
+                return httpx.Response(429)
+            # With queueing, each request waits for the ones ahead of it
+            backlog = max(1, self.active - self.capacity + 1) if self.queueing else 1
+            await asyncio.sleep(self.service_time * backlog)
+            return httpx.Response(200)
+        finally:
+            self.active -= 1
+
+
+async def drive(client: httpx.AsyncClient, requests: int, clients: int):
+    """Send ``requests`` GETs from ``clients`` concurrent callers, ignoring their outcome."""
+    remaining = iter(range(requests))
+
+    async def caller():
+        for _ in remaining:
+            await client.get(f"https://{HOST}/wp-json/wp/v2/posts")
+
+    await asyncio.gather(*(caller() for _ in range(clients)))
+
+
+def client_for(site: Site, policy: ConcurrencyPolicy) -> httpx.AsyncClient:
+    transport = RetryTransport(httpx.MockTransport(site), RetryPolicy(max_attempts=1), policy)
+    return httpx.AsyncClient(transport=transport)
+
+
+def test_limit_shrinks_on_429s_and_recovers():
+    async def run():
+        site = Site(capacity=4)
+        policy = ConcurrencyPolicy(initial_limit=16, max_limit=32, min_window=10)
+        limit = get_host_limit(HOST, policy)
+        async with client_for(site, policy) as client:
+            await drive(client, 300, clients=32)
+            shrunk = limit.current
+            assert limit.overloads > 0
+            assert shrunk < 16
+
+            site.capacity = 1000
+            await drive(client, 1500, clients=64)
+            assert limit.current > shrunk
+            assert limit.increases > 0
+    asyncio.run(run())
+
+
+def test_limit_shrinks_when_latency_grows_and_recovers():
+    async def run():
+        site = Site(capacity=2)
+        policy = ConcurrencyPolicy(initial_limit=2, max_limit=32, min_window=10)
+        limit = get_host_limit(HOST, policy)
+        async with client_for(site, policy) as client:
+            # Learn the no-load latency, then let the limit grow past capacity
+            site.queueing = True
+            await drive(client, 60, clients=2)
+            baseline = limit.baseline
+            assert baseline is not None
+            limit.limit = 16.0
+            await drive(client, 400, clients=32)
+            assert limit.decreases > 0
+            assert limit.current < 16
+            assert site.rejected == 0
+            shrunk = limit.current
+
+            # The site gets faster: no queueing at any concurrency
+            site.queueing = False
+            site.capacity = 1000
+            await drive(client, 1500, clients=32)
+            assert limit.current > shrunk
+    asyncio.run(run())
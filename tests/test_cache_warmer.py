@@ -0,0 +1,36 @@
+import asyncio
+
+import httpx
+
+from cache_warmer import CacheWarmer
+from metrics import Metrics
+
+
+def warmer_for(handler, **kwargs) -> CacheWarmer:
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return CacheWarmer(rate_limit=None, metrics=Metrics(), client=client, **kwargs)
+
+
+def test_results_and_seen_urls_are_bounded():
+    async def run():
+        fetched = []
+
+        def handler(request):
+            fetched.append(str(request.url))
+            return httpx.Response(200, text="<html></html>")
+
+        warmer = warmer_for(handler, max_results=5, max_seen=3)
+        for i in range(20):
+            assert warmer.submit(f"https://wp.test/post-{i}/")
+        await warmer.drain()
+        assert len(warmer.results) == 5
+        assert [r.url for r in warmer.results][-1] == "https://wp.test/post-19/"
+        assert len(warmer._seen) == 3
+        assert warmer.summary()["pages"] == 20
+        assert warmer.summary()["warmed"] == 20
+
+        # Recent URLs are still skipped, forgotten ones are warmed again
+        assert not warmer.submit("https://wp.test/post-19/")
+        assert warmer.submit("https://wp.test/post-0/")
+        await warmer.close()
+    asyncio.run(run())
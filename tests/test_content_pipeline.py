@@ -0,0 +1,39 @@
+from content_pipeline import ContentPipeline
+
+
+def process(content_html: str):
+    return ContentPipeline().process(content_html)
+
+
+def test_script_scheme_split_by_whitespace_is_dropped():
+    for href in ("java&#x09;script:alert(1)", "java\nscript:alert(1)", " &#x01;javascript:alert(1)",
+                 "JaVa&#x0A;ScRiPt:alert(1)", "vb&#x0D;script:msgbox(1)"):
+        result = process(f'<p><a href="{href}">x</a></p>').html
+        assert "href" not in result, href
+
+
+def test_ordinary_links_are_kept():
+    assert process('<p><a href="https://example.com/a b">x</a></p>').html == \
+        '<p><a href="https://example.com/a b">x</a></p>'
+
+
+def test_frames_and_srcdoc_are_dropped():
+    result = process('<p>a</p><iframe srcdoc="<script>alert(1)</script>"></iframe><frame src="x"><p>b</p>').html
+    assert "iframe" not in result and "frame" not in result and "srcdoc" not in result
+    assert process('<div srcdoc="x">y</div>').html == "<div>y</div>"
+
+
+def test_svg_animations_are_dropped():
+    result = process(
+        '<svg><a><animate attributeName="href" to="javascript:alert(1)" />'
+        '<set attributeName="href" to="javascript:alert(1)"></set><text>x</text></a></svg>'
+    ).html
+    assert "javascript" not in result
+    assert "<text>x</text>" in result
+
+
+def test_generated_anchors_avoid_existing_ids():
+    result = process('<h2>A</h2><p id="a">x</p><h2 id="b">B</h2><h2>B</h2>')
+    anchors = [entry.anchor for entry in result.toc]
+    assert anchors == ["a-2", "b", "b-2"]
+    assert result.html.count('id="a"') == 1
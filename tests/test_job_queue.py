@@ -0,0 +1,18 @@
+from job_queue import JobQueue
+
+SPEC = {"title": "Post", "content_html": "<p>Body</p>"}
+
+
+def test_expired_leases_use_up_attempts(tmp_path):
+    queue = JobQueue(str(tmp_path / "queue.sqlite"))
+    job_id = queue.enqueue(SPEC, max_attempts=2)
+
+    # A worker that dies lets its lease expire; the job is leased again
+    assert [job.attempts for job in queue.lease("a", visibility_timeout=0)] == [1]
+    assert [job.attempts for job in queue.lease("b", visibility_timeout=0)] == [2]
+
+    # The second expired lease was the last attempt
+    assert queue.lease("c") == []
+    assert queue.stats().get("dead") == 1
+    assert queue.requeue_dead() == 1
+    assert [job.id for job in queue.lease("d")] == [job_id]
@@ -0,0 +1,70 @@
+import asyncio
+import os
+
+import pytest
+
+from fake_wordpress import FakeWordPress
+from media import MediaIndex, split_source
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\0" * 64
+
+
+@pytest.fixture
+def base_dir(tmp_path):
+    base = tmp_path / "articles"
+    (base / "img").mkdir(parents=True)
+    (base / "img" / "a.png").write_bytes(PNG)
+    (tmp_path / "secret.png").write_bytes(PNG)
+    return base
+
+
+def test_paths_inside_base_dir_are_accepted(base_dir):
+    expected = ("file", str((base_dir / "img" / "a.png").resolve()))
+    assert split_source("img/a.png", str(base_dir)) == expected
+    assert split_source(str(base_dir / "img" / "a.png"), str(base_dir)) == expected
+    assert split_source(f"file://{base_dir / 'img' / 'a.png'}", str(base_dir)) == expected
+
+
+@pytest.mark.parametrize("src", ["../secret.png", "img/../../secret.png", "/etc/passwd", "file:///etc/passwd"])
+def test_paths_outside_base_dir_are_rejected(base_dir, src):
+    with pytest.raises(ValueError, match="outside"):
+        split_source(src, str(base_dir))
+
+
+def test_symlink_escaping_base_dir_is_rejected(base_dir):
+    os.symlink(base_dir.parent / "secret.png", base_dir / "img" / "link.png")
+    with pytest.raises(ValueError, match="outside"):
+        split_source("img/link.png", str(base_dir))
+
+
+def test_local_image_needs_base_dir():
+    with pytest.raises(ValueError, match="base directory"):
+        split_source("img/a.png", None)
+    assert split_source("data:image/png;base64,AAAA", None)[0] == "skip"
+
+
+def upload(site: FakeWordPress, base_dir, *articles: str):
+    async def run():
+        service = site.service(media_index=MediaIndex(str(base_dir.parent / "media.json")))
+        try:
+            return await asyncio.gather(*(service.upload_images(html, str(base_dir)) for html in articles))
+        finally:
+            await service.close()
+    return asyncio.run(run())
+
+
+def test_non_image_file_is_not_uploaded(base_dir):
+    (base_dir / "notes.txt").write_text("private")
+    site = FakeWordPress()
+    with pytest.raises(ValueError, match="Not an image"):
+        upload(site, base_dir, '<img src="notes.txt">')
+    assert site.uploads == 0
+
+
+def test_concurrent_uploads_of_same_content_are_coalesced(base_dir):
+    (base_dir / "img" / "copy.png").write_bytes(PNG)
+    site = FakeWordPress(media_latency=0.05)
+    first, second = upload(site, base_dir, '<p><img src="img/a.png"></p>', '<p><img src="img/copy.png"></p>')
+    assert site.uploads == 1
+    assert first == second
+    assert "https://wp.test/uploads/" in first
@@ -0,0 +1,41 @@
+import asyncio
+import stat
+
+import httpx
+import pytest
+
+from fake_wordpress import BASE_URL, FakeWordPress
+from multisite import SiteConfig
+from publish_client import DaemonClient, DaemonError
+from publish_daemon import PublishDaemon
+
+
+def test_tcp_daemon_requires_its_token(tmp_path):
+    token_file = tmp_path / "publishd.token"
+
+    async def run():
+        daemon = PublishDaemon(
+            [SiteConfig(base_url=BASE_URL, username="editor", password="password")],
+            keepalive=0,
+            transport=httpx.MockTransport(FakeWordPress())
+        )
+        stop = asyncio.Event()
+        server = asyncio.create_task(daemon.serve(host="127.0.0.1", port=0, stop=stop, token_file=str(token_file)))
+        while daemon.address is None:
+            await asyncio.sleep(0.01)
+        try:
+            assert stat.S_IMODE(token_file.stat().st_mode) == 0o600
+            client = DaemonClient(address=daemon.address, timeout=5, token_file=str(token_file))
+            assert (await asyncio.to_thread(client.ping))["ok"]
+
+            # A local user without the token
+            intruder = DaemonClient(address=daemon.address, timeout=5, token_file=str(tmp_path / "guess"))
+            (tmp_path / "guess").write_text("not-the-token")
+            with pytest.raises(DaemonError, match="token"):
+                await asyncio.to_thread(intruder.publish, [{"title": "Spam", "content": "<p>x</p>"}])
+        finally:
+            stop.set()
+            await server
+            await daemon.close()
+        assert not token_file.exists()
+    asyncio.run(run())
@@ -0,0 +1,49 @@
+import asyncio
+import json
+
+from fake_wordpress import FakeWordPress
+from models.content import ArticleSpec
+from publish_journal import PublishJournal
+
+SPEC = ArticleSpec(
+    title="Post", content="<h2>A</h2><p>Body</p>", status="publish",
+    faq_items=[{"question": "Question?", "answer": "Answer."}]
+)
+
+
+def publish(site: FakeWordPress, path) -> int:
+    async def run():
+        journal = PublishJournal(str(path))
+        service = site.service(journal=journal)
+        try:
+            return (await service.publish_spec(SPEC)).post_id
+        finally:
+            journal.close()
+            await service.close()
+    return asyncio.run(run())
+
+
+def test_interrupted_post_is_resumed_without_its_content(tmp_path):
+    site = FakeWordPress()
+    path = tmp_path / "journal.jsonl"
+    post_id = publish(site, path)
+
+    # Crash after the create: the journal has the post but no "done"
+    events = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [event["event"] for event in events][-1] == "done"
+    path.write_text("".join(json.dumps(event) + "\n" for event in events if event["event"] != "done"))
+
+    site.calls.clear()
+    assert publish(site, path) == post_id
+    [update] = site.writes()
+    assert update.path == f"/wp-json/wp/v2/posts/{post_id}"
+    assert "content" not in update.json
+    assert "_elementor_data" not in update.json["meta"]
+    assert update.json["status"] == "publish"
+    assert len(site.posts) == 1
+
+    # Now recorded as done: the next run sends nothing
+    site.calls.clear()
+    assert publish(site, path) == post_id
+    assert site.writes() == []
+    assert len(site.posts) == 1
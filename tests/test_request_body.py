@@ -0,0 +1,46 @@
+import asyncio
+import gzip
+import json
+
+import pytest
+
+from fake_wordpress import FakeWordPress
+from request_body import gzip_supported
+
+# Well above the 8 KiB compression threshold
+CONTENT = "<p>" + "Lorem ipsum dolor sit amet. " * 1000 + "</p>"
+
+
+def publish_twice(site: FakeWordPress):
+    async def run():
+        service = site.service(gzip_requests=True)
+        try:
+            for i in range(2):
+                await service.publish_article(f"Post {i}", CONTENT)
+        finally:
+            await service.close()
+    asyncio.run(run())
+
+
+def test_gzip_body_is_sent_compressed_to_a_site_that_accepts_it():
+    site = FakeWordPress()
+    publish_twice(site)
+    first, second = site.writes()
+    assert first.headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(first.body))["content"] == CONTENT
+    assert second.headers["Content-Encoding"] == "gzip"
+    assert gzip_supported("wp.test") is True
+
+
+@pytest.mark.parametrize("status", [415, 400])
+def test_rejected_gzip_body_is_resent_uncompressed_and_remembered(status):
+    site = FakeWordPress(reject_gzip=status)
+    publish_twice(site)
+    rejected, resent, second = site.writes()
+    assert rejected.headers["Content-Encoding"] == "gzip"
+    assert "Content-Encoding" not in resent.headers
+    assert resent.json["content"] == CONTENT
+    # The host is remembered: later bodies go out uncompressed at once
+    assert "Content-Encoding" not in second.headers
+    assert gzip_supported("wp.test") is False
+    assert len(site.posts) == 2
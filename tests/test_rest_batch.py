@@ -0,0 +1,60 @@
+import asyncio
+import json
+
+import httpx
+
+from rest_batch import IncompleteBatchError, RestBatcher
+
+BASE_URL = "https://wp.test"
+
+
+class StubService:
+    """The parts of WordPressService a RestBatcher uses, answering batches with ``answered`` responses."""
+
+    def __init__(self, answered: int):
+        self.base_url = BASE_URL
+        self.answered = answered
+        self.sent = []
+
+    def _gzip_min_size(self):
+        return None
+
+    async def _send_now(self, method, url, body=None, **kwargs):
+        request = httpx.Request(method, url)
+        self.sent.append((method, url))
+        if method == "OPTIONS":
+            return httpx.Response(200, json={"endpoints": [{"args": {"requests": {"maxItems": 25}}}]},
+                                  request=request)
+        requests = json.loads(body.content)["requests"]
+        responses = [{"status": 201, "body": {"id": i}} for i in range(len(requests))][:self.answered]
+        return httpx.Response(207, json={"responses": responses}, request=request)
+
+
+async def submit_all(service, count: int):
+    batcher = RestBatcher(service, linger=0.01)
+    try:
+        return await asyncio.wait_for(asyncio.gather(*(
+            batcher.submit("POST", f"{BASE_URL}/wp-json/wp/v2/posts", json={"title": f"Post {i}"})
+            for i in range(count)
+        ), return_exceptions=True), timeout=5)
+    finally:
+        await batcher.close()
+
+
+def test_every_write_gets_its_sub_response():
+    results = asyncio.run(submit_all(StubService(answered=25), 3))
+    assert [r.json()["id"] for r in results] == [0, 1, 2]
+
+
+def test_writes_missing_from_a_short_batch_response_fail():
+    service = StubService(answered=2)
+    results = asyncio.run(submit_all(service, 5))
+    assert [r.status_code for r in results[:2]] == [201, 201]
+    assert all(isinstance(r, IncompleteBatchError) for r in results[2:])
+    # Unanswered writes may have run, so they are not resent individually
+    assert [method for method, _ in service.sent] == ["OPTIONS", "POST"]
+
+
+def test_empty_batch_response_fails_every_write():
+    results = asyncio.run(submit_all(StubService(answered=0), 3))
+    assert all(isinstance(r, IncompleteBatchError) for r in results)
@@ -0,0 +1,122 @@
+import asyncio
+
+import httpx
+
+from metrics import Metrics
+from taxonomy_cache import TaxonomyCache
+from wordpress_service import WordPressService
+
+BASE_URL = "https://wp.test"
+
+
+class Site:
+    """Mock site whose REST route answers 403 with ``code`` until the second login."""
+
+    def __init__(self, code: str):
+        self.code = code
+        self.logins = 0
+        self.rest_calls = 0
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/wp-login.php":
+            if request.method == "POST":
+                self.logins += 1
+                cookie = f"wordpress_logged_in_x=session{self.logins}; Path=/"
+                return httpx.Response(302, headers={"Set-Cookie": cookie})
+            return httpx.Response(200, text="<form></form>")
+        self.rest_calls += 1
+        if self.logins < 2:
+            return httpx.Response(403, json={"code": self.code, "message": "Forbidden", "data": {"status": 403}})
+        return httpx.Response(200, json={"id": 1})
+
+
+def get_post(site: Site) -> httpx.Response:
+    async def run():
+        service = WordPressService(
+            BASE_URL, "editor", "password",
+            transport=httpx.MockTransport(site),
+            taxonomy_cache=TaxonomyCache(),
+            metrics=Metrics()
+        )
+        try:
+            return await service._send_now("GET", f"{service.api_url}/posts/1")
+        finally:
+            await service.close()
+    return asyncio.run(run())
+
+
+def test_expired_nonce_logs_in_again_and_repeats():
+    site = Site("rest_cookie_invalid_nonce")
+    response = get_post(site)
+    assert response.status_code == 200
+    assert site.logins == 2
+    assert site.rest_calls == 2
+
+
+def test_permission_error_is_returned_without_login():
+    site = Site("rest_cannot_edit")
+    response = get_post(site)
+    assert response.status_code == 403
+    assert response.json()["code"] == "rest_cannot_edit"
+    assert site.logins == 1
+    assert site.rest_calls == 1
+
+
+class ExpiredSession:
+    """Mock site that answers 401 to every cookie but the one from its latest login, or to all with ``always``."""
+
+    def __init__(self, always: bool = False):
+        self.always = always
+        self.logins = 0
+        self.rest_calls = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/wp-login.php":
+            if request.method == "POST":
+                self.logins += 1
+                return httpx.Response(302, headers={"Set-Cookie": f"wordpress_logged_in_x=fresh{self.logins}; Path=/"})
+            return httpx.Response(200, text="<form></form>")
+        self.rest_calls += 1
+        # Let the other requests reach the site with the same stale cookie
+        await asyncio.sleep(0.01)
+        if self.always or request.headers.get("Cookie") != f"wordpress_logged_in_x=fresh{self.logins}":
+            return httpx.Response(401, json={"code": "rest_not_logged_in", "data": {"status": 401}})
+        return httpx.Response(200, json={"id": 1})
+
+
+def get_posts(site: ExpiredSession, requests: int, rounds: int = 1):
+    async def run():
+        service = WordPressService(
+            BASE_URL, "editor", "password",
+            transport=httpx.MockTransport(site),
+            taxonomy_cache=TaxonomyCache(),
+            metrics=Metrics()
+        )
+        service.client.cookies.set("wordpress_logged_in_x", "stale", domain="wp.test", path="/")
+        try:
+            statuses = []
+            for _ in range(rounds):
+                responses = await asyncio.gather(*(
+                    service._send_now("GET", f"{service.api_url}/posts/{i}") for i in range(requests)
+                ))
+                statuses += [response.status_code for response in responses]
+            return statuses
+        finally:
+            await service.close()
+    return asyncio.run(run())
+
+
+def test_concurrent_401s_share_one_login():
+    site = ExpiredSession()
+    statuses = get_posts(site, 8)
+    assert statuses == [200] * 8
+    assert site.logins == 1
+    # Each request was sent once with the stale cookie and repeated once
+    assert site.rest_calls == 16
+
+
+def test_route_rejecting_fresh_cookies_does_not_log_in_per_request():
+    site = ExpiredSession(always=True)
+    statuses = get_posts(site, 4, rounds=3)
+    assert statuses == [401] * 12
+    assert site.logins == 1
@@ -0,0 +1,132 @@
+import asyncio
+
+import httpx
+import pytest
+
+import transport
+from transport import CircuitBreaker, CircuitOpenError, HostState, RetryBudget, RetryPolicy, RetryTransport
+
+HOST = "wp.test"
+URL = f"https://{HOST}/wp-json/wp/v2/posts"
+
+
+class Recorder:
+    """MockTransport handler replaying canned outcomes and counting requests."""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        outcome = self.outcomes.pop(0) if len(self.outcomes) > 1 else self.outcomes[0]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record backoff delays instead of waiting them out."""
+    delays = []
+
+    async def fake_sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(transport.asyncio, "sleep", fake_sleep)
+    return delays
+
+
+def send(handler, method="GET", policy=None, **kwargs):
+    async def run():
+        async with httpx.AsyncClient(transport=RetryTransport(httpx.MockTransport(handler), policy)) as client:
+            return await client.request(method, URL, **kwargs)
+    return asyncio.run(run())
+
+
+def test_retry_after_is_honoured(sleeps):
+    handler = Recorder(httpx.Response(429, headers={"Retry-After": "7"}), httpx.Response(200))
+    response = send(handler)
+    assert response.status_code == 200
+    assert handler.calls == 2
+    assert sleeps == [7.0]
+
+
+def test_retry_after_beyond_cap_is_not_waited_for(sleeps):
+    handler = Recorder(httpx.Response(503, headers={"Retry-After": "600"}), httpx.Response(200))
+    response = send(handler, policy=RetryPolicy(max_retry_after=120))
+    assert response.status_code == 503
+    assert handler.calls == 1
+    assert sleeps == []
+
+
+def test_breaker_opens_then_lets_one_trial_through(sleeps):
+    transport._hosts[HOST] = HostState(breaker=CircuitBreaker(failure_threshold=2, recovery_time=0.05))
+    handler = Recorder(httpx.Response(500), httpx.Response(500), httpx.Response(200))
+    single = RetryPolicy(max_attempts=1)
+
+    assert send(handler, policy=single).status_code == 500
+    assert send(handler, policy=single).status_code == 500
+    assert transport._hosts[HOST].breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        send(handler, policy=single)
+    assert handler.calls == 2
+
+    breaker = transport._hosts[HOST].breaker
+    breaker._opened_at -= breaker.recovery_time  # recovery_time has passed
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Only the trial request is let through until it reports back
+    assert not breaker.allow()
+    breaker._trial_started = None
+
+    assert send(handler, policy=single).status_code == 200
+    assert handler.calls == 3
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_failed_trial_reopens_the_breaker(sleeps):
+    transport._hosts[HOST] = HostState(breaker=CircuitBreaker(failure_threshold=1, recovery_time=0.05))
+    handler = Recorder(httpx.Response(502))
+    single = RetryPolicy(max_attempts=1)
+
+    send(handler, policy=single)
+    breaker = transport._hosts[HOST].breaker
+    breaker._opened_at -= breaker.recovery_time  # recovery_time has passed
+    assert send(handler, policy=single).status_code == 502
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        send(handler, policy=single)
+    assert handler.calls == 2
+
+
+def test_exhausted_retry_budget_stops_retrying(sleeps):
+    transport._hosts[HOST] = HostState(budget=RetryBudget(ratio=0.0, reserve=1.0))
+    handler = Recorder(httpx.Response(503))
+    response = send(handler, policy=RetryPolicy(max_attempts=5))
+    assert response.status_code == 503
+    # The reserve pays for one retry; the first attempt deposits nothing
+    assert handler.calls == 2
+    assert len(sleeps) == 1
+
+
+def test_post_is_not_retried_after_read_timeout(sleeps):
+    handler = Recorder(httpx.ReadTimeout("timed out"), httpx.Response(201))
+    with pytest.raises(httpx.ReadTimeout):
+        send(handler, method="POST", json={"title": "Post"})
+    assert handler.calls == 1
+    assert sleeps == []
+
+
+def test_idempotent_post_is_retried_after_read_timeout(sleeps):
+    handler = Recorder(httpx.ReadTimeout("timed out"), httpx.Response(200))
+    response = send(handler, method="POST", json={"title": "Post"}, extensions={"idempotent": True})
+    assert response.status_code == 200
+    assert handler.calls == 2
+
+
+def test_post_is_retried_after_connect_error(sleeps):
+    handler = Recorder(httpx.ConnectError("refused"), httpx.Response(201))
+    response = send(handler, method="POST", json={"title": "Post"})
+    assert response.status_code == 201
+    assert handler.calls == 2
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from fake_wordpress import FakeWordPress
+from fingerprint import FINGERPRINT_META_KEY
+
+FAQ = [{"question": "Question?", "answer": "Answer."}]
+
+
+def publish(site: FakeWordPress, *articles: str, **kwargs):
+    async def run():
+        service = site.service()
+        try:
+            for content_html in articles:
+                await service.publish_elementor_widgets_meta(
+                    content_html, FAQ, title="Post", slug="post", upsert=True, **kwargs
+                )
+        finally:
+            await service.close()
+    asyncio.run(run())
+
+
+def test_missing_post_is_created_with_its_fingerprint():
+    site = FakeWordPress()
+    publish(site, "<h2>A</h2><p>One</p>")
+    [create] = site.writes()
+    assert create.path == "/wp-json/wp/v2/posts"
+    assert create.json["slug"] == "post"
+    assert FINGERPRINT_META_KEY in create.json["meta"]
+    assert "_elementor_data" in create.json["meta"]
+
+
+def test_unchanged_post_gets_no_write():
+    site = FakeWordPress()
+    publish(site, "<h2>A</h2><p>One</p>", "<h2>A</h2><p>One</p>")
+    assert len(site.writes()) == 1
+    assert len(site.posts) == 1
+
+
+def test_changed_post_gets_only_changed_keys_and_css_reset():
+    site = FakeWordPress()
+    publish(site, "<h2>A</h2><p>One</p>", "<h2>A</h2><p>Two</p>")
+    create, update = site.writes()
+    post_id = site.posts[1]["id"]
+    assert update.path == f"/wp-json/wp/v2/posts/{post_id}"
+    assert set(update.json) == {"meta"}
+    assert set(update.json["meta"]) == {
+        "_elementor_data", "_elementor_css", "_elementor_edit_mode", FINGERPRINT_META_KEY
+    }
+    assert update.json["meta"]["_elementor_css"] == ""
+    assert "Two" in site.posts[post_id]["meta"]["_elementor_data"]
+    assert len(site.posts) == 1
+
+
+def test_external_id_without_journal_or_slug_is_rejected():
+    site = FakeWordPress()
+
+    async def run():
+        service = site.service()
+        try:
+            with pytest.raises(ValueError, match="journal"):
+                await service.publish_article("Post", "<p>Body</p>", external_id="article-1", upsert=True)
+        finally:
+            await service.close()
+    asyncio.run(run())
+    assert site.writes() == []
+
+
+def test_plain_article_carries_no_elementor_meta():
+    site = FakeWordPress()
+
+    async def run():
+        service = site.service()
+        try:
+            await service.publish_article("Post", "<p>Body</p>", slug="post", upsert=True)
+            await service.publish_article("Post", "<p>Body</p>", meta_description="Summary")
+        finally:
+            await service.close()
+    asyncio.run(run())
+    upserted, plain = site.writes()
+    assert set(upserted.json["meta"]) == {FINGERPRINT_META_KEY}
+    assert plain.json["meta"] == {"_aioseo_description": "Summary"}
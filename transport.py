@@ -0,0 +1,268 @@
+"""
+Resilient HTTP transport for WordPress clients.
+
+``RetryTransport`` wraps an httpx transport, so every request sent through
+the client (REST calls, term lookups, login) gets the same handling:
+
+- exponential backoff with full jitter, honouring ``Retry-After``
+- a per-host circuit breaker that fails fast while a site is unhealthy
+- a per-host retry budget so retries cannot multiply load during an outage
+- optionally, an adaptive per-host concurrency limit (see ``adaptive_limit``)
+
+Only requests that are safe to repeat are retried after the server may have
+processed them. Pass ``extensions={"idempotent": True}`` to mark a POST (for
+example an update of an existing post) as safe.
+"""
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Dict, FrozenSet, Optional
+
+import httpx
+
+from adaptive_limit import AdaptiveLimit, ConcurrencyPolicy, get_host_limit
+
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+
+class CircuitOpenError(httpx.TransportError):
+    """Raised instead of sending a request while the host's circuit is open."""
+
+
+@dataclass
+class RetryPolicy:
+    """When and how long to wait before retrying.
+
+    Args:
+        max_attempts: Total attempts including the first one
+        base_delay: Backoff base in seconds; attempt ``n`` waits up to ``base_delay * 2**n``
+        max_delay: Upper bound for a single backoff delay
+        max_retry_after: Longest ``Retry-After`` honoured; longer ones are not retried
+        retry_statuses: Statuses retried for idempotent requests
+        always_retry_statuses: Statuses retried for any request, because the
+            server rejected it before doing any work
+    """
+    max_attempts: int = 4
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+    max_retry_after: float = 120.0
+    retry_statuses: FrozenSet[int] = frozenset({429, 500, 502, 503, 504})
+    always_retry_statuses: FrozenSet[int] = frozenset({429, 503})
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter delay before retry number ``attempt`` (starting at 1)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    requests fail immediately for ``recovery_time`` seconds. Then one trial
+    request is let through: success closes the circuit, failure re-opens it.
+    A trial that never reports back (e.g. it was cancelled) is replaced by a
+    new one after another ``recovery_time``.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, recovery_time: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_started: Optional[float] = None
+
+    def allow(self) -> bool:
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.recovery_time:
+                return False
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN:
+            now = time.monotonic()
+            if self._trial_started is not None and now - self._trial_started < self.recovery_time:
+                return False
+            self._trial_started = now
+        return True
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self._failures = 0
+        self._trial_started = None
+
+    def record_failure(self):
+        self._failures += 1
+        self._trial_started = None
+        if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+
+class RetryBudget:
+    """Caps retries at a fraction of recent traffic.
+
+    Each first attempt deposits ``ratio`` tokens and each retry withdraws one,
+    so in steady state at most ``ratio`` retries happen per request. The
+    bucket starts with ``reserve`` tokens so a fresh client can still retry.
+    """
+
+    def __init__(self, ratio: float = 0.2, reserve: float = 10.0, cap: float = 100.0):
+        self.ratio = ratio
+        self.cap = cap
+        self.reserve = reserve
+        self._tokens = reserve
+
+    def deposit(self):
+        self._tokens = min(self.cap, self._tokens + self.ratio)
+
+    def try_withdraw(self) -> bool:
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+
+@dataclass
+class HostState:
+    """Breaker and budget shared by every transport talking to one host."""
+    breaker: CircuitBreaker = field(default_factory=CircuitBreaker)
+    budget: RetryBudget = field(default_factory=RetryBudget)
+
+
+_hosts: Dict[str, HostState] = {}
+
+
+def get_host_state(host: str) -> HostState:
+    state = _hosts.get(host)
+    if state is None:
+        state = HostState()
+        _hosts[host] = state
+    return state
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Return the delay in seconds from a ``Retry-After`` header, if valid."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryTransport(httpx.AsyncBaseTransport):
+    """httpx transport adding retries, a circuit breaker and a retry budget.
+
+    Args:
+        transport: Transport that actually sends requests (default: httpx's)
+        policy: Retry timing and status rules
+        concurrency: Adapt the requests in flight per host; every attempt,
+            including retries, waits for a slot and reports its latency
+    """
+
+    def __init__(
+        self,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        policy: Optional[RetryPolicy] = None,
+        concurrency: Optional[ConcurrencyPolicy] = None
+    ):
+        self.transport = transport or httpx.AsyncHTTPTransport()
+        self.policy = policy or RetryPolicy()
+        self.concurrency = concurrency
+        self.logger = logging.getLogger(__name__)
+
+    async def _send_attempt(self, request: httpx.Request, limit: Optional[AdaptiveLimit]) -> httpx.Response:
+        if limit is None:
+            return await self.transport.handle_async_request(request)
+        started = await limit.acquire()
+        try:
+            response = await self.transport.handle_async_request(request)
+        except httpx.TimeoutException:
+            limit.release(started, overloaded=True)
+            raise
+        except BaseException:
+            limit.release(started)
+            raise
+        limit.release(started, status=response.status_code)
+        return response
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.netloc.decode("ascii").lower()
+        state = get_host_state(host)
+        limit = get_host_limit(host, self.concurrency) if self.concurrency is not None else None
+        idempotent = request.extensions.get("idempotent", request.method in IDEMPOTENT_METHODS)
+        try:
+            request.content
+            replayable = True
+        except httpx.RequestNotRead:
+            # Streamed bodies can only be resent when the caller says the stream restarts
+            replayable = request.extensions.get("replayable", False)
+
+        state.budget.deposit()
+        attempt = 1
+        while True:
+            if not state.breaker.allow():
+                raise CircuitOpenError(f"Circuit open for {host}; not sending {request.method} {request.url}",
+                                       request=request)
+
+            delay = None
+            try:
+                response = await self._send_attempt(request, limit)
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+                # The request never reached the server, so repeating it is always safe
+                state.breaker.record_failure()
+                error, response = e, None
+            except (httpx.ReadTimeout, httpx.ReadError, httpx.RemoteProtocolError, httpx.WriteError) as e:
+                state.breaker.record_failure()
+                if not idempotent:
+                    raise
+                error, response = e, None
+            except Exception:
+                state.breaker.record_failure()
+                raise
+            else:
+                error = None
+                if response.status_code >= 500 or response.status_code == 429:
+                    state.breaker.record_failure()
+                else:
+                    state.breaker.record_success()
+                    return response
+                status = response.status_code
+                retryable = status in self.policy.always_retry_statuses or (
+                    idempotent and status in self.policy.retry_statuses
+                )
+                if not retryable:
+                    return response
+                delay = parse_retry_after(response.headers.get("Retry-After"))
+                if delay is not None and delay > self.policy.max_retry_after:
+                    return response
+
+            if attempt >= self.policy.max_attempts or not replayable or not state.budget.try_withdraw():
+                if error is not None:
+                    raise error
+                return response
+
+            if delay is None:
+                delay = self.policy.backoff(attempt)
+            reason = repr(error) if error is not None else f"HTTP {response.status_code}"
+            self.logger.warning(
+                f"Retrying {request.method} {request.url} after {reason} "
+                f"(attempt {attempt + 1}/{self.policy.max_attempts}, waiting {delay:.2f}s)"
+            )
+            if response is not None:
+                await response.aclose()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def aclose(self):
+        await self.transport.aclose()